@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/benchmark_aec.py
+DESCRIÇÃO: Benchmark offline do cancelamento de eco (src/aec.py).
+           Reproduz pares gravados alto-falante/microfone e mostra o ERLE
+           (Echo Return Loss Enhancement) e o custo de CPU por segundo de áudio.
+
+USO:
+  python3 ferramentas/benchmark_aec.py                 # par sintético (sala simulada)
+  python3 ferramentas/benchmark_aec.py PASTA           # pares PASTA/<nome>_ref.wav + <nome>_mic.wav
+  python3 ferramentas/benchmark_aec.py --gravar FALA.wav PASTA
+        Toca FALA.wav no EMEET M1A gravando o microfone ao mesmo tempo e salva o par
+        em PASTA (rode com o tirilo.py parado: o dispositivo precisa estar livre).
+"""
+
+import glob
+import os
+import subprocess
+import sys
+import time
+import wave
+
+import numpy as np
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+from src.aec import CanceladorEco, erle_db
+from src.reamostragem import reamostrar
+
+DISPOSITIVO_AUDIO = "plughw:CARD=M1A,DEV=0"
+TAXA = 16000
+QUADRO = 512
+ATRASO_MS = 40   # mesmo valor de AEC_ATRASO_MS no tirilo.py
+
+
+def ler_wav(caminho):
+    with wave.open(caminho, "rb") as wf:
+        taxa = wf.getframerate()
+        canais = wf.getnchannels()
+        x = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if canais > 1:
+        x = x.reshape(-1, canais)[:, 0]
+    return reamostrar(x, taxa, TAXA)
+
+
+def salvar_wav(caminho, x, taxa):
+    with wave.open(caminho, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(taxa)
+        wf.writeframes(np.asarray(x, dtype=np.int16).tobytes())
+
+
+def par_sintetico(segundos=10):
+    """Far-end tipo fala (ruído colorido em rajadas) passando por uma sala simulada."""
+    rng = np.random.default_rng(0)
+    n = segundos * TAXA
+    espectro = np.fft.rfft(rng.standard_normal(n))
+    espectro /= 1 + np.fft.rfftfreq(n, 1 / TAXA) / 500
+    ref = np.fft.irfft(espectro, n)
+    ref *= (np.sin(2 * np.pi * 2 * np.arange(n) / TAXA) > -0.3)
+    ref = ref / np.abs(ref).max() * 12000
+    atraso = int(0.06 * TAXA)   # latência de saída + caminho acústico (> ATRASO_MS)
+    cauda = 900
+    h = np.zeros(atraso + cauda)
+    h[atraso] = 0.8
+    h[atraso:] += rng.standard_normal(cauda) * 0.1 * np.exp(-np.arange(cauda) / 150)
+    mic = np.convolve(ref, h)[:n] + rng.standard_normal(n) * 30
+    return ref.astype(np.int16), np.clip(mic, -32768, 32767).astype(np.int16)
+
+
+def gravar_par(arquivo_fala, pasta):
+    os.makedirs(pasta, exist_ok=True)
+    nome = os.path.splitext(os.path.basename(arquivo_fala))[0]
+    arq_mic = os.path.join(pasta, f"{nome}_mic.wav")
+    with wave.open(arquivo_fala, "rb") as wf:
+        duracao = wf.getnframes() / wf.getframerate()
+    gravador = subprocess.Popen(
+        ["arecord", "-D", DISPOSITIVO_AUDIO, "-f", "S16_LE", "-r", "48000", "-c", "1",
+         "-d", str(int(duracao + 2)), "-q", arq_mic])
+    time.sleep(0.3)
+    subprocess.run(["aplay", "-q", "-D", DISPOSITIVO_AUDIO, arquivo_fala])
+    gravador.wait()
+    # A referência fica alinhada ao início da gravação (0.3s de espera antes do aplay)
+    ref = ler_wav(arquivo_fala)
+    ref = np.concatenate((np.zeros(int(0.3 * TAXA), dtype=np.int16), ref))
+    salvar_wav(os.path.join(pasta, f"{nome}_ref.wav"), ref, TAXA)
+    print(f"Par gravado em {pasta} ({nome}_ref.wav / {nome}_mic.wav)")
+
+
+def avaliar(nome, ref, mic):
+    n = min(len(ref), len(mic))
+    ref, mic = ref[:n], mic[:n]
+    # Mesmo alinhamento do robô: referência atrasada pela latência de saída
+    atraso = int(TAXA * ATRASO_MS / 1000)
+    ref_alinhada = np.concatenate((np.zeros(atraso, dtype=np.int16), ref))[:n]
+    aec = CanceladorEco()
+    t0 = time.process_time()
+    saida = np.concatenate([aec.processar(mic[i:i + QUADRO], ref_alinhada[i:i + QUADRO])
+                            for i in range(0, n, QUADRO)])
+    cpu = time.process_time() - t0
+    segundos = n / TAXA
+    # ERLE só onde há eco (referência tocando), na segunda metade (filtro convergido)
+    ativo = np.abs(ref_alinhada[:len(saida)]) > 0
+    metade = len(saida) // 2
+    erle_total = erle_db(mic[:len(saida)][ativo], saida[ativo])
+    erle_conv = erle_db(mic[metade:len(saida)][ativo[metade:]], saida[metade:][ativo[metade:]])
+    print(f"{nome:<24} {segundos:6.1f}s  ERLE {erle_total:5.1f} dB  "
+          f"(convergido {erle_conv:5.1f} dB)  CPU {cpu / segundos * 1000:6.1f} ms/s")
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--gravar"] and len(args) == 3:
+        gravar_par(args[1], args[2])
+        return
+    print(f"AEC: PBFDAF bloco={CanceladorEco().N} taps={CanceladorEco().taps} @ {TAXA} Hz\n")
+    if not args:
+        avaliar("sintetico", *par_sintetico())
+        return
+    pares = sorted(glob.glob(os.path.join(args[0], "*_ref.wav")))
+    if not pares:
+        print(f"Nenhum par *_ref.wav / *_mic.wav em {args[0]}")
+        return
+    for arq_ref in pares:
+        arq_mic = arq_ref[:-len("_ref.wav")] + "_mic.wav"
+        if os.path.exists(arq_mic):
+            avaliar(os.path.basename(arq_ref)[:-len("_ref.wav")], ler_wav(arq_ref), ler_wav(arq_mic))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/benchmark_intencoes.py
+DESCRIÇÃO: Confere e mede o roteador local de intenções (src/intencoes.py, usado
+           por loop_logica() antes da IA) contra a cadeia antiga: parar pela
+           TabelaPalavrasChave, `any(f in texto_l ...)` para modos/saída, tabela
+           de movimento e _detectar_jogo_por_voz() redividindo os nomes dos jogos.
+
+           Para cada fala do corpus: rótulo esperado, o do roteador (com a
+           confiança) e o da cadeia antiga (OK/FALHOU) e µs por fala (melhor de
+           N). Também mostra o tempo de compilação da tabela. Sai com código 1
+           se o roteador errar alguma fala.
+
+           Usa as tabelas reais do tirilo.py (importa o módulo) e os jogos de
+           jogos_padrao/manifest.json.
+
+USO:
+  python3 ferramentas/benchmark_intencoes.py
+  python3 ferramentas/benchmark_intencoes.py --modo TERAPEUTA
+  python3 ferramentas/benchmark_intencoes.py --repeticoes 2000
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+import tirilo
+from src.palavras_chave import TabelaPalavrasChave
+
+# (fala como o STT entrega, rótulo esperado no modo criança, no modo terapeuta)
+CORPUS = [
+    ("parar", "parar", "parar"),
+    ("Para tudo agora!", "parar", "parar"),
+    ("vamos preparar um bolo", None, None),
+    ("doutor tirilo", "modo_terapeuta", None),
+    ("tchau tirilo", "encerrar", "encerrar"),
+    ("sair do modo", "encerrar", "voltar"),
+    ("quero voltar", None, "voltar"),
+    ("listar arquivos", None, "listar_arquivos"),
+    ("ativa o gemini", "modo_ia", None),
+    ("modo eco", "modo_eco", None),
+    ("eu tenho um boneco novo", None, None),
+    ("pisca o direito por favor", "mov_0", "mov_0"),
+    ("pode piscar pra mim", "mov_2", "mov_2"),
+    ("olhe para a esquerda", "mov_6", "mov_6"),
+    ("fica triste", "mov_11", "mov_11"),
+    ("como o cavalo galopa no campo", "mov_20", "mov_20"),
+    ("canta uma música pra mim", "musica", "musica"),
+    ("quero jogar parear cores", "jogo_jogos/parear_cores/parearcor.py",
+     "jogo_jogos/parear_cores/parearcor.py"),
+    ("vamos fazer a coreografia do seu lobato", "jogo_jogos/coreografia_seulobato/coreografia_seulobato.py",
+     "jogo_jogos/coreografia_seulobato/coreografia_seulobato.py"),
+    ("coreografia old macdonald", "jogo_jogos/coreografia_macdonald/coreografia_macdonald.py",
+     "jogo_jogos/coreografia_macdonald/coreografia_macdonald.py"),
+    ("por que o céu é azul", None, None),
+    ("me conta uma história de dinossauro bem comprida com muitos detalhes e um final feliz", None, None),
+]
+
+
+def carregar_jogos():
+    with open(os.path.join(PASTA_ROBO, "jogos_padrao", "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rotear_antigo(texto, modo, tabela_mov, tabela_parar, jogos):
+    """Cadeia de loop_logica() até a v4.19 (referência); rótulos como os do roteador."""
+    texto_l = texto.lower()
+    if tabela_parar.casar(texto_l) == "parar":
+        return "parar"
+    if any(f in texto_l for f in tirilo.FRASES_MODO_TERAPEUTA) and modo == "CRIANCA":
+        return "modo_terapeuta"
+    if any(f in texto_l for f in tirilo.FRASES_ENCERRAR):
+        return "encerrar"
+    if modo == "TERAPEUTA":
+        if "voltar" in texto_l or "sair do modo" in texto_l:
+            return "voltar"
+        if "listar arquivos" in texto_l or "logs" in texto_l:
+            return "listar_arquivos"
+    else:
+        if "gemini" in texto_l:
+            return "modo_ia"
+        if "desativar" in texto_l or "eco" in texto_l:
+            return "modo_eco"
+    rotulo = tabela_mov.casar(texto_l)
+    if rotulo:
+        return rotulo
+    for jogo in jogos:
+        palavras = [p.lower() for p in jogo['nome'].split() if len(p) >= 3]
+        if palavras and all(p in texto_l for p in palavras):
+            return f"jogo_{jogo['codigo']}"
+    return None
+
+
+def cronometrar(funcao, repeticoes):
+    """µs por chamada (melhor de `repeticoes`)."""
+    melhor = None
+    for _ in range(repeticoes):
+        t0 = time.perf_counter()
+        funcao()
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return melhor * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--modo", default="CRIANCA", choices=("CRIANCA", "TERAPEUTA"))
+    ap.add_argument("--repeticoes", type=int, default=500)
+    args = ap.parse_args()
+
+    jogos = carregar_jogos()
+    tirilo._jogos_disponiveis = jogos
+    chave_jogos = tuple((j['codigo'], j['nome']) for j in jogos)
+    t0 = time.perf_counter()
+    roteador = tirilo._roteador_intencoes.__wrapped__(chave_jogos)
+    print(f"Tabela compilada em {(time.perf_counter() - t0) * 1000:.1f} ms "
+          f"({len(roteador.entradas)} intenções).\n")
+    tabela_mov = TabelaPalavrasChave({f"mov_{i}": c[0] for i, c in enumerate(tirilo.COMANDOS_MOVIMENTO)})
+    tabela_parar = TabelaPalavrasChave({"parar": tirilo.FRASES_PARAR})
+    if args.modo == "TERAPEUTA":
+        ignorar = ("modo_terapeuta", "modo_ia", "modo_eco")
+    else:
+        ignorar = ("voltar", "listar_arquivos")
+
+    falhas = 0
+    soma_novo = soma_antigo = 0.0
+    print(f"{'fala':<42} {'esperado':<16} {'novo':<16} {'conf':>5} {'':>6} {'antigo':>7} "
+          f"{'µs novo':>8} {'antigo':>7}")
+    for texto, esperado_crianca, esperado_terapeuta in CORPUS:
+        esperado = esperado_terapeuta if args.modo == "TERAPEUTA" else esperado_crianca
+        intencao = roteador.rotear(texto, ignorar)
+        novo = intencao.rotulo if intencao else None
+        antigo = rotear_antigo(texto, args.modo, tabela_mov, tabela_parar, jogos)
+        us_novo = cronometrar(lambda: roteador.rotear(texto, ignorar), args.repeticoes)
+        us_antigo = cronometrar(lambda: rotear_antigo(texto, args.modo, tabela_mov, tabela_parar, jogos),
+                                args.repeticoes)
+        soma_novo += us_novo
+        soma_antigo += us_antigo
+        falhas += novo != esperado
+        curto = lambda r: (r or "-")[:16]
+        print(f"{texto[:42]:<42} {curto(esperado):<16} {curto(novo):<16} "
+              f"{intencao.confianca if intencao else 0:>5.2f} {'OK' if novo == esperado else 'FALHOU':>6} "
+              f"{'OK' if antigo == esperado else 'FALHOU':>7} {us_novo:>8.1f} {us_antigo:>7.1f}")
+    n = len(CORPUS)
+    print(f"\nMédia por fala: novo {soma_novo / n:.1f} µs, antigo {soma_antigo / n:.1f} µs.")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/benchmark_parser.py
+DESCRIÇÃO: Confere e mede o ParserResposta (src/parser_resposta.py) contra o
+           loop antigo de perguntar_gemini() (re.search de frase + re.search/
+           re.sub da tag em cada frase) sobre streams gravados da IA.
+
+           Para cada stream: frases/tags esperadas (OK/FALHOU, só nos streams
+           embutidos), em que caractere do stream a tag de jogo foi percebida e
+           µs de CPU por pedaço (melhor de N). Sai com código 1 se o parser novo
+           errar algum stream embutido.
+
+USO:
+  python3 ferramentas/benchmark_parser.py                      # streams embutidos
+  python3 ferramentas/benchmark_parser.py /tmp/tirilo_streams_ia.jsonl
+        O .jsonl é gravado pelo tirilo.py com TIRILO_GRAVAR_STREAM=1 (um
+        {"pedacos": [...]} por resposta); esses são só medidos.
+"""
+
+import json
+import os
+import re
+import sys
+import time
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+from src.parser_resposta import Frase, ParserResposta, Tag
+
+REPETICOES = 200
+
+# Pedaços como o generate_content_stream entrega (cortes no meio de palavra/tag)
+STREAMS = [
+    ("jogo simples",
+     ["Que legal! Vamos brin", "car de parear as cores. [JO", "GO:parear]"],
+     [Frase("Que legal!"), Frase("Vamos brincar de parear as cores."), Tag("JOGO", "parear")]),
+    ("tag no meio",
+     ["Oba! [JOGO:emocoes] Você vai", " adorar esse jogo, ele é muito", " divertido. Boa sorte!"],
+     [Frase("Oba!"), Tag("JOGO", "emocoes"), Frase("Você vai adorar esse jogo, ele é muito divertido."),
+      Frase("Boa sorte!")]),
+    ("abreviações",
+     ["O Dr. Tirilo e a Sra. Ana foram ao parque. Lá tinha", " gatos, cães, etc. Foi divertido!"],
+     [Frase("O Dr. Tirilo e a Sra. Ana foram ao parque."), Frase("Lá tinha gatos, cães, etc."),
+      Frase("Foi divertido!")]),
+    ("decimais e números",
+     ["A girafa tem uns 5.5 metros de altura. Ela come 34.000", " folhas? Não, menos! Mas come muito."],
+     [Frase("A girafa tem uns 5.5 metros de altura."), Frase("Ela come 34.000 folhas?"),
+      Frase("Não, menos!"), Frase("Mas come muito.")]),
+    ("reticências",
+     ["Hmm... deixa eu pensar", "... Já sei! O polvo tem três cora", "ções… Incrível, né?"],
+     [Frase("Hmm... deixa eu pensar..."), Frase("Já sei!"), Frase("O polvo tem três corações…"),
+      Frase("Incrível, né?")]),
+    ("sem pontuação final",
+     ["Vamos jogar juntos agora", " [JOGO:memoria]"],
+     [Tag("JOGO", "memoria"), Frase("Vamos jogar juntos agora")]),
+    ("lista com quebras",
+     ["Três animais do mar:\n- polvo\n- baleia", "\n- tubarão\nQual você prefere?"],
+     [Frase("Três animais do mar:"), Frase("- polvo"), Frase("- baleia"), Frase("- tubarão"),
+      Frase("Qual você prefere?")]),
+    ("colchete que não é tag",
+     ["Eu sei fazer [risos] muitas", " coisas. Quer ver?"],
+     [Frase("Eu sei fazer [risos] muitas coisas."), Frase("Quer ver?")]),
+]
+
+
+def segmentar_antigo(pedacos, ao_evento):
+    """Loop de perguntar_gemini() até a v4.19 (referência)."""
+    buffer = ""
+    for chunk_texto in pedacos:
+        buffer += chunk_texto
+        while True:
+            match = re.search(r'[^.!?]*[.!?]', buffer)
+            if not match:
+                break
+            sentenca = match.group(0)
+            buffer = buffer[match.end():]
+            tag = re.search(r'\[JOGO:(\w+)\]', sentenca)
+            if tag:
+                ao_evento(Tag("JOGO", tag.group(1)))
+            sentenca_limpa = re.sub(r'\[JOGO:\w+\]', '', sentenca).strip()
+            if sentenca_limpa:
+                ao_evento(Frase(sentenca_limpa))
+    if buffer.strip():
+        tag = re.search(r'\[JOGO:(\w+)\]', buffer)
+        if tag:
+            ao_evento(Tag("JOGO", tag.group(1)))
+        resto = re.sub(r'\[JOGO:\w+\]', '', buffer).strip()
+        if resto:
+            ao_evento(Frase(resto))
+
+
+def segmentar_novo(pedacos, ao_evento):
+    parser = ParserResposta(ao_evento=ao_evento)
+    for pedaco in pedacos:
+        parser.alimentar(pedaco)
+    parser.finalizar()
+
+
+def rodar(segmentar, pedacos):
+    """(eventos, caractere do stream em que a 1ª tag de jogo saiu ou None)."""
+    eventos = []
+    lido = [0]
+    tag_em = [None]
+
+    def ao_evento(evento):
+        eventos.append(evento)
+        if isinstance(evento, Tag) and tag_em[0] is None:
+            tag_em[0] = lido[0]
+
+    def contando():
+        for pedaco in pedacos:
+            lido[0] += len(pedaco)
+            yield pedaco
+
+    segmentar(contando(), ao_evento)
+    return eventos, tag_em[0]
+
+
+def cronometrar(segmentar, pedacos):
+    """µs por pedaço (melhor de REPETICOES)."""
+    melhor = None
+    for _ in range(REPETICOES):
+        t0 = time.perf_counter()
+        segmentar(pedacos, lambda e: None)
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return melhor / max(1, len(pedacos)) * 1e6
+
+
+def ler_gravados(caminho):
+    streams = []
+    with open(caminho, encoding="utf-8") as f:
+        for i, linha in enumerate(f):
+            if linha.strip():
+                streams.append((f"gravado {i + 1}", json.loads(linha)["pedacos"], None))
+    return streams
+
+
+def main():
+    streams = list(STREAMS)
+    for caminho in sys.argv[1:]:
+        streams += ler_gravados(caminho)
+
+    falhas = 0
+    print(f"{'stream':<24} {'novo':>7} {'antigo':>7} {'tag novo':>9} {'tag antigo':>10} "
+          f"{'µs/pedaço novo':>15} {'antigo':>7}")
+    for nome, pedacos, esperado in streams:
+        novo, tag_novo = rodar(segmentar_novo, pedacos)
+        antigo, tag_antigo = rodar(segmentar_antigo, pedacos)
+        if esperado is None:
+            ok_novo = ok_antigo = "-"
+        else:
+            ok_novo = "OK" if novo == esperado else "FALHOU"
+            ok_antigo = "OK" if antigo == esperado else "FALHOU"
+            falhas += novo != esperado
+        total = sum(len(p) for p in pedacos)
+        fmt_tag = lambda em: f"{em}/{total}" if em is not None else "-"
+        print(f"{nome:<24} {ok_novo:>7} {ok_antigo:>7} {fmt_tag(tag_novo):>9} {fmt_tag(tag_antigo):>10} "
+              f"{cronometrar(segmentar_novo, pedacos):>15.1f} {cronometrar(segmentar_antigo, pedacos):>7.1f}")
+        if ok_novo == "FALHOU":
+            print(f"    esperado: {esperado}\n    obtido:   {novo}")
+    print("\n'tag' = caracteres do stream lidos quando a tag de jogo foi percebida.")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/benchmark_pitch.py
+DESCRIÇÃO: Compara o pitch em NumPy (src/pitch.py, WSOLA + reamostragem) com o
+           caminho antigo via `sox ... pitch`: CPU por segundo de áudio (o SoX
+           inclui o custo do processo), erro do pitch medido (cents), duração e
+           distância espectral entre as duas saídas.
+
+USO:
+  python3 ferramentas/benchmark_pitch.py                     # voz sintética (glissando com harmônicos)
+  python3 ferramentas/benchmark_pitch.py FALA.wav [...]      # WAVs mono (ex.: frases do cache_voz/)
+  python3 ferramentas/benchmark_pitch.py --cents 150,-200 --salvar /tmp/pitch FALA.wav
+        --salvar grava <nome>_wsola_<cents>.wav e <nome>_sox_<cents>.wav para ouvir.
+"""
+
+import os
+import shutil
+import sys
+import time
+import wave
+
+import numpy as np
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+from src.pitch import deslocar_pitch, deslocar_pitch_sox, fator_pitch
+
+TAXA = 22050        # taxa típica dos modelos Piper/Sherpa
+REPETICOES = 3
+
+
+def ler_wav(caminho):
+    with wave.open(caminho, "rb") as wf:
+        taxa = wf.getframerate()
+        canais = wf.getnchannels()
+        x = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if canais > 1:
+        x = x.reshape(-1, canais)[:, 0]
+    return x, taxa
+
+
+def salvar_wav(caminho, x, taxa):
+    with wave.open(caminho, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(taxa)
+        wf.writeframes(np.asarray(x, dtype=np.int16).tobytes())
+
+
+def voz_sintetica(segundos=4):
+    """Glissando 110–190 Hz com 20 harmônicos e envelope silábico (~4 sílabas/s)."""
+    t = np.arange(int(segundos * TAXA)) / TAXA
+    f0 = 150 + 40 * np.sin(2 * np.pi * 0.4 * t)
+    fase = 2 * np.pi * np.cumsum(f0) / TAXA
+    x = sum(np.sin(k * fase) / k for k in range(1, 21))
+    x *= np.clip(np.sin(2 * np.pi * 2 * t), 0, None) ** 0.5
+    return (x / np.abs(x).max() * 12000).astype(np.int16), TAXA
+
+
+def f0_quadros(x, taxa, quadro_ms=40):
+    """f0 por autocorrelação nos quadros vozeados (energia alta); NaN nos demais."""
+    n = int(taxa * quadro_ms / 1000)
+    lo, hi = taxa // 400, taxa // 70
+    x = x.astype(np.float64)
+    limiar = 0.1 * np.sqrt(np.mean(x ** 2))
+    f0 = []
+    for i in range(0, len(x) - n, n):
+        q = x[i:i + n] - x[i:i + n].mean()
+        if np.sqrt(np.mean(q ** 2)) < limiar:
+            f0.append(np.nan)
+            continue
+        ac = np.correlate(q, q, "full")[n - 1:]
+        atraso = lo + int(np.argmax(ac[lo:hi]))
+        # Interpolação parabólica do pico (resolução sub-amostra)
+        if 0 < atraso < len(ac) - 1:
+            a, b, c = ac[atraso - 1], ac[atraso], ac[atraso + 1]
+            den = a - 2 * b + c
+            atraso = atraso + 0.5 * (a - c) / den if den else atraso
+        f0.append(taxa / atraso if ac[0] > 0 and ac[int(atraso)] > 0.3 * ac[0] else np.nan)
+    return np.array(f0)
+
+
+def deslocamento_medido(x, y, taxa):
+    """Mediana do deslocamento (cents) entre os quadros vozeados de x e y."""
+    a, b = f0_quadros(x, taxa), f0_quadros(y, taxa)
+    n = min(len(a), len(b))
+    ok = ~np.isnan(a[:n]) & ~np.isnan(b[:n])
+    if not ok.any():
+        return float("nan")
+    return float(np.median(1200 * np.log2(b[:n][ok] / a[:n][ok])))
+
+
+def distancia_espectral(a, b, n=1024):
+    """Distância log-espectral média (dB) entre dois sinais, quadro a quadro."""
+    m = min(len(a), len(b)) // n * n
+    if m == 0:
+        return float("nan")
+    janela = np.hanning(n)
+    A = np.abs(np.fft.rfft(a[:m].reshape(-1, n) * janela, axis=1)) + 1e-3
+    B = np.abs(np.fft.rfft(b[:m].reshape(-1, n) * janela, axis=1)) + 1e-3
+    return float(np.mean(np.sqrt(np.mean((20 * np.log10(A / B)) ** 2, axis=1))))
+
+
+def cronometrar(funcao, *args):
+    """(saída, ms de CPU/relógio da melhor de REPETICOES)."""
+    melhor = None
+    for _ in range(REPETICOES):
+        t0 = time.perf_counter()
+        saida = funcao(*args)
+        dt = time.perf_counter() - t0
+        melhor = dt if melhor is None else min(melhor, dt)
+    return saida, melhor
+
+
+def avaliar(nome, x, taxa, cents, pasta_salvar=None, tem_sox=True):
+    segundos = len(x) / taxa
+    num, den = fator_pitch(cents)
+    y, t_wsola = cronometrar(deslocar_pitch, x, taxa, cents)
+    linha = (f"{nome:<18} {cents:>+5}c ({num}/{den})  WSOLA {t_wsola / segundos * 1000:6.1f} ms/s  "
+             f"pitch {deslocamento_medido(x, y, taxa):+6.1f}c  dur {len(y) - len(x):+5d} am.")
+    if tem_sox:
+        try:
+            z, t_sox = cronometrar(deslocar_pitch_sox, x, taxa, cents)
+            linha += (f" | SoX {t_sox / segundos * 1000:6.1f} ms/s  pitch "
+                      f"{deslocamento_medido(x, z, taxa):+6.1f}c  dist. WSOLA×SoX "
+                      f"{distancia_espectral(y.astype(float), z.astype(float)):4.1f} dB")
+        except RuntimeError as e:
+            z = None
+            linha += f" | SoX falhou: {e}"
+    print(linha)
+    if pasta_salvar:
+        os.makedirs(pasta_salvar, exist_ok=True)
+        salvar_wav(os.path.join(pasta_salvar, f"{nome}_wsola_{cents}.wav"), y, taxa)
+        if tem_sox and z is not None:
+            salvar_wav(os.path.join(pasta_salvar, f"{nome}_sox_{cents}.wav"), z, taxa)
+
+
+def main():
+    args = sys.argv[1:]
+    cents = [150]
+    pasta_salvar = None
+    arquivos = []
+    while args:
+        a = args.pop(0)
+        if a == "--cents" and args:
+            cents = [int(c) for c in args.pop(0).split(",") if c.strip()]
+        elif a == "--salvar" and args:
+            pasta_salvar = args.pop(0)
+        else:
+            arquivos.append(a)
+    tem_sox = shutil.which("sox") is not None
+    if not tem_sox:
+        print("Pitch: sox não encontrado; medindo só o WSOLA.")
+    print(f"Pitch: melhor de {REPETICOES} execuções; 'pitch' = deslocamento medido por autocorrelação.\n")
+    entradas = [(os.path.splitext(os.path.basename(a))[0], *ler_wav(a)) for a in arquivos]
+    if not entradas:
+        entradas = [("sintetico", *voz_sintetica())]
+    for nome, x, taxa in entradas:
+        for c in cents:
+            avaliar(nome, x, taxa, c, pasta_salvar, tem_sox)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/benchmark_tts.py
+DESCRIÇÃO: Benchmark de latência dos motores de voz (espeak-ng, Piper, Sherpa,
+           Edge) pelo caminho real do falar() do tirilo.py — pipeline de fala,
+           cache, pitch — com a saída de áudio trocada por uma SaidaNula (nada
+           toca; cada bloco é registrado). Cada motor roda num processo próprio,
+           então o pico de RSS é só dele.
+
+           Mede por frase de um corpus pt-BR (curtas, médias, longas): tempo até o
+           primeiro áudio, tempo total de síntese, fator de tempo real
+           (RTF = síntese / áudio) e CPU (processo + filhos como espeak/mpg123).
+           Mostra uma tabela e salva JSON para comparar versão a versão.
+
+USO:
+  python3 ferramentas/benchmark_tts.py                         # ROBOTICO, PIPER, SHERPA, NATURAL
+  python3 ferramentas/benchmark_tts.py --motores ROBOTICO,SHERPA --repeticoes 5
+  python3 ferramentas/benchmark_tts.py --json resultado.json --gravar /tmp/tts
+  python3 ferramentas/benchmark_tts.py --comparar logs/benchmark_tts_4.18_....json
+        --gravar salva um WAV por frase (1ª repetição); --comparar mostra a variação
+        da mediana em relação a um JSON anterior.
+"""
+
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+MOTORES = ("ROBOTICO", "PIPER", "SHERPA", "NATURAL")
+CORPUS = (
+    ("curta", "Isso mesmo!"),
+    ("curta", "Vamos brincar?"),
+    ("curta", "Muito bem, amiguinho!"),
+    ("media", "Olá! Eu sou o Tirilo e adoro conversar com você."),
+    ("media", "Arraste os círculos para os quadrados da mesma cor."),
+    ("media", "O gato é um animal muito curioso e gosta de dormir no sol."),
+    ("longa", "Os golfinhos são mamíferos que vivem no mar. Eles respiram pela parte de cima "
+              "da cabeça e conversam entre si com assobios."),
+    ("longa", "Hoje nós vamos aprender as cores. Vermelho é a cor do morango, amarelo é a cor "
+              "do sol e azul é a cor do céu num dia bonito."),
+    ("longa", "Quando a gente fica triste, é bom respirar fundo, contar até cinco bem devagar "
+              "e conversar com alguém de quem a gente gosta."),
+)
+CLASSES = ("curta", "media", "longa")
+
+
+def _cpu_s():
+    """CPU do processo (todas as threads) + filhos já encerrados (espeak, mpg123)."""
+    filhos = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + filhos.ru_utime + filhos.ru_stime
+
+
+def _salvar_wav(caminho, audio):
+    from src.reamostragem import reamostrar
+    taxa = audio[0][1]
+    partes = []
+    for x, t in audio:
+        x = np.asarray(x)
+        if x.dtype.kind == "f":
+            x = np.clip(x * 32767.0, -32768, 32767)
+        partes.append(reamostrar(x.astype(np.int16), t, taxa) if t != taxa else x.astype(np.int16))
+    with wave.open(caminho, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(taxa)
+        wf.writeframes(np.concatenate(partes).tobytes())
+
+
+# --- Processo filho: um motor ---
+def medir_motor(motor, repeticoes, pasta_gravar=None):
+    import tirilo
+    from src.cache_voz import CacheVoz
+    from src.saida_audio import SaidaNula
+
+    saida = SaidaNula(gravar=bool(pasta_gravar))
+    tirilo._saida_audio = saida
+    tirilo.BARGE_IN_ATIVO = False      # sem alto-falante não há eco a vigiar
+    tirilo._MOTOR_VOZ_GLOBAL = motor
+    resultado = {"versao": tirilo.VERSAO_ATUAL, "carga_s": None, "rss_carga_mb": None}
+    if motor in tirilo._motores_voz:
+        tirilo._motores_voz.aquecer(motor)
+        if not tirilo._motores_voz.aguardar(motor, 300):
+            return {**resultado, "erro": "motor indisponível (biblioteca ou modelo ausente)"}
+        estado = tirilo._motores_voz.estado()[motor]
+        resultado.update(carga_s=estado["carga_s"], rss_carga_mb=estado["rss_mb"])
+    if tirilo._voz_atual()[0] != motor:
+        return {**resultado, "erro": f"falar() usaria {tirilo._voz_atual()[0]}"}
+
+    frases = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # Rodada 0 aquece (1ª inferência do onnxruntime, conexão do Edge) e não conta
+        for rodada in range(repeticoes + 1):
+            # Cache vazio a cada rodada: toda frase passa pelo motor (e é gravada, como no robô)
+            tirilo._cache_voz = CacheVoz(os.path.join(tmp, str(rodada)))
+            corpus = CORPUS[:1] if rodada == 0 else CORPUS
+            for i, (classe, frase) in enumerate(corpus):
+                saida.limpar()
+                cpu0 = _cpu_s()
+                t0 = time.perf_counter()
+                tirilo.falar(frase)
+                total = time.perf_counter() - t0
+                cpu = _cpu_s() - cpu0
+                blocos, audio = saida.limpar()
+                if rodada == 0 or not blocos:
+                    continue
+                duracao = sum(n / taxa for _, n, taxa in blocos)
+                frases.append({"classe": classe, "caracteres": len(frase),
+                               "primeiro_audio_s": blocos[0][0] - t0, "total_s": total,
+                               "audio_s": duracao, "rtf": total / duracao if duracao else None,
+                               "cpu_s": cpu})
+                if pasta_gravar and rodada == 1 and audio:
+                    os.makedirs(pasta_gravar, exist_ok=True)
+                    _salvar_wav(os.path.join(pasta_gravar, f"{motor.lower()}_{i:02d}_{classe}.wav"), audio)
+    resultado["frases"] = frases
+    resultado["pico_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return resultado
+
+
+def resumir(frases):
+    """Medianas por classe de tamanho."""
+    resumo = {}
+    for classe in CLASSES:
+        linhas = [f for f in frases if f["classe"] == classe]
+        if not linhas:
+            continue
+        mediana = lambda campo: float(np.median([f[campo] for f in linhas if f[campo] is not None]))
+        resumo[classe] = {"primeiro_audio_s": mediana("primeiro_audio_s"), "total_s": mediana("total_s"),
+                          "audio_s": mediana("audio_s"), "rtf": mediana("rtf"),
+                          "cpu_por_audio": float(sum(f["cpu_s"] for f in linhas) /
+                                                 max(1e-9, sum(f["audio_s"] for f in linhas))),
+                          "amostras": len(linhas)}
+    return resumo
+
+
+# --- Processo pai ---
+def rodar_filho(motor, repeticoes, pasta_gravar):
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        arq = f.name
+    cmd = [sys.executable, os.path.abspath(__file__), "--filho", motor, arq, "--repeticoes", str(repeticoes)]
+    if pasta_gravar:
+        cmd += ["--gravar", pasta_gravar]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, cwd=PASTA_ROBO)
+        try:
+            with open(arq, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            cauda = (proc.stderr or proc.stdout).strip().splitlines()[-5:]
+            return {"erro": "processo falhou: " + " | ".join(cauda)}
+    finally:
+        if os.path.exists(arq):
+            os.remove(arq)
+
+
+def imprimir(documento, anterior=None):
+    print(f"\n{'motor':<9} {'texto':<6} {'1º áudio ms':>11} {'total s':>8} {'áudio s':>8} "
+          f"{'RTF':>6} {'CPU/áudio':>9} {'pico RSS':>9} {'carga s':>8}")
+    for motor, r in documento["motores"].items():
+        if "erro" in r:
+            print(f"{motor:<9} {r['erro']}")
+            continue
+        carga = f"{r['carga_s']:.1f}" if r.get("carga_s") is not None else "-"
+        for classe, m in r["resumo"].items():
+            linha = (f"{motor:<9} {classe:<6} {m['primeiro_audio_s'] * 1000:>11.0f} {m['total_s']:>8.2f} "
+                     f"{m['audio_s']:>8.2f} {m['rtf']:>6.3f} {m['cpu_por_audio']:>9.3f} "
+                     f"{r['pico_rss_mb']:>7.0f}MB {carga:>8}")
+            antes = ((anterior or {}).get("motores", {}).get(motor, {}).get("resumo") or {}).get(classe)
+            if antes:
+                variacao = lambda campo: (m[campo] / antes[campo] - 1) * 100 if antes[campo] else 0.0
+                linha += (f"   Δ 1º áudio {variacao('primeiro_audio_s'):+.0f}%  "
+                          f"Δ RTF {variacao('rtf'):+.0f}%")
+            print(linha)
+
+
+def main():
+    args = sys.argv[1:]
+    if args[:1] == ["--filho"]:
+        motor, arq = args[1], args[2]
+        repeticoes = int(args[args.index("--repeticoes") + 1]) if "--repeticoes" in args else 3
+        pasta = args[args.index("--gravar") + 1] if "--gravar" in args else None
+        try:
+            resultado = medir_motor(motor, repeticoes, pasta)
+        except Exception as e:
+            resultado = {"erro": f"{type(e).__name__}: {e}"}
+        with open(arq, "w", encoding="utf-8") as f:
+            json.dump(resultado, f)
+        os._exit(0)   # threads de fundo do tirilo (captura, saída, loop do Edge) não seguram o processo
+
+    motores, repeticoes, arq_json, pasta_gravar, arq_anterior = list(MOTORES), 3, None, None, None
+    while args:
+        a = args.pop(0)
+        if a == "--motores" and args:
+            motores = [m.strip().upper() for m in args.pop(0).split(",") if m.strip()]
+        elif a == "--repeticoes" and args:
+            repeticoes = max(1, int(args.pop(0)))
+        elif a == "--json" and args:
+            arq_json = args.pop(0)
+        elif a == "--gravar" and args:
+            pasta_gravar = os.path.abspath(args.pop(0))
+        elif a == "--comparar" and args:
+            arq_anterior = args.pop(0)
+        else:
+            print(__doc__)
+            return
+
+    documento = {"data": time.strftime("%Y-%m-%d %H:%M:%S"), "host": platform.node(),
+                 "maquina": platform.machine(), "nucleos": os.cpu_count(),
+                 "repeticoes": repeticoes, "motores": {}}
+    for motor in motores:
+        print(f"TTS: medindo {motor} ({repeticoes} repetição(ões) de {len(CORPUS)} frases)...")
+        r = rodar_filho(motor, repeticoes, pasta_gravar)
+        if "frases" in r:
+            r["resumo"] = resumir(r["frases"])
+        documento.setdefault("versao", r.get("versao"))
+        documento["motores"][motor] = r
+
+    anterior = None
+    if arq_anterior:
+        with open(arq_anterior, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"\nComparando com {arq_anterior} (versão {anterior.get('versao')}, {anterior.get('data')}).")
+    imprimir(documento, anterior)
+
+    if arq_json is None:
+        pasta_logs = os.path.join(PASTA_ROBO, "logs")
+        os.makedirs(pasta_logs, exist_ok=True)
+        arq_json = os.path.join(pasta_logs, f"benchmark_tts_{documento.get('versao')}_"
+                                            f"{time.strftime('%Y%m%d_%H%M%S')}.json")
+    with open(arq_json, "w", encoding="utf-8") as f:
+        json.dump(documento, f, indent=2, ensure_ascii=False)
+    print(f"\nJSON salvo em {arq_json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,10 @@ import wave
 import sherpa_onnx
 import pygame
 
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+from src.broker_audio import ClienteAudio, ENV_CONCEDIDO, PRIORIDADE_FERRAMENTA
+
 def iniciar_tela():
     # Desativa o driver de áudio do Pygame para não travar o dispositivo ALSA (plughw:)
     # permitindo que arecord e aplay usem o hardware diretamente.
@@ -70,7 +74,29 @@ class BiometriaApp:
         self.mensagem = "Escolha um perfil para cadastrar"
         
         self.extractor = self.carregar_modelo()
-        
+        self._proc_audio = None   # arecord/aplay desta ferramenta em execução
+        self.concessao_audio = self.adquirir_audio()
+
+    def adquirir_audio(self):
+        """Pede o dispositivo ao broker do tirilo.py (substitui o pkill de arecord/aplay).
+        Lançada pelo robô, a concessão já foi obtida em nome desta ferramenta."""
+        if os.environ.get(ENV_CONCEDIDO):
+            return None
+        cliente = ClienteAudio("biometria_setup", PRIORIDADE_FERRAMENTA)
+        if cliente.conectar() and cliente.adquirir(timeout=2.0):
+            print("🔊 [AUDIO] Dispositivo concedido pelo broker do robô.")
+            return cliente
+        cliente.fechar()
+        return None
+
+    def encerrar_audio_anterior(self):
+        """Só o próprio áudio anterior (gravação/playback) é interrompido."""
+        proc = self._proc_audio
+        if proc and proc.poll() is None:
+            proc.terminate()
+            try: proc.wait(timeout=1)
+            except subprocess.TimeoutExpired: proc.kill()
+
     def carregar_modelo(self):
         if not os.path.exists(MODELO):
             print(f"Erro: Modelo não encontrado em {MODELO}")
@@ -104,15 +130,13 @@ class BiometriaApp:
         
         def task():
             try:
-                # Libera o dispositivo de áudio antes de gravar
-                subprocess.run(["pkill", "-9", "arecord"], stderr=subprocess.DEVNULL)
-                subprocess.run(["pkill", "-9", "aplay"],  stderr=subprocess.DEVNULL)
-                subprocess.run(["pkill", "-9", "mpg123"], stderr=subprocess.DEVNULL)
-                time.sleep(0.5)
+                # O dispositivo já é desta ferramenta (broker); só encerra o próprio playback
+                self.encerrar_audio_anterior()
 
                 print(f"🎤 [GRAVANDO] {perfil.upper()} em {DISPOSITIVO_AUDIO}...")
                 cmd = ["arecord", "-D", DISPOSITIVO_AUDIO, "-f", "S16_LE", "-r", "16000", "-d", str(duracao), "-c", "1", arquivo_wav]
                 proc = subprocess.Popen(cmd, stderr=subprocess.PIPE)
+                self._proc_audio = proc
 
                 for i in range(duracao * 10):
                     if not self.running: break
@@ -152,15 +176,15 @@ class BiometriaApp:
                 return
             try:
                 print(f"🔊 [PLAYBACK] Ouvindo {arquivo_wav}...")
-                subprocess.run(["pkill", "-9", "arecord"], stderr=subprocess.DEVNULL)
-                subprocess.run(["pkill", "-9", "aplay"],  stderr=subprocess.DEVNULL)
-                subprocess.run(["pkill", "-9", "mpg123"], stderr=subprocess.DEVNULL)
-                time.sleep(0.4)
+                self.encerrar_audio_anterior()
 
-                res = subprocess.run(["aplay", "-D", DISPOSITIVO_AUDIO, "-q", arquivo_wav], capture_output=True, text=True)
-                if res.returncode != 0:
-                    print(f"🚨 ERRO ALSA: {res.stderr.strip()}")
-                    self.mensagem = f"Erro no áudio: {res.stderr.strip()[:60]}"
+                proc = subprocess.Popen(["aplay", "-D", DISPOSITIVO_AUDIO, "-q", arquivo_wav],
+                                        stderr=subprocess.PIPE, text=True)
+                self._proc_audio = proc
+                _, erro = proc.communicate()
+                if proc.returncode > 0:
+                    print(f"🚨 ERRO ALSA: {erro.strip()}")
+                    self.mensagem = f"Erro no áudio: {erro.strip()[:60]}"
                 else:
                     print(f"⏹️ [PLAYBACK] Fim do áudio.")
             except Exception as e:
@@ -305,6 +329,9 @@ class BiometriaApp:
         except Exception as e:
             print(f"🚨 CRASH no Loop Principal: {e}")
         finally:
+            self.encerrar_audio_anterior()
+            if self.concessao_audio:
+                self.concessao_audio.fechar()   # devolve o dispositivo ao robô
             pygame.quit()
             print("--- Aplicação Encerrada ---")
 
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+ARQUIVO: ferramentas/teste_cache_respostas.py
+DESCRIÇÃO: Confere o cache de respostas da IA (src/cache_respostas.py) sem robô
+           nem Gemini: guarda algumas perguntas num arquivo temporário e verifica
+           quais falas voltam do cache (exata ou vizinha acima do limiar) e quais
+           não podem voltar — negação diferente ("não gosta" × "gosta"), outra
+           pergunta parecida. Também confere `autonoma()`, que decide se uma
+           pergunta feita no meio da conversa pode ser guardada.
+
+           Mostra a similaridade de cada acerto. Sai com código 1 se algum caso
+           falhar.
+
+USO:
+  python3 ferramentas/teste_cache_respostas.py
+  python3 ferramentas/teste_cache_respostas.py --limiar 0.85
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+PASTA_ROBO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PASTA_ROBO)
+
+from src.cache_respostas import CacheRespostas, autonoma
+
+GUARDADAS = {
+    "qual seu nome": "Meu nome é Tirilo!",
+    "você gosta de brincar de esconde esconde": "Eu adoro brincar de esconde-esconde!",
+    "você não gosta de chuva": "Eu gosto sim, a chuva molha as plantas.",
+    "o que o leão come": "O leão come carne.",
+}
+
+# (fala, resposta esperada ou None)
+BUSCAS = [
+    ("Qual é o seu nome?", "qual seu nome"),
+    ("qual o nome do seu pai", None),
+    ("Você gosta de brincar de esconde-esconde?", "você gosta de brincar de esconde esconde"),
+    ("você não gosta de brincar de esconde esconde", None),
+    ("você nunca brinca de esconde esconde", None),
+    ("você gosta de chuva", None),
+    ("você não gosta da chuva", "você não gosta de chuva"),
+    ("o que o leão come?", "o que o leão come"),
+]
+
+# (pergunta, se entende sem o que foi dito antes)
+AUTONOMAS = [
+    ("o que o leão come", True),
+    ("qual seu nome", True),
+    ("você gosta de brincar de esconde esconde", True),
+    ("e o que ele come", False),
+    ("conta mais um pouco", False),
+    ("e depois o que aconteceu", False),
+    ("por que ela fez isso", False),
+]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--limiar", type=float, default=0.9)
+    args = ap.parse_args()
+
+    pasta = tempfile.mkdtemp(prefix="tirilo_cache_")
+    falhas = 0
+    try:
+        cache = CacheRespostas(os.path.join(pasta, "respostas.json"), limiar=args.limiar)
+        for pergunta, resposta in GUARDADAS.items():
+            cache.guardar(pergunta, "perfil", "CRIANCA", resposta, versao="v1")
+
+        print(f"{'fala':<50} {'esperado':<8} {'achou':<8} {'sim':>5}")
+        for fala, esperada in BUSCAS:
+            achado = cache.buscar(fala, "perfil", "CRIANCA", "v1")
+            resposta, sim = achado if achado else (None, 0.0)
+            ok = resposta == (GUARDADAS[esperada] if esperada else None)
+            falhas += not ok
+            print(f"{fala[:50]:<50} {'acerto' if esperada else '-':<8} {'acerto' if resposta else '-':<8} "
+                  f"{sim:>5.2f} {'OK' if ok else 'FALHOU'}")
+
+        print(f"\n{'pergunta':<50} {'autônoma':<8}")
+        for pergunta, esperado in AUTONOMAS:
+            ok = autonoma(pergunta) == esperado
+            falhas += not ok
+            print(f"{pergunta[:50]:<50} {'sim' if esperado else 'não':<8} {'OK' if ok else 'FALHOU'}")
+    finally:
+        shutil.rmtree(pasta, ignore_errors=True)
+
+    print(f"\n{falhas} falha(s).")
+    sys.exit(1 if falhas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -33,6 +33,17 @@ SHERPA_DIR="$HOME/projeto_robo/robo_tirilo/vozes_sherpa"
 mkdir -p "$SHERPA_DIR"
 # Os modelos Sherpa vêm em pacotes .tar.bz2 e podem ser baixados via ferramentas/testar_vozes_sherpa.py
 
+# 5b. Diretório do reconhecimento de fala local (STT streaming sherpa-onnx)
+echo "-> Preparando diretório de modelos STT..."
+STT_DIR="$HOME/projeto_robo/robo_tirilo/modelos_stt"
+mkdir -p "$STT_DIR"
+# Extraia aqui um modelo streaming (zipformer/paraformer) pt-BR do sherpa-onnx:
+# tokens.txt + encoder/decoder(/joiner).onnx. Sem modelo, o robô usa o Google.
+KWS_DIR="$HOME/projeto_robo/robo_tirilo/modelos_kws"
+mkdir -p "$KWS_DIR"
+# Modelo de keyword spotting (zipformer KWS do sherpa-onnx) para "parar", "doutor tirilo"
+# e comandos de movimento; o arquivo de palavras é gerado pelo robô no boot.
+
 # 6. Preparar diretório e modelo de Biometria Vocal (sherpa-onnx / wespeaker)
 echo "-> Preparando diretório de biometria..."
 BIOMETRIA_DIR="$HOME/projeto_robo/robo_tirilo/biometria"
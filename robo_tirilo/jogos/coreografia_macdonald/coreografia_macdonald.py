@@ -18,6 +18,11 @@ except ImportError:
     print("ERRO: Arquivo olhos_tirilo.py não encontrado no diretório!")
     sys.exit(1)
 
+try:
+    from src.preaquecimento_jogo import aguardar_vez
+except ImportError:
+    aguardar_vez = lambda: None
+
 
 # Sincronia Global
 IMAGEM_ATUAL = "fazenda"
@@ -223,19 +228,6 @@ def iniciar_player_visual():
     os.environ['SDL_VIDEO_CENTERED'] = '1'
     os.environ["SDL_MOUSEDRV"] = "evdev"
     os.environ["SDL_MOUSEDEV"] = "/dev/input/event3"
-    
-    pygame.init()
-    try:
-        info = pygame.display.Info()
-        w, h = info.current_w, info.current_h
-        tela = pygame.display.set_mode((w, h), pygame.FULLSCREEN)
-    except:
-        w, h = 800, 480
-        tela = pygame.display.set_mode((w, h))
-
-    pygame.mouse.set_visible(False)
-    pygame.display.set_caption("Tirilo Coreografia Player")
-    PRETO = (0, 0, 0)
 
     # Carrega as imagens temáticas
     # Assets: Fazenda, Personagem, Cavalo, bichos e versões com som (balão)
@@ -244,20 +236,41 @@ def iniciar_player_visual():
         "vaca.png", "porco.png", "dog.png", "pato.png", "sheep.png",
         "vaca_som.png", "porco_som.png", "dog_som.png", "pato_som.png", "sheep_som.png"
     ]
-    imagens_dict = {}
     dir_atual = os.path.join(os.path.dirname(os.path.abspath(__file__)), "imagens")
     print(f"[UI] Carregando imagens de: {dir_atual}")
 
+    # Decodifica os PNGs antes da tela existir (pode rodar pré-aquecido, enquanto o robô fala)
+    imagens_brutas = {}
     for arq in arquivos_img:
         caminho = os.path.join(dir_atual, arq)
         if os.path.exists(caminho):
             try:
-                img = pygame.image.load(caminho).convert_alpha()
-                img = pygame.transform.smoothscale(img, (w, h))
-                nome_sem_ext = arq.split('.')[0]
-                imagens_dict[nome_sem_ext] = img
+                imagens_brutas[arq.split('.')[0]] = pygame.image.load(caminho)
             except Exception as e:
                 print(f"Erro ao carregar {arq}: {e}")
+
+    # Daqui em diante usa tela e servos: espera o tirilo liberar
+    aguardar_vez()
+
+    pygame.init()
+    try:
+        info = pygame.display.Info()
+        w, h = info.current_w, info.current_h
+        tela = pygame.display.set_mode((w, h), pygame.FULLSCREEN)
+    except:
+        w, h = 800, 480
+        tela = pygame.display.set_mode((w, h))
+
+    pygame.mouse.set_visible(False)
+    pygame.display.set_caption("Tirilo Coreografia Player")
+    PRETO = (0, 0, 0)
+
+    imagens_dict = {}
+    for nome_sem_ext, img in imagens_brutas.items():
+        try:
+            imagens_dict[nome_sem_ext] = pygame.transform.smoothscale(img.convert_alpha(), (w, h))
+        except Exception as e:
+            print(f"Erro ao preparar {nome_sem_ext}: {e}")
     
     print(f"[UI] Imagens carregadas: {list(imagens_dict.keys())}")
 
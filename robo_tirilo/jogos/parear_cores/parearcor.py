@@ -11,6 +11,8 @@ import math
 import subprocess
 import time
 import socket
+import json
+import itertools
 
 PASTA_JOGO = os.path.dirname(os.path.abspath(__file__))
 PASTA_ROBO = os.path.dirname(os.path.dirname(PASTA_JOGO))  # robo_tirilo/
@@ -21,6 +23,11 @@ try:
 except ImportError:
     ControladorOlhos = None
 
+try:
+    from src.preaquecimento_jogo import aguardar_vez
+except ImportError:
+    aguardar_vez = lambda: None
+
 # ============ CONFIGURAÇÃO ============
 LARGURA, ALTURA = 800, 480
 FPS = 50
@@ -63,49 +70,64 @@ def iniciar_pygame():
     pygame.mouse.set_visible(False)
     return tela
 
-# ============ VOZ (espeak-ng) com animação de boca ============
+# ============ VOZ (servidor do Tirilo ou espeak-ng) com animação de boca ============
+_ids_fala = itertools.count()
+ESTADOS_FINAIS = ("fim", "interrompido", "cancelado")
+
+
+def _falar_servidor(texto):
+    """Pede a fala ao servidor de voz do Tirilo (UDP 5050) e espera o estado final.
+    False se ninguém confirmou o pedido (tirilo.py parado ou jogo standalone)."""
+    ident = f"parearcor-{os.getpid()}-{next(_ids_fala)}"
+    pedido = json.dumps({"texto": texto, "prioridade": "jogo", "id": ident}).encode("utf-8")
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        s.connect(('localhost', 5050))
+        s.settimeout(0.5)
+        estado = None
+        try:
+            s.send(pedido)
+            while estado not in ESTADOS_FINAIS:
+                resposta = json.loads(s.recv(512).decode("utf-8"))
+                if resposta.get("id") != ident:
+                    continue
+                estado = resposta.get("estado")
+                s.settimeout(60)   # confirmado: a fala pode esperar a fila
+        except (socket.timeout, OSError, ValueError):
+            # Sem confirmação (ConnectionRefusedError = porta sem ouvinte) → fallback
+            return estado is not None
+    return True
+
+
 def falar_async(texto, olhos=None):
-    """Envia texto para o servidor de voz do Tirilo (UDP 5050).
-    Se ninguém estiver ouvindo (rodando standalone), usa espeak como fallback.
-    Detecção: connect()+recv() — Linux devolve ConnectionRefusedError via ICMP
-    quando a porta não tem ouvinte, mesmo em UDP localhost."""
+    """Fala sem travar o jogo. Retorna um Event setado quando a fala termina,
+    para o jogo esperar a frase em vez de dormir um tempo fixo.
+    Usa o servidor de voz do Tirilo; sem ele (standalone) usa espeak-ng."""
+    terminou = threading.Event()
+
     def _falar():
-        servidor_ativo = False
         try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(('localhost', 5050))  # Não envia nada, só define destino
-            s.settimeout(0.15)
-            s.send(texto.encode('utf-8'))
-            try:
-                s.recv(1)           # Aguarda ICMP port-unreachable
-                servidor_ativo = True  # Recebeu algo — servidor respondeu
-            except socket.timeout:
-                servidor_ativo = True  # Timeout = pacote entregue, servidor recebeu
-            except ConnectionRefusedError:
-                servidor_ativo = False # ICMP unreachable = ninguém ouvindo
-            s.close()
-        except Exception:
-            servidor_ativo = False
-
-        if not servidor_ativo:
+            if _falar_servidor(texto):
+                return
             # Fallback espeak — modo standalone ou tirilo.py não está rodando
-            try:
-                print(f"[VOZ] Servidor UDP indisponível, usando espeak: {texto[:40]}")
-                proc = subprocess.Popen(
-                    ["espeak-ng", "-v", "pt-br", "-s", "145", "-p", "75", texto],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-                if olhos:
-                    while proc.poll() is None:
-                        olhos.mover_boca(random.choice([0, 50, 80, 50, 100]))
-                        time.sleep(random.uniform(0.08, 0.16))
-                    olhos.mover_boca(0)
-                else:
-                    proc.wait()
-            except Exception as e:
-                print(f"[VOZ] Erro espeak: {e}")
+            print(f"[VOZ] Servidor UDP indisponível, usando espeak: {texto[:40]}")
+            proc = subprocess.Popen(
+                ["espeak-ng", "-v", "pt-br", "-s", "145", "-p", "75", texto],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+            )
+            if olhos:
+                while proc.poll() is None:
+                    olhos.mover_boca(random.choice([0, 50, 80, 50, 100]))
+                    time.sleep(random.uniform(0.08, 0.16))
+                olhos.mover_boca(0)
+            else:
+                proc.wait()
+        except Exception as e:
+            print(f"[VOZ] Erro espeak: {e}")
+        finally:
+            terminou.set()
 
     threading.Thread(target=_falar, daemon=True).start()
+    return terminou
 
 # ============ FOGOS DE ARTIFÍCIO ============
 class Particula:
@@ -130,6 +152,7 @@ class Particula:
 
 # ============ JOGO ============
 def main():
+    aguardar_vez()   # pré-aquecido pelo tirilo: pygame já importado, espera a fala acabar
     tela = iniciar_pygame()
     W, H = tela.get_width(), tela.get_height()
     clock = pygame.time.Clock()
@@ -169,9 +192,9 @@ def main():
         
         # Verifica se atingiu o limite de rodadas (telas limpas)
         if rodadas_vencidas[0] >= MAX_RODADAS:
-            falar_async("Você foi fantástico! Brincamos bastante por hoje. Até a próxima!", olhos)
+            fim_fala = falar_async("Você foi fantástico! Brincamos bastante por hoje. Até a próxima!", olhos)
             if olhos: threading.Thread(target=olhos.surpresa, daemon=True).start()
-            pygame.time.wait(6000)
+            fim_fala.wait(15)   # sai quando a despedida termina
             rodando = False
             return
 
@@ -263,10 +286,10 @@ def main():
                                     "Muito bem! Que inteligente!",
                                     "Fantástico! Continue assim!",
                                 ]
-                                falar_async(random.choice(frases), olhos)
+                                fim_fala = falar_async(random.choice(frases), olhos)
                                 if olhos:
                                     threading.Thread(target=olhos.surpresa, daemon=True).start()
-                                pygame.time.wait(3500)
+                                fim_fala.wait(10)   # nova rodada quando o parabéns termina
                                 novo_round()
                             else:
                                 falar_async("Boa! Continue arrastando os outros.", olhos)
@@ -0,0 +1,173 @@
+"""
+Cancelamento de eco acústico (AEC) usando a própria fala do robô como referência.
+
+- ReferenciaEco: fila com o PCM enviado ao alto-falante (far-end), já em 16 kHz.
+  falar() registra o áudio no instante em que começa a tocar; a thread de
+  captura consome a fila no mesmo ritmo do microfone, então a referência fica
+  alinhada ao sinal gravado (mais um atraso fixo de saída).
+- CanceladorEco: filtro adaptativo NLMS em blocos no domínio da frequência,
+  particionado (PBFDAF, overlap-save). Cobre `taps` amostras de resposta
+  do ambiente com custo de poucas FFTs por bloco e subtrai o eco estimado
+  do microfone antes do VAD e do barge-in.
+"""
+import threading
+
+import numpy as np
+
+from src.reamostragem import Reamostrador
+
+
+class ReferenciaEco:
+    """Far-end alinhado ao relógio da captura."""
+
+    def __init__(self, taxa=16000, atraso_ms=40):
+        self.taxa = taxa
+        self.atraso = int(taxa * atraso_ms / 1000)   # latência de saída (aplay/ALSA)
+        self._blocos = []
+        self._disponivel = 0
+        self._reamostrador = None
+        self._lock = threading.Lock()
+
+    @property
+    def ativa(self):
+        return self._disponivel > 0
+
+    def tocar(self, amostras, taxa):
+        """Registra o áudio que está começando a tocar no alto-falante.
+        Chamado bloco a bloco pela saída persistente: a reamostragem é em streaming."""
+        amostras = np.asarray(amostras, dtype=np.int16)
+        with self._lock:
+            inicio = self._disponivel == 0
+            if taxa != self.taxa:
+                if self._reamostrador is None or self._reamostrador.taxa_entrada != taxa:
+                    self._reamostrador = Reamostrador(taxa, self.taxa)
+                elif inicio:
+                    self._reamostrador.reiniciar()
+                amostras = self._reamostrador.processar(amostras)
+            if inicio and self.atraso:
+                self._blocos.append(np.zeros(self.atraso, dtype=np.int16))
+                self._disponivel += self.atraso
+            self._blocos.append(amostras)
+            self._disponivel += len(amostras)
+
+    def limpar(self):
+        """Fala interrompida: descarta o restante da referência."""
+        with self._lock:
+            self._blocos.clear()
+            self._disponivel = 0
+
+    def ler(self, n):
+        """Próximas `n` amostras do far-end (zeros quando nada está tocando)."""
+        saida = np.zeros(n, dtype=np.int16)
+        if self._disponivel == 0:
+            return saida
+        with self._lock:
+            pos = 0
+            while pos < n and self._blocos:
+                bloco = self._blocos[0]
+                k = min(n - pos, len(bloco))
+                saida[pos:pos + k] = bloco[:k]
+                pos += k
+                if k == len(bloco):
+                    self._blocos.pop(0)
+                else:
+                    self._blocos[0] = bloco[k:]
+            self._disponivel -= pos
+        return saida
+
+
+class CanceladorEco:
+    """PBFDAF: NLMS particionado no domínio da frequência.
+
+    `processar(mic, ref)` recebe blocos int16 de mesmo tamanho (qualquer
+    tamanho; internamente agrupa em blocos de `bloco` amostras) e devolve o
+    microfone sem o eco. Sem referência ativa, o sinal passa direto.
+    """
+
+    def __init__(self, bloco=256, taps=2048, passo=0.5, geigel=1.0, esquecimento=0.9):
+        self.N = bloco
+        self.P = max(1, -(-taps // bloco))
+        self.passo = passo
+        self.geigel = geigel          # dupla fala: |mic| > geigel * max|ref| congela a adaptação
+                                      # (depende do ganho do alto-falante; medir com benchmark_aec.py)
+        self.esquecimento = esquecimento
+        self.reiniciar()
+
+    @property
+    def taps(self):
+        return self.N * self.P
+
+    def reiniciar(self):
+        N, P = self.N, self.P
+        self._W = np.zeros((P, N + 1), dtype=np.complex64)
+        self._X = np.zeros((P, N + 1), dtype=np.complex64)
+        self._ref_ant = np.zeros(N, dtype=np.float32)
+        self._potencia = np.full(N + 1, 1e-3, dtype=np.float32)
+        self._max_ref = np.zeros(self.P, dtype=np.float32)   # pico da referência por bloco recente
+        self._pend_mic = np.zeros(0, dtype=np.float32)
+        self._pend_ref = np.zeros(0, dtype=np.float32)
+        self._cauda = 0    # blocos restantes com eco possível após a referência silenciar
+
+    def processar(self, mic, ref):
+        mic = np.asarray(mic, dtype=np.float32)
+        ref = np.asarray(ref, dtype=np.float32)
+        self._pend_mic = np.concatenate((self._pend_mic, mic))
+        self._pend_ref = np.concatenate((self._pend_ref, ref))
+        n_blocos = len(self._pend_mic) // self.N
+        if n_blocos == 0:
+            return np.zeros(0, dtype=np.int16)
+        saida = np.empty(n_blocos * self.N, dtype=np.float32)
+        for b in range(n_blocos):
+            ini = b * self.N
+            saida[ini:ini + self.N] = self._bloco(self._pend_mic[ini:ini + self.N],
+                                                  self._pend_ref[ini:ini + self.N])
+        usado = n_blocos * self.N
+        self._pend_mic = self._pend_mic[usado:]
+        self._pend_ref = self._pend_ref[usado:]
+        return np.clip(np.rint(saida), -32768, 32767).astype(np.int16)
+
+    def _bloco(self, d, x):
+        N = self.N
+        pico = float(np.max(np.abs(x)))
+        if pico > 0:
+            self._cauda = self.P
+        elif self._cauda == 0:
+            self._ref_ant = x
+            return d                      # nada tocando e sem cauda de eco: passa direto
+        else:
+            self._cauda -= 1
+
+        # Espectros das últimas P partições da referência (a mais nova em 0)
+        self._X = np.roll(self._X, 1, axis=0)
+        Xn = np.fft.rfft(np.concatenate((self._ref_ant, x)))
+        self._X[0] = Xn
+        self._ref_ant = x
+        self._max_ref = np.roll(self._max_ref, 1)
+        self._max_ref[0] = pico
+
+        y = np.fft.irfft(np.sum(self._X * self._W, axis=0))[N:]
+        e = d - y
+
+        # Adapta só com referência presente e sem dupla fala (Geigel)
+        if self._max_ref.max() > 0 and not self._dupla_fala(d):
+            a = self.esquecimento
+            self._potencia = a * self._potencia + (1 - a) * (np.abs(Xn) ** 2)
+            E = np.fft.rfft(np.concatenate((np.zeros(N, dtype=np.float32), e)))
+            G = self.passo * np.conj(self._X) * E / (self._potencia * self.P + 1e-3)
+            # Restrição de gradiente: mantém o filtro causal com N taps por partição
+            g = np.fft.irfft(G, axis=1)
+            g[:, N:] = 0
+            self._W += np.fft.rfft(g, axis=1).astype(np.complex64)
+        return e
+
+    def _dupla_fala(self, d):
+        """Geigel: pico do microfone acima de `geigel` x o pico recente da referência."""
+        return np.max(np.abs(d)) > self.geigel * self._max_ref.max()
+
+
+def erle_db(mic, saida):
+    """Echo Return Loss Enhancement: energia do microfone / energia após o AEC."""
+    mic = np.asarray(mic, dtype=np.float64)
+    saida = np.asarray(saida, dtype=np.float64)
+    n = min(len(mic), len(saida))
+    return 10 * np.log10((np.dot(mic[:n], mic[:n]) + 1e-9) / (np.dot(saida[:n], saida[:n]) + 1e-9))
@@ -0,0 +1,184 @@
+"""
+Agenda das falas pedidas de fora do loop principal (servidor UDP 5050, toques).
+
+Antes cada datagrama do _servidor_voz() e cada falar_prioridade() abria uma
+thread com falar(): dois jogos mandando frases juntos disputavam o _lock_falar
+em ordem arbitrária, a mesma frase podia tocar duas vezes seguidas e o jogo não
+tinha como saber quando a fala acabou (dormia um tempo fixo). Aqui uma única
+thread fala um pedido por vez:
+
+- prioridades "sistema" > "jogo" > "conversa"; na mesma prioridade, ordem de
+  chegada. Um pedido de prioridade maior corta a fala em curso de prioridade
+  menor, que termina como "interrompido";
+- frase igual (texto normalizado, a mesma chave do cache de voz) a uma que está
+  na fila ou tocando não é repetida: o pedido novo é agrupado ao existente e
+  recebe o mesmo desfecho;
+- `cancelar()` tira pedidos da fila e corta a fala em curso (tudo, por origem
+  ou por id);
+- cada pedido termina com um estado ("fim", "interrompido", "cancelado")
+  entregue a `ao_terminar(estado)` — o servidor UDP devolve ao cliente.
+
+Protocolo UDP: texto puro (clientes antigos) continua valendo. Em JSON,
+{"texto", "prioridade", "id"} é confirmado na hora com {"id", "estado": "aceito"}
+e depois recebe o estado final; {"cancelar": true, "id"} cancela.
+"""
+import itertools
+import json
+import threading
+
+from src.cache_voz import normalizar_texto
+
+PRIORIDADES = {"sistema": 0, "jogo": 1, "conversa": 2}
+ESTADOS_FINAIS = ("fim", "interrompido", "cancelado")
+
+
+def ler_mensagem(dados):
+    """Datagrama → dict. Texto puro vira {"texto": ...}."""
+    texto = dados.decode("utf-8", errors="ignore").strip()
+    if texto.startswith("{"):
+        try:
+            msg = json.loads(texto)
+            if isinstance(msg, dict):
+                return msg
+        except ValueError:
+            pass
+    return {"texto": texto}
+
+
+def mensagem_estado(ident, estado):
+    return json.dumps({"id": ident, "estado": estado}).encode("utf-8")
+
+
+class Pedido:
+    def __init__(self, texto, prioridade, origem, ident, seq):
+        self.texto = texto
+        self.chave = normalizar_texto(texto)
+        self.prioridade = prioridade
+        self.nivel = PRIORIDADES[prioridade]
+        self.origem = origem
+        self.id = ident
+        self.seq = seq
+        self.avisos = []             # ao_terminar de cada pedido agrupado neste
+        self.iniciado = False        # falar() já está com a saída
+        self.cancelado = False
+        self.cortado = False         # já mandou interromper (não corta de novo)
+        self.reenfileirado = False   # _frases() devolveu à fila (há pedido mais urgente)
+        self.estado = None
+        self.terminou = threading.Event()
+
+
+class AgendaFala:
+    """`falar(frases)` fala um iterável de frases e retorna True se chegou ao
+    fim (falar_frases); `interromper()` corta a fala em curso."""
+
+    def __init__(self, falar, interromper):
+        self.falar = falar
+        self.interromper = interromper
+        self._fila = []
+        self._atual = None
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def pedir(self, texto, prioridade="jogo", origem=None, ident=None, ao_terminar=None):
+        """Agenda `texto` e devolve o Pedido (o já existente, se agrupado)."""
+        if prioridade not in PRIORIDADES:
+            prioridade = "jogo"
+        novo = Pedido(texto, prioridade, origem, ident, next(self._seq))
+        with self._cond:
+            existente = next((p for p in [self._atual, *self._fila]
+                              if p is not None and not p.cancelado and p.chave == novo.chave), None)
+            if existente is not None:
+                if ao_terminar:
+                    existente.avisos.append(ao_terminar)
+                if existente is not self._atual and novo.nivel < existente.nivel:
+                    existente.nivel = novo.nivel   # sobe na fila, mantém a ordem de chegada
+                print(f"[VOZ] Agenda: '{novo.chave[:30]}' já na fila, agrupado.")
+                return existente
+            if ao_terminar:
+                novo.avisos.append(ao_terminar)
+            self._fila.append(novo)
+            atual = self._atual
+            if atual is not None and atual.iniciado and not atual.cortado and novo.nivel < atual.nivel:
+                atual.cortado = True
+                print(f"[VOZ] Agenda: '{novo.chave[:30]}' ({prioridade}) corta "
+                      f"'{atual.chave[:30]}' ({atual.prioridade}).")
+                # Ainda sob o lock: a thread não passa ao próximo pedido antes do corte
+                self.interromper()
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._executar, daemon=True)
+                self._thread.start()
+        return novo
+
+    def cancelar(self, origem=None, ident=None):
+        """Cancela os pedidos de `origem`/`ident` (todos, sem filtro). Retorna quantos."""
+        def casa(p):
+            return ((origem is None or p.origem == origem) and
+                    (ident is None or p.id == ident))
+        with self._cond:
+            removidos = [p for p in self._fila if casa(p)]
+            self._fila = [p for p in self._fila if not casa(p)]
+            atual = self._atual if self._atual is not None and casa(self._atual) else None
+            if atual is not None:
+                atual.cancelado = True
+                if atual.iniciado:
+                    self.interromper()
+        for p in removidos:
+            p.cancelado = True
+            self._terminar(p, "cancelado")
+        return len(removidos) + (atual is not None)
+
+    @property
+    def pendentes(self):
+        with self._cond:
+            return len(self._fila) + (self._atual is not None)
+
+    # --- Thread de fala ---
+    def _frases(self, pedido):
+        # Consumido pelo falar() já com a saída em mãos: o que foi cancelado ou
+        # passado para trás enquanto esperava o _lock_falar não chega a tocar
+        with self._cond:
+            if pedido.cancelado:
+                return
+            if any(p.nivel < pedido.nivel for p in self._fila):
+                self._fila.append(pedido)   # volta para a fila com o mesmo seq
+                pedido.reenfileirado = True
+                self._cond.notify()
+                return
+            pedido.iniciado = True
+        yield pedido.texto
+
+    def _executar(self):
+        while True:
+            with self._cond:
+                while not self._fila:
+                    self._cond.wait()
+                pedido = min(self._fila, key=lambda p: (p.nivel, p.seq))
+                self._fila.remove(pedido)
+                pedido.reenfileirado = False
+                self._atual = pedido
+            completo = False
+            try:
+                completo = self.falar(self._frases(pedido))
+            except Exception as e:
+                print(f"[VOZ] Agenda: erro falando '{pedido.chave[:30]}': {e}")
+            with self._cond:
+                self._atual = None
+                adiado = pedido.reenfileirado
+            if adiado:
+                continue   # volta a ser executado quando sair da fila de novo
+            if pedido.cancelado:
+                estado = "cancelado"
+            else:
+                estado = "fim" if completo else "interrompido"
+            self._terminar(pedido, estado)
+
+    def _terminar(self, pedido, estado):
+        pedido.estado = estado
+        pedido.terminou.set()
+        for aviso in pedido.avisos:
+            try:
+                aviso(estado)
+            except Exception as e:
+                print(f"[VOZ] Agenda: erro avisando o fim ({e}).")
@@ -0,0 +1,249 @@
+"""
+Broker do dispositivo de áudio (EMEET M1A) via Unix socket.
+
+Substitui a arbitragem por `pkill -9 arecord/aplay/mpg123` + sleeps fixos. Quem
+quer usar o dispositivo (tirilo.py, jogos, ferramentas) pede uma concessão com
+prioridade; se o dono atual tiver prioridade menor, o broker pede que ele libere
+("liberar"), espera a confirmação ("liberado") por no máximo `prazo_liberar`
+segundos e então concede ao novo cliente. O cliente preemptado volta para a
+fila e recebe a concessão de novo quando o dispositivo ficar livre.
+
+Protocolo: uma mensagem JSON por linha.
+  cliente → broker: {"op": "adquirir", "nome", "prioridade", "pid"} | {"op": "liberar"} | {"op": "liberado"}
+  broker → cliente: {"op": "concedido"} | {"op": "liberar"}
+
+O broker roda como thread dentro do tirilo.py; também pode rodar sozinho:
+  python3 src/broker_audio.py
+"""
+import itertools
+import json
+import os
+import socket
+import threading
+import time
+
+CAMINHO_SOCKET = "/tmp/tirilo_audio.sock"
+ENV_CONCEDIDO = "TIRILO_AUDIO_CONCEDIDO"   # Filho lançado pelo tirilo já com o dispositivo cedido
+
+PRIORIDADE_ROBO = 10
+PRIORIDADE_JOGO = 50
+PRIORIDADE_FERRAMENTA = 50
+
+
+def _enviar(sock, msg):
+    try:
+        sock.sendall((json.dumps(msg) + "\n").encode("utf-8"))
+        return True
+    except OSError:
+        return False
+
+
+def _linhas(sock):
+    buffer = b""
+    while True:
+        try:
+            dados = sock.recv(4096)
+        except OSError:
+            return
+        if not dados:
+            return
+        buffer += dados
+        while b"\n" in buffer:
+            linha, buffer = buffer.split(b"\n", 1)
+            try:
+                yield json.loads(linha)
+            except ValueError:
+                continue
+
+
+class _Sessao:
+    def __init__(self, sock):
+        self.sock = sock
+        self.nome = "?"
+        self.prioridade = 0
+        self.pid = None
+        self.ordem = 0
+        self.liberado = threading.Event()
+
+
+class BrokerAudio:
+    """Servidor: mantém o dono do dispositivo e a fila de espera por prioridade."""
+
+    def __init__(self, caminho=CAMINHO_SOCKET, prazo_liberar=1.0):
+        self.caminho = caminho
+        self.prazo_liberar = prazo_liberar
+        self._dono = None
+        self._fila = []
+        self._lock = threading.RLock()
+        self._contador = itertools.count()
+        self._servidor = None
+
+    @staticmethod
+    def ativo(caminho=CAMINHO_SOCKET):
+        """True se já existe um broker respondendo nesse socket."""
+        s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            s.connect(caminho)
+            return True
+        except OSError:
+            return False
+        finally:
+            s.close()
+
+    def iniciar(self):
+        if os.path.exists(self.caminho):
+            os.unlink(self.caminho)   # socket órfão de uma execução anterior
+        self._servidor = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._servidor.bind(self.caminho)
+        os.chmod(self.caminho, 0o666)
+        self._servidor.listen(8)
+        threading.Thread(target=self._aceitar, daemon=True).start()
+        print(f"Audio: Broker do dispositivo ativo em {self.caminho}")
+
+    def _aceitar(self):
+        while True:
+            try:
+                sock, _ = self._servidor.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._atender, args=(_Sessao(sock),), daemon=True).start()
+
+    def _atender(self, sessao):
+        for msg in _linhas(sessao.sock):
+            op = msg.get("op")
+            if op == "adquirir":
+                sessao.nome = msg.get("nome", "?")
+                sessao.prioridade = int(msg.get("prioridade", 0))
+                sessao.pid = msg.get("pid")
+                self._pedir(sessao)
+            elif op == "liberado":
+                sessao.liberado.set()
+            elif op == "liberar":
+                self._soltar(sessao)
+        # Conexão fechada (cliente terminou ou morreu): libera o que ele tinha
+        self._soltar(sessao)
+        try: sessao.sock.close()
+        except OSError: pass
+
+    def _pedir(self, sessao):
+        with self._lock:
+            sessao.ordem = next(self._contador)
+            dono = self._dono
+            if dono is None:
+                self._conceder(sessao)
+                return
+            if sessao.prioridade <= dono.prioridade:
+                self._fila.append(sessao)
+                print(f"Audio: '{sessao.nome}' aguardando (dono: '{dono.nome}').")
+                return
+        # Preempção fora do lock: espera a confirmação do dono atual
+        t0 = time.monotonic()
+        dono.liberado.clear()
+        _enviar(dono.sock, {"op": "liberar"})
+        if not dono.liberado.wait(self.prazo_liberar):
+            print(f"Audio: '{dono.nome}' não confirmou em {self.prazo_liberar}s; concedendo mesmo assim.")
+        with self._lock:
+            if self._dono is dono:
+                self._fila.append(dono)   # volta a receber quando o dispositivo ficar livre
+                self._conceder(sessao)
+            else:
+                self._fila.append(sessao)
+                self._proximo()
+        print(f"Audio: '{sessao.nome}' preemptou '{dono.nome}' em {(time.monotonic() - t0) * 1000:.0f} ms.")
+
+    def _conceder(self, sessao):
+        self._dono = sessao
+        _enviar(sessao.sock, {"op": "concedido"})
+
+    def _proximo(self):
+        if self._dono is None and self._fila:
+            self._fila.sort(key=lambda s: (-s.prioridade, s.ordem))
+            self._conceder(self._fila.pop(0))
+
+    def _soltar(self, sessao):
+        with self._lock:
+            if sessao in self._fila:
+                self._fila.remove(sessao)
+            if self._dono is sessao:
+                self._dono = None
+                self._proximo()
+
+
+class ClienteAudio:
+    """Cliente do broker.
+
+    `ao_preemptar()` é chamado quando alguém de prioridade maior pede o
+    dispositivo: deve parar de usá-lo e retornar (a confirmação é enviada
+    logo depois). `ao_retomar()` é chamado quando a concessão volta.
+    """
+
+    def __init__(self, nome, prioridade, ao_preemptar=None, ao_retomar=None, caminho=CAMINHO_SOCKET):
+        self.nome = nome
+        self.prioridade = prioridade
+        self.ao_preemptar = ao_preemptar
+        self.ao_retomar = ao_retomar
+        self.caminho = caminho
+        self._sock = None
+        self._concedido = threading.Event()
+        self._preemptado = False
+
+    @property
+    def concedido(self):
+        return self._concedido.is_set()
+
+    def conectar(self):
+        try:
+            self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._sock.connect(self.caminho)
+        except OSError:
+            self._sock = None
+            return False
+        threading.Thread(target=self._ouvir, daemon=True).start()
+        return True
+
+    def adquirir(self, timeout=5.0):
+        """Pede o dispositivo e espera a concessão (True se concedido a tempo)."""
+        if self._sock is None:
+            return False
+        self._concedido.clear()
+        _enviar(self._sock, {"op": "adquirir", "nome": self.nome,
+                             "prioridade": self.prioridade, "pid": os.getpid()})
+        return self._concedido.wait(timeout)
+
+    def liberar(self):
+        self._concedido.clear()
+        if self._sock is not None:
+            _enviar(self._sock, {"op": "liberar"})
+
+    def fechar(self):
+        self._concedido.clear()
+        if self._sock is not None:
+            try:
+                self._sock.shutdown(socket.SHUT_RDWR)   # acorda o recv da thread de escuta
+                self._sock.close()
+            except OSError: pass
+            self._sock = None
+
+    def _ouvir(self):
+        for msg in _linhas(self._sock):
+            op = msg.get("op")
+            if op == "concedido":
+                self._concedido.set()
+                if self._preemptado:
+                    self._preemptado = False
+                    if self.ao_retomar:
+                        try: self.ao_retomar()
+                        except Exception as e: print(f"Audio: Erro ao retomar dispositivo ({self.nome}): {e}")
+            elif op == "liberar":
+                self._concedido.clear()
+                self._preemptado = True
+                if self.ao_preemptar:
+                    try: self.ao_preemptar()
+                    except Exception as e: print(f"Audio: Erro ao ceder dispositivo ({self.nome}): {e}")
+                _enviar(self._sock, {"op": "liberado"})
+
+
+if __name__ == "__main__":
+    BrokerAudio().iniciar()
+    while True:
+        time.sleep(3600)
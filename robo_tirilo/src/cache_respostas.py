@@ -0,0 +1,231 @@
+"""
+Cache de respostas da IA para as perguntas que as crianças repetem.
+
+"Qual seu nome?", "Você gosta de quê?", "O que o leão come?" chegam toda
+sessão, e cada uma custava a ida e volta ao Gemini mais os ~2 s do som de
+pensar. A CacheRespostas guarda o texto da resposta por (perfil, modo,
+pergunta normalizada) e devolve na hora — também sem internet:
+
+- busca exata pela pergunta dobrada (minúsculas, sem acentos e pontuação) e,
+  se não houver, o vizinho mais próximo por similaridade de cosseno entre
+  vetores de palavras + trigramas de caracteres (hash em DIMENSAO posições,
+  palavras vazias com peso baixo). "Qual é o seu nome?" acha "qual seu nome"
+  (~0.98); "qual o nome do seu pai" não passa do `limiar` (~0.84). Negações
+  (NEGACOES) têm de bater: "você não gosta de ..." tem ~0.9 com "você gosta
+  de ..." e pediria a resposta oposta;
+- cada entrada lembra a assinatura do prompt do perfil: prompt editado no SaaS
+  não serve resposta velha. Entradas vencem em `ttl_h` horas;
+  `invalidar(clinica=..., perfil=...)` apaga as de uma clínica/perfil
+  (RELOAD_CONFIG, MUDAR_PERFIL);
+- perguntas curtas demais ("e aí?", "sim") ou que dependem do momento
+  ("que horas são", "hoje") não entram — dependem da conversa, não da pergunta.
+  `autonoma()` separa as que continuam a conversa ("e o que ele come", "conta
+  mais um pouco"): com histórico na sessão, só as autônomas são guardadas;
+- o arquivo JSON sobrevive ao reboot (vetores são recalculados na carga).
+
+O áudio não fica aqui: as frases da resposta já foram para a CacheVoz quando
+foram faladas, e `frases_frequentes()` lista as mais usadas para o
+aquecimento do cache de voz re-sintetizá-las quando a voz muda.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from src.intencoes import PALAVRAS_VAZIAS, dobrar
+
+DIMENSAO = 1024
+PESO_VAZIA = 0.25
+EVITAR = frozenset(("hoje", "agora", "ontem", "amanha", "horas", "hora", "data"))
+# Uma palavra que inverte o sentido: o vizinho só vale com as mesmas
+NEGACOES = frozenset(("nao", "nunca", "nem", "jamais", "nenhum", "nenhuma", "ninguem", "nada"))
+# Continuação da conversa: começa com conectivo ou aponta para algo já dito
+CONECTIVOS = frozenset(("e", "mas", "entao", "ai", "tambem"))
+REFERENCIAS = frozenset((
+    "ele", "ela", "eles", "elas", "dele", "dela", "deles", "delas", "nele", "nela",
+    "isso", "disso", "nisso", "esse", "essa", "esses", "essas", "desse", "dessa",
+    "aquele", "aquela", "aquilo", "daquilo", "mais", "outro", "outra", "depois",
+    "continua", "continuar", "novo", "antes", "anterior",
+))
+
+
+def embutir(palavras):
+    """Vetor unitário de palavras (peso 2) e trigramas de caracteres (peso 0.5)."""
+    v = np.zeros(DIMENSAO, np.float32)
+    for p in palavras:
+        peso = PESO_VAZIA if p in PALAVRAS_VAZIAS else 1.0
+        v[zlib.crc32(p.encode()) % DIMENSAO] += 2.0 * peso
+        q = f"<{p}>"
+        for i in range(len(q) - 2):
+            v[zlib.crc32(q[i:i + 3].encode()) % DIMENSAO] += 0.5 * peso
+    norma = np.linalg.norm(v)
+    return v / norma if norma else v
+
+
+def autonoma(pergunta):
+    """Se a pergunta se entende sem o que foi dito antes."""
+    palavras = dobrar(pergunta)
+    return bool(palavras) and palavras[0] not in CONECTIVOS and not REFERENCIAS.intersection(palavras)
+
+
+def assinatura(texto):
+    return hashlib.sha1((texto or "").encode("utf-8")).hexdigest()[:12]
+
+
+class CacheRespostas:
+    """`buscar(pergunta, perfil, modo, versao)` → (resposta, similaridade) ou None;
+    `guardar(...)` depois de uma resposta completa da IA."""
+
+    def __init__(self, arquivo, ttl_h=168, limiar=0.9, max_itens=400, min_palavras=3):
+        self.arquivo = arquivo
+        self.ttl_s = ttl_h * 3600
+        self.limiar = limiar
+        self.max_itens = max_itens
+        self.min_palavras = min_palavras
+        self._lock = threading.Lock()
+        self._itens = {}          # (perfil, modo, pergunta dobrada) → dict
+        self._vetores = {}        # mesma chave → vetor
+        self._salvando = False
+        self._lock_disco = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self._carregar()
+
+    # --- Consulta ---
+    def _chave(self, pergunta, perfil, modo):
+        palavras = dobrar(pergunta)
+        return (str(perfil), modo, " ".join(palavras)), palavras
+
+    def cacheavel(self, pergunta):
+        palavras = dobrar(pergunta)
+        return len(palavras) >= self.min_palavras and not EVITAR.intersection(palavras)
+
+    def buscar(self, pergunta, perfil, modo, versao=None):
+        chave, palavras = self._chave(pergunta, perfil, modo)
+        if len(palavras) < self.min_palavras:
+            return None
+        agora = time.time()
+        with self._lock:
+            item, similaridade = self._itens.get(chave), 1.0
+            if item is None or not self._valido(item, versao, agora):
+                item, similaridade = self._vizinho(chave, palavras, versao, agora)
+            if item is None:
+                self.falhas += 1
+                return None
+            item["usos"] += 1
+            item["usado"] = agora
+            self.acertos += 1
+        self._salvar_no_fundo()
+        return item["resposta"], similaridade
+
+    def _valido(self, item, versao, agora):
+        return agora - item["criado"] <= self.ttl_s and (versao is None or item["versao"] == versao)
+
+    def _vizinho(self, chave, palavras, versao, agora):
+        vetor = embutir(palavras)
+        negacoes = NEGACOES.intersection(palavras)
+        melhor, melhor_sim = None, self.limiar
+        for outra, item in self._itens.items():
+            if outra[:2] != chave[:2] or not self._valido(item, versao, agora):
+                continue
+            if NEGACOES.intersection(outra[2].split()) != negacoes:
+                continue
+            sim = float(vetor @ self._vetores[outra])
+            if sim >= melhor_sim:
+                melhor, melhor_sim = item, sim
+        return melhor, melhor_sim
+
+    # --- Escrita ---
+    def guardar(self, pergunta, perfil, modo, resposta, versao=None, clinica=None):
+        resposta = (resposta or "").strip()
+        if not resposta or not self.cacheavel(pergunta):
+            return False
+        chave, palavras = self._chave(pergunta, perfil, modo)
+        agora = time.time()
+        with self._lock:
+            self._itens[chave] = {"perfil": chave[0], "modo": modo, "pergunta": chave[2],
+                                  "resposta": resposta, "versao": versao, "clinica": clinica,
+                                  "criado": agora, "usado": agora, "usos": 0}
+            self._vetores[chave] = embutir(palavras)
+            self._podar(agora)
+        self._salvar_no_fundo()
+        return True
+
+    def invalidar(self, clinica=None, perfil=None, exceto_versao=None):
+        """Apaga as entradas da clínica e/ou do perfil (sem filtro: todas);
+        com `exceto_versao`, só as de outra versão do prompt."""
+        with self._lock:
+            apagar = [k for k, item in self._itens.items()
+                      if (clinica is None or item["clinica"] == clinica)
+                      and (perfil is None or item["perfil"] == str(perfil))
+                      and (exceto_versao is None or item["versao"] != exceto_versao)]
+            for k in apagar:
+                del self._itens[k], self._vetores[k]
+        if apagar:
+            print(f"[IA] Cache de respostas: {len(apagar)} resposta(s) descartada(s).")
+            self._salvar_no_fundo()
+        return len(apagar)
+
+    def _podar(self, agora):
+        vencidas = [k for k, item in self._itens.items() if agora - item["criado"] > self.ttl_s]
+        excesso = len(self._itens) - len(vencidas) - self.max_itens
+        if excesso > 0:
+            ja = set(vencidas)
+            vivas = sorted((k for k in self._itens if k not in ja),
+                           key=lambda k: (self._itens[k]["usos"], self._itens[k]["usado"]))
+            vencidas += vivas[:excesso]
+        for k in vencidas:
+            del self._itens[k], self._vetores[k]
+
+    def frases_frequentes(self, limite=30):
+        """Respostas mais usadas (para aquecer o cache de voz com a voz atual)."""
+        with self._lock:
+            itens = sorted(self._itens.values(), key=lambda i: i["usos"], reverse=True)
+            return [i["resposta"] for i in itens[:limite] if i["usos"] > 0]
+
+    # --- Disco ---
+    def _carregar(self):
+        try:
+            with open(self.arquivo, encoding="utf-8") as f:
+                itens = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"[IA] Cache de respostas ilegível ({e}); começando vazio.")
+            return
+        for item in itens:
+            chave = (item["perfil"], item["modo"], item["pergunta"])
+            self._itens[chave] = item
+            self._vetores[chave] = embutir(item["pergunta"].split())
+        self._podar(time.time())
+        print(f"[IA] Cache de respostas: {len(self._itens)} resposta(s) carregada(s).")
+
+    def _salvar_no_fundo(self):
+        with self._lock:
+            if self._salvando:
+                return
+            self._salvando = True
+        threading.Thread(target=self._salvar, daemon=True).start()
+
+    def _salvar(self):
+        time.sleep(1.0)   # junta várias alterações seguidas numa escrita
+        with self._lock:
+            self._salvando = False
+            itens = list(self._itens.values())
+        with self._lock_disco:
+            try:
+                os.makedirs(os.path.dirname(self.arquivo) or ".", exist_ok=True)
+                temporario = self.arquivo + ".tmp"
+                with open(temporario, "w", encoding="utf-8") as f:
+                    json.dump(itens, f, ensure_ascii=False)
+                os.replace(temporario, self.arquivo)
+            except OSError as e:
+                print(f"[IA] Erro gravando o cache de respostas: {e}")
+
+    def estado(self):
+        with self._lock:
+            return {"respostas": len(self._itens), "acertos": self.acertos, "falhas": self.falhas}
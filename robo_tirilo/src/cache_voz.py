@@ -0,0 +1,179 @@
+"""
+Cache de fala sintetizada (PCM) em dois níveis.
+
+O robô repete as mesmas frases o tempo todo ("Ummm, deixa eu pensar...",
+"Parei tudo.", "Isso mesmo!", falas dos jogos via UDP). A CacheVoz guarda o
+áudio final de cada frase — já com pitch — indexado pela voz e pelo texto:
+
+- RAM: LRU limitada em bytes (acerto = toca na hora, sem motor de voz);
+- disco: arquivos WAV endereçados pelo conteúdo da chave (sha1 da voz + texto),
+  sobrevivem ao reboot e são podados pelos mais antigos quando passam do limite.
+
+A "voz" é a tupla (motor, modelo, velocidade, pitch). Quando ela muda (ex.:
+RELOAD_CONFIG), a parte em RAM é descartada automaticamente; o disco não
+precisa ser apagado porque a voz faz parte do endereço de cada arquivo.
+"""
+import collections
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+import unicodedata
+import wave
+
+import numpy as np
+
+
+def normalizar_texto(texto):
+    """Forma canônica do texto para a chave (espaços, Unicode e marcação)."""
+    texto = unicodedata.normalize("NFC", str(texto)).replace("*", "").replace("#", "")
+    return re.sub(r"\s+", " ", texto).strip()
+
+
+class CacheVoz:
+    """Cache PCM: `obter(voz, texto)` → (amostras int16, taxa) ou None."""
+
+    def __init__(self, pasta, limite_ram_mb=24, limite_disco_mb=200):
+        self.pasta = pasta
+        self.limite_ram = int(limite_ram_mb * 1024 * 1024)
+        self.limite_disco = int(limite_disco_mb * 1024 * 1024)
+        self._ram = collections.OrderedDict()   # chave → (amostras, taxa)
+        self._bytes_ram = 0
+        self._voz = None
+        self._lock = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        os.makedirs(pasta, exist_ok=True)
+        self._bytes_disco = sum(os.path.getsize(a) for a in self._arquivos())
+
+    @staticmethod
+    def chave(voz, texto):
+        bruto = json.dumps([list(voz), normalizar_texto(texto)], ensure_ascii=False)
+        return hashlib.sha1(bruto.encode("utf-8")).hexdigest()
+
+    def _arquivo(self, chave):
+        return os.path.join(self.pasta, chave[:2], chave + ".wav")
+
+    def _arquivos(self):
+        return glob.glob(os.path.join(self.pasta, "??", "*.wav"))
+
+    def _trocar_voz(self, voz):
+        """Voz nova (motor/modelo/velocidade/pitch): a RAM só tem frases da antiga."""
+        voz = tuple(voz)
+        if voz != self._voz:
+            if self._voz is not None and self._ram:
+                print(f"[VOZ] Cache: voz mudou, descartando {len(self._ram)} frase(s) da RAM.")
+            self._ram.clear()
+            self._bytes_ram = 0
+            self._voz = voz
+
+    # --- Consulta ---
+    def obter(self, voz, texto):
+        chave = self.chave(voz, texto)
+        with self._lock:
+            self._trocar_voz(voz)
+            item = self._ram.get(chave)
+            if item is not None:
+                self._ram.move_to_end(chave)
+                self.acertos += 1
+                return item
+        item = self._ler_disco(chave)
+        with self._lock:
+            if item is None:
+                self.falhas += 1
+                return None
+            self.acertos += 1
+            self._guardar_ram(chave, item)
+        return item
+
+    def contem(self, voz, texto):
+        chave = self.chave(voz, texto)
+        with self._lock:
+            if tuple(voz) == self._voz and chave in self._ram:
+                return True
+        return os.path.exists(self._arquivo(chave))
+
+    # --- Inserção ---
+    def guardar(self, voz, texto, amostras, taxa):
+        amostras = np.ascontiguousarray(amostras, dtype=np.int16)
+        if len(amostras) == 0:
+            return
+        chave = self.chave(voz, texto)
+        with self._lock:
+            self._trocar_voz(voz)
+            self._guardar_ram(chave, (amostras, int(taxa)))
+        try:
+            self._gravar_disco(chave, amostras, taxa)
+        except OSError as e:
+            print(f"[VOZ] Cache: falha ao gravar no disco ({e}).")
+
+    def limpar_ram(self):
+        with self._lock:
+            self._ram.clear()
+            self._bytes_ram = 0
+
+    def _guardar_ram(self, chave, item):
+        if item[0].nbytes > self.limite_ram:
+            return
+        antigo = self._ram.pop(chave, None)
+        if antigo is not None:
+            self._bytes_ram -= antigo[0].nbytes
+        self._ram[chave] = item
+        self._bytes_ram += item[0].nbytes
+        while self._bytes_ram > self.limite_ram:
+            _, (amostras, _) = self._ram.popitem(last=False)
+            self._bytes_ram -= amostras.nbytes
+
+    # --- Disco ---
+    def _ler_disco(self, chave):
+        arq = self._arquivo(chave)
+        try:
+            with wave.open(arq, "rb") as wf:
+                taxa = wf.getframerate()
+                amostras = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+            os.utime(arq)   # mtime = último uso (poda LRU)
+            return amostras, taxa
+        except (OSError, EOFError, wave.Error):
+            return None
+
+    def _gravar_disco(self, chave, amostras, taxa):
+        arq = self._arquivo(chave)
+        if os.path.exists(arq):
+            os.utime(arq)
+            return
+        os.makedirs(os.path.dirname(arq), exist_ok=True)
+        temp = arq + ".tmp"
+        with wave.open(temp, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(int(taxa))
+            wf.writeframes(amostras.tobytes())
+        os.replace(temp, arq)
+        with self._lock:
+            self._bytes_disco += os.path.getsize(arq)
+            excedeu = self._bytes_disco > self.limite_disco
+        if excedeu:
+            self._podar_disco()
+
+    def _podar_disco(self):
+        """Apaga os arquivos usados há mais tempo até ficar em 80% do limite."""
+        arquivos = []
+        for a in self._arquivos():
+            try:
+                st = os.stat(a)
+                arquivos.append((st.st_mtime, st.st_size, a))
+            except OSError:
+                continue
+        total = sum(t for _, t, _ in arquivos)
+        for _, tamanho, a in sorted(arquivos):
+            if total <= self.limite_disco * 0.8:
+                break
+            try:
+                os.remove(a)
+                total -= tamanho
+            except OSError:
+                pass
+        with self._lock:
+            self._bytes_disco = total
@@ -0,0 +1,369 @@
+"""
+Captura contínua do microfone (EMEET M1A).
+
+O ServicoCaptura abre o dispositivo de entrada UMA vez e o mantém aberto durante
+toda a vida do processo, escrevendo os quadros num BufferCircular. Quem precisa
+de áudio (capturar_voz, barge-in, biometria) lê a partir de uma posição absoluta
+de amostra, sem reabrir o dispositivo e sem perder o início da fala (pre-roll).
+
+O dispositivo é aberto na sua taxa nativa (48 kHz no M1A) e um Reamostrador
+polifásico converte cada quadro para 16 kHz antes do buffer: todo consumidor
+recebe sempre áudio a `taxa` (16 kHz), com a taxa correta no Enunciado.
+Com AEC configurado, o eco da fala do robô é subtraído no mesmo ponto.
+Com um PerfilAudio (src/perfil_audio.py), índice e taxas do dispositivo vêm do
+perfil salvo em vez de uma varredura do PyAudio a cada abertura.
+"""
+import threading
+import time
+import wave
+
+import numpy as np
+
+from src.perfil_audio import sondar
+from src.reamostragem import Reamostrador, reamostrar
+
+
+def _sinalizado(parar):
+    if parar is None:
+        return False
+    if isinstance(parar, (tuple, list)):
+        return any(e.is_set() for e in parar)
+    return parar.is_set()
+
+
+class Enunciado:
+    """Um enunciado em memória: amostras int16 mono, taxa e trechos com voz.
+
+    É passado por todo o pipeline (reconhecimento, biometria, dump de debug)
+    sem arquivos intermediários. `pcm()` expõe o buffer como memoryview e
+    `como_float()` converte uma única vez para quem precisa de float32.
+    """
+
+    def __init__(self, amostras, taxa, segmentos=None):
+        self.amostras = np.ascontiguousarray(amostras, dtype=np.int16)
+        self.taxa = int(taxa)
+        self.segmentos = segmentos or []   # [(inicio, fim)] em amostras, relativos ao enunciado
+        self._float = None
+
+    @property
+    def duracao(self):
+        return len(self.amostras) / self.taxa
+
+    def pcm(self):
+        """Bytes S16_LE do enunciado, sem cópia."""
+        return self.amostras.data
+
+    def como_float(self):
+        """Amostras em float32 [-1, 1] (convertidas uma vez e reaproveitadas)."""
+        if self._float is None:
+            self._float = self.amostras.astype(np.float32) / 32768.0
+        return self._float
+
+    def salvar_wav(self, caminho):
+        with wave.open(caminho, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(self.taxa)
+            wf.writeframes(self.pcm())
+
+    def reamostrado(self, taxa):
+        """Cópia do enunciado em outra taxa (ex.: gravação arecord a 48 kHz → 16 kHz)."""
+        if int(taxa) == self.taxa:
+            return self
+        fator = int(taxa) / self.taxa
+        segmentos = [(int(a * fator), int(b * fator)) for a, b in self.segmentos]
+        return Enunciado(reamostrar(self.amostras, self.taxa, taxa), taxa, segmentos)
+
+    @classmethod
+    def de_wav(cls, caminho):
+        with wave.open(caminho, "rb") as wf:
+            taxa = wf.getframerate()
+            amostras = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        return cls(amostras, taxa)
+
+
+class BufferCircular:
+    """Buffer circular de amostras int16 com um único escritor.
+
+    O escritor copia o bloco e só depois avança `escritas` (contador absoluto de
+    amostras). Leitores não travam o escritor: apenas comparam posições e copiam
+    a janela que ainda está disponível.
+    """
+
+    def __init__(self, capacidade):
+        self.capacidade = int(capacidade)
+        self._dados = np.zeros(self.capacidade, dtype=np.int16)
+        self.escritas = 0
+        self._novo_dado = threading.Condition()
+
+    def escrever(self, amostras):
+        n = len(amostras)
+        if n == 0:
+            return
+        if n > self.capacidade:
+            amostras = amostras[-self.capacidade:]
+            n = self.capacidade
+        ini = self.escritas % self.capacidade
+        fim = ini + n
+        if fim <= self.capacidade:
+            self._dados[ini:fim] = amostras
+        else:
+            corte = self.capacidade - ini
+            self._dados[ini:] = amostras[:corte]
+            self._dados[:n - corte] = amostras[corte:]
+        self.escritas += n
+        with self._novo_dado:
+            self._novo_dado.notify_all()
+
+    def mais_antiga(self):
+        """Posição da amostra mais antiga ainda íntegra no buffer."""
+        return max(0, self.escritas - self.capacidade)
+
+    def ler(self, inicio, fim=None):
+        """Copia as amostras [inicio, fim) — limitadas à janela disponível."""
+        if fim is None or fim > self.escritas:
+            fim = self.escritas
+        inicio = max(inicio, self.mais_antiga())
+        if fim <= inicio:
+            return np.zeros(0, dtype=np.int16)
+        a = inicio % self.capacidade
+        b = fim % self.capacidade
+        if a < b:
+            return self._dados[a:b].copy()
+        return np.concatenate((self._dados[a:], self._dados[:b]))
+
+    def aguardar(self, posicao, timeout=None):
+        """Bloqueia até existir alguma amostra além de `posicao`."""
+        with self._novo_dado:
+            return self._novo_dado.wait_for(lambda: self.escritas > posicao, timeout=timeout)
+
+
+class ServicoCaptura:
+    """Dono do microfone durante toda a vida do processo.
+
+    Uma thread lê quadros do PyAudio na taxa nativa do dispositivo, reamostra
+    para `taxa` e alimenta o BufferCircular. `pausar()` libera o dispositivo
+    para programas externos (jogos, ferramentas) e `retomar()` o reabre.
+    """
+
+    def __init__(self, taxa=16000, taxa_alternativa=48000, quadro=512,
+                 segundos_buffer=30, pre_roll_ms=300, nome_dispositivo="M1A",
+                 cancelador_eco=None, referencia_eco=None, perfil=None):
+        self.taxa = taxa                        # taxa entregue aos consumidores (fixa)
+        self.taxa_alternativa = taxa_alternativa
+        self.taxa_dispositivo = None            # taxa em que o microfone foi aberto
+        self.quadro = quadro
+        self._quadro_dispositivo = quadro
+        self._reamostrador = None
+        self.segundos_buffer = segundos_buffer
+        self.pre_roll_ms = pre_roll_ms
+        self.nome_dispositivo = nome_dispositivo
+        self.perfil = perfil                    # PerfilAudio opcional (evita sondar o PyAudio)
+        # AEC opcional (src/aec.py): o eco da fala do robô sai antes do buffer
+        self.cancelador_eco = cancelador_eco
+        self.referencia_eco = referencia_eco
+        self.buffer = BufferCircular(taxa * segundos_buffer)
+        self._pa = None
+        self._stream = None
+        self._thread = None
+        self._rodando = False
+        self._pausado = threading.Event()
+        self._lock_stream = threading.Lock()
+
+    @property
+    def ativo(self):
+        return self._rodando and self._stream is not None and not self._pausado.is_set()
+
+    @property
+    def pre_roll(self):
+        """Pre-roll em amostras."""
+        return int(self.taxa * self.pre_roll_ms / 1000)
+
+    # --- Dispositivo ---
+    def _dispositivo(self, forcar=False):
+        """(índice, taxas candidatas): taxa nativa primeiro; depois as alternativas."""
+        if self.perfil is not None:
+            entrada = self.perfil.obter(self._pa, forcar=forcar).get("entrada")
+        else:
+            entrada = sondar(self._pa, self.nome_dispositivo).get("entrada")
+        if not entrada:
+            raise RuntimeError("Nenhum dispositivo de entrada encontrado")
+        taxas = list(entrada.get("taxas") or []) + [self.taxa_alternativa, self.taxa]
+        return entrada["indice"], [t for i, t in enumerate(taxas) if t and t not in taxas[:i]]
+
+    def _abrir_stream(self, mic_idx, taxas):
+        import pyaudio
+        for taxa in taxas:
+            # Mesmo intervalo de tempo por leitura, qualquer que seja a taxa nativa
+            quadro_disp = max(1, round(self.quadro * taxa / self.taxa))
+            try:
+                self._stream = self._pa.open(format=pyaudio.paInt16, channels=1, rate=taxa,
+                                             input=True, input_device_index=mic_idx,
+                                             frames_per_buffer=quadro_disp)
+                return taxa, quadro_disp
+            except Exception:
+                self._stream = None
+        return None, None
+
+    def _abrir(self):
+        import pyaudio
+        self._pa = pyaudio.PyAudio()
+        try:
+            mic_idx, taxas = self._dispositivo()
+            taxa, quadro_disp = self._abrir_stream(mic_idx, taxas)
+            if taxa is None and self.perfil is not None:
+                # Perfil salvo não abre mais (índices mudaram sem mudar as placas?): sonda de novo
+                print("Audio: Perfil de hardware não abriu o microfone; sondando novamente.")
+                mic_idx, taxas = self._dispositivo(forcar=True)
+                taxa, quadro_disp = self._abrir_stream(mic_idx, taxas)
+        except Exception:
+            self._pa.terminate()
+            self._pa = None
+            raise
+        if taxa is None:
+            self._pa.terminate()
+            self._pa = None
+            raise RuntimeError("Nenhuma taxa de captura suportada pelo microfone")
+        self.taxa_dispositivo = taxa
+        self._quadro_dispositivo = quadro_disp
+        self._reamostrador = Reamostrador(taxa, self.taxa) if taxa != self.taxa else None
+        conv = f" → {self.taxa} Hz" if self._reamostrador else ""
+        print(f"Audio: Microfone aberto (idx={mic_idx}, {taxa} Hz{conv}, quadro={self.quadro}).")
+
+    def _fechar(self):
+        with self._lock_stream:
+            if self._stream is not None:
+                try:
+                    self._stream.stop_stream()
+                    self._stream.close()
+                except Exception: pass
+                self._stream = None
+            if self._pa is not None:
+                try: self._pa.terminate()
+                except Exception: pass
+                self._pa = None
+
+    # --- Ciclo de vida ---
+    def iniciar(self):
+        """Abre o microfone e inicia a thread de leitura. Retorna True se ativo."""
+        if self._rodando:
+            return True
+        try:
+            self._abrir()
+        except Exception as e:
+            print(f"Audio: Falha ao abrir microfone persistente: {e}")
+            return False
+        self._rodando = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return True
+
+    def parar(self):
+        self._rodando = False
+        if self._thread:
+            self._thread.join(timeout=1)
+        self._fechar()
+
+    def pausar(self):
+        """Fecha o dispositivo (ex.: jogo externo vai usar o áudio)."""
+        if self._pausado.is_set():
+            return
+        self._pausado.set()
+        self._fechar()
+        print("Audio: Captura persistente pausada.")
+
+    def retomar(self):
+        if not self._pausado.is_set():
+            return
+        try:
+            with self._lock_stream:
+                self._abrir()
+            self._pausado.clear()
+            print("Audio: Captura persistente retomada.")
+        except Exception as e:
+            print(f"Audio: Falha ao retomar microfone: {e}")
+
+    def _loop(self):
+        while self._rodando:
+            if self._pausado.is_set():
+                time.sleep(0.05)
+                continue
+            try:
+                with self._lock_stream:
+                    stream = self._stream
+                    if stream is not None:
+                        data = stream.read(self._quadro_dispositivo, exception_on_overflow=False)
+                        reamostrador = self._reamostrador
+                if stream is None:
+                    time.sleep(0.05)
+                    continue
+                amostras = np.frombuffer(data, dtype=np.int16)
+                if reamostrador is not None:
+                    amostras = reamostrador.processar(amostras)
+                if self.cancelador_eco is not None:
+                    amostras = self.cancelador_eco.processar(
+                        amostras, self.referencia_eco.ler(len(amostras)))
+                self.buffer.escrever(amostras)
+            except Exception as e:
+                print(f"Audio: Erro de leitura do microfone ({e}), reabrindo...")
+                self._fechar()
+                time.sleep(0.5)
+                try:
+                    with self._lock_stream:
+                        self._abrir()
+                except Exception:
+                    time.sleep(1.0)
+
+    # --- Leitura ---
+    @property
+    def posicao(self):
+        return self.buffer.escritas
+
+    def quadros(self, inicio=None, parar=None, timeout=1.0):
+        """Gera (posicao, quadro) a partir de `inicio` até `parar` ser sinalizado.
+
+        Cada consumidor mantém seu próprio cursor; se ficar para trás mais que o
+        tamanho do buffer, pula para a amostra mais antiga disponível.
+        `parar` pode ser um Event ou uma tupla de Events (qualquer um encerra).
+        """
+        pos = self.posicao if inicio is None else inicio
+        while self._rodando and not _sinalizado(parar):
+            if not self.buffer.aguardar(pos + self.quadro - 1, timeout=timeout):
+                if self._pausado.is_set():
+                    return
+                continue
+            pos = max(pos, self.buffer.mais_antiga())
+            fim = pos + self.quadro
+            quadro = self.buffer.ler(pos, fim)
+            yield pos, quadro
+            pos = fim
+
+    def capturar_enunciado(self, segmentador, cancelar=None, ouvinte=None):
+        """Alimenta o `segmentador` (src/vad.py) com quadros ao vivo e devolve
+        o Enunciado capturado.
+
+        O trecho retornado começa `pre_roll_ms` antes do quadro que disparou a
+        detecção, de forma que a primeira sílaba não seja cortada.
+        `ouvinte(amostras)`, se dado, recebe o áudio do enunciado enquanto ele
+        acontece (pre-roll no início, depois quadro a quadro); se retornar True
+        o enunciado é encerrado ali mesmo, sem esperar o hangover.
+        Levanta RuntimeError se nenhuma voz for detectada.
+        """
+        for pos, quadro in self.quadros(parar=cancelar):
+            evento = segmentador.processar(pos, quadro)
+            if ouvinte is not None and segmentador.falando:
+                if evento == "inicio":
+                    amostras = self.buffer.ler(segmentador.inicio - self.pre_roll, pos + len(quadro))
+                else:
+                    amostras = quadro
+                if ouvinte(amostras) and evento != "fim":
+                    segmentador.fim = pos + len(quadro)
+                    break
+            if evento == "fim":
+                break
+        if not segmentador.falando:
+            raise RuntimeError("Nenhuma voz detectada")
+        fim = segmentador.fim if segmentador.fim is not None else self.posicao
+        inicio = max(segmentador.inicio - self.pre_roll, self.buffer.mais_antiga())
+        segmentos = [(max(0, a - inicio), b - inicio) for a, b in segmentador.segmentos]
+        return Enunciado(self.buffer.ler(inicio, fim), self.taxa, segmentos)
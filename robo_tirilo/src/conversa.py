@@ -0,0 +1,238 @@
+"""
+Sessão de conversa com o Gemini: instrução de sistema em cache e histórico rolante.
+
+Antes perguntar_gemini() remontava a instrução (prompt do perfil + lista de
+jogos) a cada turno e mandava só a mensagem atual, com uma thought_signature
+solta: o modelo não lembrava do turno anterior e cada pergunta reenviava o
+prompt inteiro.
+
+- `preparar()` recebe a instrução do turno; ela só é trocada quando muda (perfil,
+  lista de jogos, modo). Numa thread de fundo a instrução vira um cache de
+  contexto do Gemini (`client.caches`, recriado antes do TTL vencer) e os turnos
+  passam só `cached_content`. Até o cache ficar pronto — ou se o modelo/conta
+  não aceitar (instrução abaixo do mínimo de tokens do cache, por exemplo) — ela
+  vai como system_instruction, como antes.
+- histórico de turnos (pergunta/resposta, com a thought_signature da resposta)
+  limitado a `orcamento_tokens` (estimativa de ~4 caracteres por token). Os
+  turnos mais antigos que estouram o orçamento são resumidos em segundo plano
+  pelo próprio modelo e o resumo abre o histórico. Até o resumo sair os turnos
+  vão inteiros; se ele falhar, são descartados.
+- o histórico recomeça quando o `contexto` muda (modo, perfil) ou depois de
+  `expira_min` minutos sem conversa.
+"""
+import threading
+import time
+
+from google.genai import types
+
+CARACTERES_POR_TOKEN = 4
+PROMPT_RESUMO = (
+    "Resuma a conversa abaixo entre {usuario} e {robo} em no máximo 5 frases curtas, em "
+    "português, guardando nomes, preferências, o que já foi combinado e jogos já jogados. "
+    "Responda só com o resumo.\n\nResumo anterior: {resumo}\n\nConversa:\n{dialogo}"
+)
+
+
+def estimar_tokens(texto):
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+class _Turno:
+    def __init__(self, pergunta, resposta, assinatura=None):
+        self.pergunta = pergunta
+        self.resposta = resposta
+        self.assinatura = assinatura
+        self.tokens = estimar_tokens(pergunta) + estimar_tokens(resposta)
+
+    def conteudos(self):
+        resposta = types.Part(text=self.resposta, thought_signature=self.assinatura)
+        return [types.Content(role="user", parts=[types.Part(text=self.pergunta)]),
+                types.Content(role="model", parts=[resposta])]
+
+
+class SessaoConversa:
+    """Uso por turno: `preparar(...)`, `conteudos(mensagem)` e `config()` para o
+    generate_content_stream; `registrar(pergunta, resposta, assinatura)` no fim."""
+
+    def __init__(self, orcamento_tokens=3000, minimo_turnos=3, expira_min=10,
+                 cache_ttl_s=3600, usar_cache=True, nome_robo="Tirilo"):
+        self.orcamento_tokens = orcamento_tokens
+        self.minimo_turnos = minimo_turnos
+        self.expira_s = expira_min * 60
+        self.cache_ttl_s = cache_ttl_s
+        self.usar_cache = usar_cache
+        self.nome_robo = nome_robo
+        self.cliente = None
+        self.modelo = None
+        self._lock = threading.Lock()
+        self._instrucao = ""
+        self._contexto = None
+        self._cache = None               # (nome, modelo, instrução, expira em)
+        self._criando_cache = False
+        self._recusas = {}               # (modelo, instrução) → instante da falha
+        self._turnos = []
+        self._resumo = ""
+        self._resumindo = False
+        self._geracao = 0                # muda ao reiniciar: resumo atrasado é descartado
+        self._ultimo_turno = 0.0
+
+    # --- Instrução de sistema ---
+    def preparar(self, cliente, modelo, instrucao, contexto=None):
+        apagar = None
+        with self._lock:
+            self.cliente, self.modelo = cliente, modelo
+            if contexto != self._contexto:
+                self._reiniciar()
+                self._contexto = contexto
+            if instrucao != self._instrucao:
+                self._instrucao = instrucao
+                print(f"[IA] Instrução de sistema nova (~{estimar_tokens(instrucao)} tokens).")
+            if self._cache and self._cache[1:3] != (modelo, instrucao):
+                apagar, self._cache = self._cache[0], None
+        if apagar:
+            self._apagar_cache(apagar)
+
+    def config(self):
+        """GenerateContentConfig do turno: cache de contexto se pronto, senão
+        system_instruction (e dispara a criação do cache no fundo)."""
+        agora = time.monotonic()
+        with self._lock:
+            cache, instrucao, modelo = self._cache, self._instrucao, self.modelo
+            criar = (self.usar_cache and instrucao and self.cliente is not None
+                     and not self._criando_cache
+                     and (cache is None or cache[3] - agora < 120)
+                     and agora - self._recusas.get((modelo, instrucao), float("-inf")) > 600)
+            if criar:
+                self._criando_cache = True
+        if criar:
+            threading.Thread(target=self._criar_cache, args=(modelo, instrucao), daemon=True).start()
+        if cache is not None and cache[3] - agora > 5:
+            return types.GenerateContentConfig(cached_content=cache[0])
+        return types.GenerateContentConfig(system_instruction=instrucao or None)
+
+    def invalidar_cache(self):
+        """O Gemini recusou o cache (expirou/apagado do lado de lá): volta à instrução."""
+        with self._lock:
+            self._cache = None
+
+    def _criar_cache(self, modelo, instrucao):
+        t0 = time.monotonic()
+        try:
+            cache = self.cliente.caches.create(model=modelo, config=types.CreateCachedContentConfig(
+                system_instruction=instrucao, ttl=f"{self.cache_ttl_s}s", display_name="tirilo"))
+        except Exception as e:
+            print(f"[IA] Cache de contexto indisponível ({str(e)[:80]}); instrução vai em cada turno.")
+            with self._lock:
+                self._recusas[(modelo, instrucao)] = time.monotonic()
+                self._criando_cache = False
+            return
+        apagar = None
+        with self._lock:
+            self._criando_cache = False
+            if (modelo, instrucao) != (self.modelo, self._instrucao):
+                apagar = cache.name          # a instrução mudou enquanto criava
+            else:
+                apagar = self._cache[0] if self._cache else None
+                self._cache = (cache.name, modelo, instrucao, t0 + self.cache_ttl_s)
+        if apagar:
+            self._apagar_cache(apagar)
+        if apagar != cache.name:
+            print(f"[IA] Cache de contexto pronto em {time.monotonic() - t0:.1f}s ({cache.name}).")
+
+    def _apagar_cache(self, nome):
+        def _apagar():
+            try:
+                self.cliente.caches.delete(name=nome)
+            except Exception:
+                pass   # expira sozinho no TTL
+        threading.Thread(target=_apagar, daemon=True).start()
+
+    # --- Histórico ---
+    def _reiniciar(self):
+        self._turnos = []
+        self._resumo = ""
+        self._geracao += 1
+
+    def reiniciar(self):
+        with self._lock:
+            self._reiniciar()
+
+    def _expirou(self):
+        return self._turnos and time.monotonic() - self._ultimo_turno > self.expira_s
+
+    def tem_historico(self):
+        """Se o próximo turno vai com turnos anteriores ou resumo (a resposta pode
+        depender deles)."""
+        with self._lock:
+            return bool(self._resumo or (self._turnos and not self._expirou()))
+
+    def conteudos(self, mensagem):
+        """Resumo + turnos anteriores + a mensagem atual."""
+        with self._lock:
+            if self._expirou():
+                print("[IA] Conversa parada há muito tempo: histórico recomeça.")
+                self._reiniciar()
+            itens = []
+            if self._resumo:
+                itens += [types.Content(role="user", parts=[types.Part(
+                              text=f"(Resumo da nossa conversa até aqui: {self._resumo})")]),
+                          types.Content(role="model", parts=[types.Part(text="Certo.")])]
+            for turno in self._turnos:
+                itens += turno.conteudos()
+        itens.append(types.Content(role="user", parts=[types.Part(text=mensagem)]))
+        return itens
+
+    def registrar(self, pergunta, resposta, assinatura=None):
+        if not resposta.strip():
+            return
+        with self._lock:
+            self._turnos.append(_Turno(pergunta, resposta, assinatura))
+            self._ultimo_turno = time.monotonic()
+            antigos = self._excedente()
+            if not antigos or self._resumindo:
+                return
+            self._resumindo = True
+            args = (antigos, self._resumo, self._geracao)
+        threading.Thread(target=self._resumir, args=args, daemon=True).start()
+
+    def _excedente(self):
+        """Turnos mais antigos a resumir quando o histórico passa do orçamento:
+        desce até metade dele (um resumo a cada vários turnos, não a cada um),
+        mantendo `minimo_turnos`."""
+        total = sum(t.tokens for t in self._turnos) + estimar_tokens(self._resumo)
+        if total <= self.orcamento_tokens:
+            return []
+        antigos = []
+        for turno in self._turnos[:-self.minimo_turnos or None]:
+            if total <= self.orcamento_tokens // 2:
+                break
+            antigos.append(turno)
+            total -= turno.tokens
+        return antigos
+
+    def _resumir(self, antigos, resumo, geracao):
+        dialogo = "\n".join(f"Usuário: {t.pergunta}\n{self.nome_robo}: {t.resposta}" for t in antigos)
+        t0 = time.monotonic()
+        try:
+            r = self.cliente.models.generate_content(model=self.modelo, contents=PROMPT_RESUMO.format(
+                usuario="o usuário", robo=self.nome_robo, resumo=resumo or "(nenhum)", dialogo=dialogo))
+            novo = (r.text or "").strip()
+        except Exception as e:
+            print(f"[IA] Erro resumindo a conversa ({str(e)[:80]}); turnos antigos descartados.")
+            novo = ""
+        with self._lock:
+            self._resumindo = False
+            if geracao != self._geracao:
+                return
+            self._turnos = [t for t in self._turnos if all(t is not a for a in antigos)]
+            if novo:
+                self._resumo = novo
+                print(f"[IA] {len(antigos)} turno(s) resumido(s) em {time.monotonic() - t0:.1f}s "
+                      f"(~{estimar_tokens(novo)} tokens).")
+
+    def estado(self):
+        with self._lock:
+            return {"turnos": len(self._turnos),
+                    "tokens_historico": sum(t.tokens for t in self._turnos) + estimar_tokens(self._resumo),
+                    "resumo": bool(self._resumo),
+                    "cache": self._cache[0] if self._cache else None}
@@ -0,0 +1,149 @@
+"""
+Roteador local de intenções: decide antes da IA se a fala é um comando que o
+robô resolve sozinho (parar, modos, movimento, música, jogos, sair).
+
+Antes o loop_logica() testava as frases de modo com `any(f in texto_l ...)`,
+depois a tabela de movimento e por fim `_detectar_jogo_por_voz()`, que
+redividia o nome de cada jogo a cada fala; só então chamava o Gemini. Além de
+várias passadas, o teste por substring casava "eco" em "boneco" e "sair" em
+"sair do modo".
+
+Aqui a tabela declarativa (`Entrada`) é compilada uma vez num autômato de
+Aho-Corasick sobre palavras do texto dobrado (minúsculas, sem acentos, só
+letras/dígitos). Cada fala é lida numa única passada:
+
+- as ocorrências são resolvidas como na TabelaPalavrasChave: mais à esquerda
+  e mais longa primeiro, sem sobreposição ("sair do modo" engole "sair");
+- entrada `todas=True` (jogos) casa quando todas as palavras significativas
+  (>= 3 letras) aparecem, em qualquer ordem — a regra do detector antigo;
+- vence a entrada de maior prioridade (ordem da tabela); a confiança é a
+  fração das palavras de conteúdo da fala (fora PALAVRAS_VAZIAS) cobertas
+  pelas frases dela: "pisca o olho direito" = 1.0, "como o cavalo galopa no
+  campo" = 0.25. Quem chama decide o corte (uma pergunta que só cita a palavra
+  pode ir para a IA).
+"""
+import string
+from collections import deque, namedtuple
+
+from src.palavras_chave import sem_acentos
+
+Intencao = namedtuple("Intencao", "rotulo tipo valor confianca")
+Entrada = namedtuple("Entrada", "rotulo tipo frases valor todas", defaults=(None, False))
+
+PALAVRAS_VAZIAS = frozenset((
+    "a", "o", "as", "os", "um", "uma", "de", "do", "da", "dos", "das", "e", "em", "no", "na",
+    "pra", "pro", "para", "por", "favor", "pode", "voce", "vc", "me", "mim", "eu", "quero",
+    "queria", "vamos", "agora", "tirilo", "ai", "la", "ne", "entao", "so", "aqui", "ta", "oi",
+    "ola", "jogar", "brincar", "jogo", "isso", "tudo", "bem", "ei", "hein",
+))
+MIN_LETRAS_TODAS = 3
+# Dobra numa chamada de str.translate: acentos do Latin-1/Latin Extended-A e
+# pontuação ASCII (o unicodedata caractere a caractere custava mais que o roteamento)
+_DOBRA = {c: sem_acentos(chr(c)) for c in range(0xC0, 0x180) if sem_acentos(chr(c)) != chr(c)}
+_DOBRA.update({ord(c): " " for c in string.punctuation + "…–—“”‘’«»¿¡"})
+
+
+def dobrar(texto):
+    """Palavras do texto em minúsculas, sem acentos e sem pontuação."""
+    return texto.lower().translate(_DOBRA).split()
+
+
+class RoteadorIntencoes:
+    """Tabela de `Entrada`s (ordem = prioridade) compilada num autômato de palavras."""
+
+    def __init__(self, entradas):
+        self.entradas = list(entradas)
+        self._frases = []          # id → palavras
+        self._donos = []           # id → índices das entradas que usam a frase
+        self._exigidas = {}        # entrada `todas` → conjunto de palavras
+        ids = {}
+        for i, e in enumerate(self.entradas):
+            if e.todas:
+                palavras = {p for f in e.frases for p in dobrar(f) if len(p) >= MIN_LETRAS_TODAS}
+                if not palavras:
+                    continue
+                self._exigidas[i] = palavras
+                frases = [(p,) for p in sorted(palavras)]
+            else:
+                frases = [tuple(dobrar(f)) for f in e.frases]
+            for palavras in frases:
+                if not palavras:
+                    continue
+                if palavras not in ids:
+                    ids[palavras] = len(self._frases)
+                    self._frases.append(palavras)
+                    self._donos.append([])
+                donos = self._donos[ids[palavras]]
+                # Frase repetida: a primeira entrada comum fica com ela; palavras de
+                # jogos (`todas`) são de todos ("coreografia" está em dois nomes)
+                if i not in donos and (e.todas or not any(d not in self._exigidas for d in donos)):
+                    donos.append(i)
+        self._compilar()
+
+    def _compilar(self):
+        self._goto = [{}]
+        self._saida = [[]]
+        for id_frase, palavras in enumerate(self._frases):
+            estado = 0
+            for p in palavras:
+                proximo = self._goto[estado].get(p)
+                if proximo is None:
+                    proximo = len(self._goto)
+                    self._goto[estado][p] = proximo
+                    self._goto.append({})
+                    self._saida.append([])
+                estado = proximo
+            self._saida[estado].append(id_frase)
+        # Links de falha em largura; a saída de cada estado herda a do seu link
+        self._falha = [0] * len(self._goto)
+        fila = deque(self._goto[0].values())
+        while fila:
+            estado = fila.popleft()
+            for p, filho in self._goto[estado].items():
+                fila.append(filho)
+                f = self._falha[estado]
+                while f and p not in self._goto[f]:
+                    f = self._falha[f]
+                self._falha[filho] = self._goto[f].get(p, 0)
+                self._saida[filho] = self._saida[filho] + self._saida[self._falha[filho]]
+
+    def _ocorrencias(self, palavras):
+        """(início, fim, id_frase) de todas as frases, numa passada."""
+        estado = 0
+        achados = []
+        for fim, p in enumerate(palavras, 1):
+            while estado and p not in self._goto[estado]:
+                estado = self._falha[estado]
+            estado = self._goto[estado].get(p, 0)
+            for id_frase in self._saida[estado]:
+                achados.append((fim - len(self._frases[id_frase]), fim, id_frase))
+        return achados
+
+    def rotear(self, texto, ignorar=()):
+        """Intenção de maior prioridade presente no texto (ou None).
+        `ignorar`: rótulos que não valem agora (ex.: modos do outro modo)."""
+        palavras = dobrar(texto)
+        if not palavras:
+            return None
+        # Mais à esquerda e mais longa primeiro, sem sobreposição
+        cobertas = {}              # entrada → palavras cobertas (posições)
+        vistas = {}                # entrada `todas` → palavras achadas
+        limite = 0
+        for ini, fim, id_frase in sorted(self._ocorrencias(palavras), key=lambda a: (a[0], a[0] - a[1])):
+            if ini < limite:
+                continue
+            donos = [i for i in self._donos[id_frase] if self.entradas[i].rotulo not in ignorar]
+            if not donos:
+                continue
+            limite = fim
+            for i in donos:
+                cobertas.setdefault(i, set()).update(range(ini, fim))
+                if i in self._exigidas:
+                    vistas.setdefault(i, set()).update(self._frases[id_frase])
+        candidatas = [i for i in cobertas if i not in self._exigidas or vistas[i] >= self._exigidas[i]]
+        if not candidatas:
+            return None
+        i = min(candidatas)
+        conteudo = {k for k, p in enumerate(palavras) if p not in PALAVRAS_VAZIAS} | cobertas[i]
+        e = self.entradas[i]
+        return Intencao(e.rotulo, e.tipo, e.valor, round(len(cobertas[i]) / len(conteudo), 2))
@@ -0,0 +1,171 @@
+"""
+Gerenciador dos motores de voz neurais (Sherpa-ONNX, Piper).
+
+Antes o Piper só carregava no boot se a nuvem respondesse, o Sherpa carregava
+no primeiro RELOAD_CONFIG travando o loop principal, e os dois podiam ficar na
+RAM ao mesmo tempo para sempre. Aqui cada motor é registrado com a função que o
+constrói; o GerenciadorMotores:
+
+- carrega numa thread de fundo (um motor por vez, para não somar picos de RAM)
+  e registra o tempo de carga e quanto o RSS do processo cresceu;
+- nunca bloqueia quem pede: `obter()` devolve a instância pronta ou None (e
+  dispara a carga), quem fala decide o que usar enquanto isso;
+- descarrega o motor que não é usado há `ocioso_min` minutos, exceto o que
+  `protegido(nome)` disser que está selecionado.
+"""
+import gc
+import os
+import threading
+import time
+
+
+def rss_mb():
+    """RSS atual do processo em MB (/proc/self/statm)."""
+    try:
+        with open("/proc/self/statm") as f:
+            paginas = int(f.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class _Motor:
+    def __init__(self, nome, carregar):
+        self.nome = nome
+        self.carregar = carregar
+        self.instancia = None
+        self.carregando = threading.Event()
+        self.pronto = threading.Event()
+        self.ultimo_uso = 0.0
+        self.carga_s = None
+        self.rss_mb = None
+        self.falhou_em = None   # carga sem modelo/erro: não tenta de novo a cada frase
+
+
+class GerenciadorMotores:
+    """`registrar(nome, carregar)`: `carregar()` devolve a instância (ou None se
+    não houver modelo). `ao_pronto(nome)` é chamado quando uma carga termina."""
+
+    def __init__(self, ocioso_min=10, protegido=None, ao_pronto=None, intervalo_s=30, retentar_s=60):
+        self.ocioso_s = ocioso_min * 60
+        self.protegido = protegido or (lambda nome: False)
+        self.ao_pronto = ao_pronto
+        self.intervalo_s = intervalo_s
+        self.retentar_s = retentar_s
+        self._motores = {}
+        self._lock = threading.Lock()
+        self._lock_carga = threading.Lock()   # uma carga por vez
+        self._monitor = None
+
+    def registrar(self, nome, carregar):
+        self._motores[nome] = _Motor(nome, carregar)
+
+    def __contains__(self, nome):
+        return nome in self._motores
+
+    def pronto(self, nome):
+        m = self._motores.get(nome)
+        return m is not None and m.instancia is not None
+
+    # --- Carga ---
+    def aquecer(self, nome):
+        """Começa a carregar `nome` em segundo plano (se ainda não estiver na RAM)."""
+        m = self._motores.get(nome)
+        if m is None:
+            return
+        with self._lock:
+            if m.instancia is not None or m.carregando.is_set():
+                return
+            if m.falhou_em is not None and time.monotonic() - m.falhou_em < self.retentar_s:
+                return
+            m.carregando.set()
+            m.pronto.clear()
+        threading.Thread(target=self._carregar, args=(m,), daemon=True).start()
+
+    def aguardar(self, nome, timeout):
+        """Espera a carga de `nome` terminar (só para o boot). True se pronto."""
+        m = self._motores.get(nome)
+        if m is None:
+            return False
+        if m.carregando.is_set():
+            m.pronto.wait(timeout)
+        return m.instancia is not None
+
+    def _carregar(self, m):
+        with self._lock_carga:
+            rss_antes = rss_mb()
+            t0 = time.monotonic()
+            try:
+                instancia = m.carregar()
+            except Exception as e:
+                print(f"[VOZ] Motor {m.nome}: erro ao carregar ({e}).")
+                instancia = None
+            with self._lock:
+                m.instancia = instancia
+                m.ultimo_uso = time.monotonic()
+                m.falhou_em = None if instancia is not None else time.monotonic()
+                m.carregando.clear()
+                m.pronto.set()
+            if instancia is None:
+                return
+            m.carga_s = time.monotonic() - t0
+            m.rss_mb = rss_mb() - rss_antes
+            print(f"[VOZ] Motor {m.nome} pronto em {m.carga_s:.1f}s (+{m.rss_mb:.0f} MB RSS, "
+                  f"processo {rss_mb():.0f} MB).")
+        if self.ao_pronto:
+            try: self.ao_pronto(m.nome)
+            except Exception as e: print(f"[VOZ] Motor {m.nome}: erro após a carga ({e}).")
+
+    # --- Uso ---
+    def obter(self, nome):
+        """Instância pronta (marca o uso) ou None — nesse caso a carga começa."""
+        m = self._motores.get(nome)
+        if m is None:
+            return None
+        with self._lock:
+            instancia = m.instancia
+            if instancia is not None:
+                m.ultimo_uso = time.monotonic()
+        if instancia is None:
+            self.aquecer(nome)
+        return instancia
+
+    def instancia(self, nome):
+        """Instância pronta sem marcar uso nem disparar carga (ajustes de config)."""
+        m = self._motores.get(nome)
+        return m.instancia if m else None
+
+    # --- Descarga ---
+    def descarregar(self, nome):
+        m = self._motores.get(nome)
+        if m is None or m.instancia is None:
+            return
+        with self._lock:
+            m.instancia = None
+            m.pronto.clear()
+        gc.collect()
+        print(f"[VOZ] Motor {nome} descarregado (processo {rss_mb():.0f} MB).")
+
+    def iniciar(self):
+        if self._monitor is None and self.ocioso_s > 0:
+            self._monitor = threading.Thread(target=self._vigiar, daemon=True)
+            self._monitor.start()
+
+    def _vigiar(self):
+        while True:
+            time.sleep(self.intervalo_s)
+            agora = time.monotonic()
+            for m in list(self._motores.values()):
+                if (m.instancia is not None and not self.protegido(m.nome)
+                        and agora - m.ultimo_uso > self.ocioso_s):
+                    print(f"[VOZ] Motor {m.nome} ocioso há {(agora - m.ultimo_uso) / 60:.0f} min.")
+                    self.descarregar(m.nome)
+
+    def estado(self):
+        """{nome: {carregado, carregando, carga_s, rss_mb, ocioso_s}} para log/telemetria."""
+        agora = time.monotonic()
+        return {m.nome: {"carregado": m.instancia is not None,
+                         "carregando": m.carregando.is_set(),
+                         "carga_s": m.carga_s, "rss_mb": m.rss_mb,
+                         "ocioso_s": (agora - m.ultimo_uso) if m.instancia is not None else None}
+                for m in self._motores.values()}
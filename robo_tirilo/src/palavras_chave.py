@@ -0,0 +1,156 @@
+"""
+Palavras-chave de controle ("parar", "doutor tirilo", comandos de movimento).
+
+A TabelaPalavrasChave é compilada uma vez a partir das listas de frases do
+tirilo.py e serve a dois caminhos:
+
+- texto (STT final ou parcial): uma única regex com todas as frases, em vez de
+  cadeias de `any(x in texto ...)`; a prioridade é a ordem da tabela;
+- áudio: `gerar_palavras_sherpa()` escreve o arquivo de keywords do
+  sherpa-onnx KeywordSpotter, e a EscutaPalavrasChave roda o spotter sobre o
+  microfone persistente, disparando o rótulo ~200 ms após a frase — sem STT.
+"""
+import glob
+import os
+import re
+import threading
+import time
+import unicodedata
+
+import numpy as np
+
+from src.reconhecimento import escolher_arquivo_modelo
+
+
+def sem_acentos(texto):
+    return "".join(c for c in unicodedata.normalize("NFD", texto) if unicodedata.category(c) != "Mn")
+
+
+class TabelaPalavrasChave:
+    """Rótulo → frases, em ordem de prioridade (o primeiro rótulo vence)."""
+
+    def __init__(self, entradas):
+        self.frases = {}      # rótulo → tupla de frases
+        self._rotulo = {}     # frase → rótulo
+        self._prioridade = {}
+        for i, (rotulo, frases) in enumerate(entradas.items()):
+            self.frases[rotulo] = tuple(frases)
+            self._prioridade[rotulo] = i
+            for f in frases:
+                self._rotulo.setdefault(f, rotulo)
+        # Mais longas primeiro: "piscar olho direito" vence "piscar" na mesma posição
+        ordenadas = sorted(self._rotulo, key=len, reverse=True)
+        # Só palavras inteiras: "parar" não casa dentro de "preparar"
+        self._regex = re.compile(r"(?<!\w)(?:" + "|".join(re.escape(f) for f in ordenadas) + r")(?!\w)")
+        # Frases contidas em outras mais longas ("piscar" ⊂ "piscar olho direito")
+        # não são conclusivas numa parcial: a criança pode ainda estar falando.
+        self._prefixos = {f for f in ordenadas if any(f != g and f in g for g in ordenadas)}
+
+    def casar(self, texto, parcial=False):
+        """Rótulo de maior prioridade presente no texto (ou None)."""
+        melhor = None
+        for m in self._regex.finditer(texto):
+            frase = m.group(0)
+            if parcial and frase in self._prefixos:
+                continue
+            rotulo = self._rotulo[frase]
+            if melhor is None or self._prioridade[rotulo] < self._prioridade[melhor]:
+                melhor = rotulo
+        return melhor
+
+    def gerar_palavras_sherpa(self, caminho, tokens, bpe_model=None, sherpa=None):
+        """Escreve o arquivo de keywords do KeywordSpotter (uma linha por frase,
+        tokenizada com o vocabulário do modelo, rótulo após o '@')."""
+        if sherpa is None:
+            import sherpa_onnx as sherpa
+        frases, rotulos = [], []
+        maiusculas = _vocabulario_maiusculo(tokens)
+        for rotulo, lista in self.frases.items():
+            for f in lista:
+                f = sem_acentos(f)
+                frases.append(f.upper() if maiusculas else f)
+                rotulos.append(rotulo)
+        tipo = "bpe" if bpe_model else "cjkchar"
+        tokenizadas = sherpa.text2token(frases, tokens=tokens, tokens_type=tipo, bpe_model=bpe_model)
+        with open(caminho, "w", encoding="utf-8") as f:
+            for toks, rotulo in zip(tokenizadas, rotulos):
+                f.write(f"{' '.join(toks)} @{rotulo}\n")
+        return len(frases)
+
+
+def _vocabulario_maiusculo(tokens):
+    try:
+        with open(tokens, encoding="utf-8") as f:
+            letras = "".join(linha.split()[0] for linha in f if linha.strip())
+    except Exception:
+        return False
+    return sum(c.isupper() for c in letras) > sum(c.islower() for c in letras)
+
+
+class EscutaPalavrasChave:
+    """Thread que roda o sherpa-onnx KeywordSpotter no microfone persistente.
+
+    `ao_detectar(rotulo)` é chamado da thread de escuta; deve ser rápido.
+    """
+
+    def __init__(self, servico, tabela, pasta_modelo, ao_detectar,
+                 limiar=0.25, pontuacao=1.0, num_threads=1, sherpa=None):
+        if sherpa is None:
+            import sherpa_onnx as sherpa
+        arquivos = _arquivos_kws(pasta_modelo)
+        if arquivos is None:
+            raise FileNotFoundError(f"Nenhum modelo KWS em {pasta_modelo}")
+        keywords = os.path.join(os.path.dirname(arquivos["tokens"]), "keywords_tirilo.txt")
+        n = tabela.gerar_palavras_sherpa(keywords, arquivos["tokens"], arquivos.get("bpe"), sherpa=sherpa)
+        self._kws = sherpa.KeywordSpotter(
+            tokens=arquivos["tokens"], encoder=arquivos["encoder"],
+            decoder=arquivos["decoder"], joiner=arquivos["joiner"],
+            num_threads=num_threads, keywords_file=keywords,
+            keywords_score=pontuacao, keywords_threshold=limiar, max_active_paths=4,
+        )
+        self.servico = servico
+        self.ao_detectar = ao_detectar
+        self._parar = threading.Event()
+        self._thread = None
+        print(f"KWS: Spotter carregado ({n} frases de controle).")
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+
+    def _loop(self):
+        taxa = self.servico.taxa
+        while not self._parar.is_set():
+            stream = self._kws.create_stream()
+            # quadros() retorna quando a captura é pausada (jogo externo): recria o stream
+            for _, quadro in self.servico.quadros(parar=self._parar):
+                stream.accept_waveform(taxa, quadro.astype(np.float32) / 32768.0)
+                while self._kws.is_ready(stream):
+                    self._kws.decode_stream(stream)
+                    rotulo = self._kws.get_result(stream)
+                    if rotulo:
+                        if hasattr(self._kws, "reset_stream"):
+                            self._kws.reset_stream(stream)
+                        try:
+                            self.ao_detectar(rotulo)
+                        except Exception as e:
+                            print(f"KWS: Erro no tratamento de '{rotulo}': {e}")
+            time.sleep(0.2)
+
+
+def _arquivos_kws(pasta):
+    if not pasta or not os.path.isdir(pasta):
+        return None
+    for tokens in sorted(glob.glob(os.path.join(pasta, "**", "tokens.txt"), recursive=True)):
+        base = os.path.dirname(tokens)
+        onnx = glob.glob(os.path.join(base, "*.onnx"))
+        arquivos = {"tokens": tokens, **{parte: escolher_arquivo_modelo(onnx, parte)
+                                         for parte in ("encoder", "decoder", "joiner")}}
+        if all(arquivos.values()):
+            bpe = os.path.join(base, "bpe.model")
+            arquivos["bpe"] = bpe if os.path.exists(bpe) else None
+            return arquivos
+    return None
@@ -0,0 +1,179 @@
+"""
+Parser incremental da resposta da IA em streaming: frases para a fala e tags de
+controle ([JOGO:codigo]) como eventos.
+
+Antes o loop de perguntar_gemini() acumulava o texto e rodava
+`re.search(r'[^.!?]*[.!?]', buffer)` a cada pedaço, mais um re.search/re.sub da
+tag em cada frase: "Dr. Tirilo" e "3.5" viravam frases quebradas, "Hmm..."
+virava três, e a tag só era vista quando a frase dela terminava.
+
+Aqui cada caractere do stream é visto uma vez (estado guardado entre pedaços):
+
+- fim de frase = corrida de terminadores (. ! ? …) mais aspas/parênteses de
+  fechamento, seguida de espaço. Com ! ou ? a frase sai no espaço; só com
+  pontos ela espera o próximo caractere visível: minúscula continua a frase
+  ("Hmm... deixa eu ver"), o resto fecha. Abreviações (Sr., Dra., ex.) e
+  iniciais (J. K.) não fecham; ponto colado em dígito/letra (3.5, site.com)
+  também não. Quebra de linha fecha a frase;
+- frase longa sem ponto é cortada na primeira vírgula depois de
+  `max_caracteres` (a fala não espera o fim do parágrafo);
+- `[NOME:valor]` vira Tag("NOME", "valor") no instante do `]`, sem esperar a
+  frase; colchetes que não são tag voltam como texto.
+
+Eventos saem como lista de `alimentar()`/`finalizar()` e também pelo gancho
+`ao_evento(evento)` (chamado na ordem, na thread de quem alimenta).
+"""
+import re
+from collections import namedtuple
+
+Frase = namedtuple("Frase", "texto")
+Tag = namedtuple("Tag", "nome valor")
+
+TERMINADORES = ".!?…"
+FECHAMENTOS = "\"'”’)»]"
+ABREVIACOES = frozenset((
+    "sr", "sra", "srta", "srs", "dr", "dra", "drs", "prof", "profa", "ex", "obs", "pág", "pag",
+    "av", "nº", "vs", "cia", "ltda", "tel", "aprox", "séc", "sto", "sta", "jr", "min", "máx", "mín",
+))
+RE_TAG = re.compile(r"([A-Za-z_]+):\s*([\w\-]+)")
+RE_ULTIMA_PALAVRA = re.compile(r"(\w+)\.$")
+MAX_TAG = 40
+
+
+class ParserResposta:
+    def __init__(self, ao_evento=None, max_caracteres=220):
+        self.ao_evento = ao_evento
+        self.max_caracteres = max_caracteres
+        self._frase = []          # caracteres visíveis da frase em curso
+        self._tamanho = 0
+        self._tag = None          # conteúdo entre '[' e ']' (None fora de tag)
+        self._corrida = ""        # terminadores (e fechamentos) logo antes do cursor
+        self._espera = False      # pontos + espaço: decide no próximo caractere visível
+        self._virgula = False
+        self._eventos = []
+        self._visivel = []        # frases emitidas (texto sem as tags)
+        self.tags = []
+
+    @property
+    def texto(self):
+        """Texto visível já emitido (sem tags), para exibir na tela."""
+        return " ".join(self._visivel)
+
+    def alimentar(self, pedaco):
+        """Processa mais um pedaço do stream. Retorna os eventos fechados nele."""
+        for c in pedaco:
+            if self._tag is not None:
+                self._na_tag(c)
+            elif c == "[":
+                self._resolver_espera(c)
+                self._tag = []
+            else:
+                self._caractere(c)
+        return self._entregar()
+
+    def finalizar(self):
+        """Fim do stream: tag aberta volta como texto e a última frase sai."""
+        if self._tag is not None:
+            conteudo, self._tag = "".join(self._tag), None
+            for c in "[" + conteudo:
+                self._caractere(c)
+        self._fechar_frase()
+        return self._entregar()
+
+    # --- Estado interno ---
+    def _entregar(self):
+        eventos, self._eventos = self._eventos, []
+        if self.ao_evento:
+            for evento in eventos:
+                self.ao_evento(evento)
+        return eventos
+
+    def _na_tag(self, c):
+        if c == "]":
+            conteudo, self._tag = "".join(self._tag), None
+            m = RE_TAG.fullmatch(conteudo.strip())
+            if m:
+                tag = Tag(m.group(1).upper(), m.group(2))
+                self.tags.append(tag)
+                self._eventos.append(tag)
+            else:
+                for x in "[" + conteudo + "]":
+                    self._caractere(x)
+        elif c == "\n" or len(self._tag) >= MAX_TAG:
+            conteudo, self._tag = "".join(self._tag), None
+            for x in "[" + conteudo:
+                self._caractere(x)
+            self._caractere(c)
+        else:
+            self._tag.append(c)
+
+    def _resolver_espera(self, c):
+        """Pontos + espaço antes de `c` (visível): minúscula continua a frase."""
+        if not self._espera:
+            return
+        self._espera = False
+        if c.islower():
+            self._corrida = ""
+            self._adicionar(" ")
+        else:
+            self._fechar_frase()
+
+    def _caractere(self, c):
+        if self._espera:
+            if c.isspace():
+                if c == "\n":
+                    self._espera = False
+                    self._fechar_frase()
+                return
+            self._resolver_espera(c)
+        if c in TERMINADORES:
+            self._corrida += c
+            self._adicionar(c)
+        elif c in FECHAMENTOS and self._corrida:
+            self._corrida += c
+            self._adicionar(c)
+        elif c.isspace():
+            if self._corrida:
+                self._fim_corrida(c)
+            elif c == "\n":
+                self._fechar_frase()
+            elif self._virgula and self._tamanho >= self.max_caracteres:
+                self._fechar_frase()
+            elif self._frase and self._frase[-1] != " ":
+                self._adicionar(" ")
+            self._virgula = False
+        else:
+            self._corrida = ""         # "3.5", "site.com": ponto colado não fecha
+            self._virgula = c == ","
+            self._adicionar(c)
+
+    def _fim_corrida(self, espaco):
+        corrida, self._corrida = self._corrida, ""
+        if "!" in corrida or "?" in corrida or espaco == "\n":
+            self._fechar_frase()
+        elif corrida.rstrip(FECHAMENTOS) == "." and self._abreviacao():
+            self._adicionar(" ")
+        else:
+            self._corrida = corrida
+            self._espera = True
+
+    def _abreviacao(self):
+        m = RE_ULTIMA_PALAVRA.search("".join(self._frase[-12:]))
+        if not m:
+            return False
+        palavra = m.group(1)
+        return palavra.lower() in ABREVIACOES or (len(palavra) == 1 and palavra.isupper())
+
+    def _adicionar(self, c):
+        if not self._frase and c == " ":
+            return
+        self._frase.append(c)
+        self._tamanho += 1
+
+    def _fechar_frase(self):
+        texto = "".join(self._frase).strip()
+        self._frase, self._tamanho = [], 0
+        self._corrida, self._espera, self._virgula = "", False, False
+        if any(ch.isalnum() for ch in texto):
+            self._visivel.append(texto)
+            self._eventos.append(Frase(texto))
@@ -0,0 +1,149 @@
+"""
+Perfil de hardware de áudio (EMEET M1A) persistido em JSON.
+
+A varredura do PyAudio (todos os dispositivos, taxas suportadas, canais) é
+feita uma vez e salva num arquivo indexado pelo conjunto de placas ALSA
+presentes (`/proc/asound/card*/id` + `usbid`). Nos boots seguintes — e a cada
+retomada da captura após um jogo — o ServicoCaptura lê o índice e as taxas do
+perfil sem sondar nada. Uma nova sondagem só acontece quando o conjunto de
+placas muda (outro dispositivo USB plugado/removido) ou quando o perfil salvo
+falha ao abrir o dispositivo.
+
+Também roda sozinho para conferir/refazer o perfil:
+  python3 src/perfil_audio.py [--sondar]
+"""
+import glob
+import json
+import os
+import time
+
+RAIZ_ASOUND = "/proc/asound"
+TAXAS_SONDADAS = (48000, 44100, 32000, 16000)
+
+
+def _ler(caminho):
+    try:
+        with open(caminho, encoding="utf-8") as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def conjunto_placas(raiz=RAIZ_ASOUND):
+    """Chave do conjunto de placas: 'M1A=328f:00ab,vc4hdmi0' (ordenada).
+    Placas USB entram com o ID do dispositivo; as internas só com o nome."""
+    placas = []
+    for pasta in glob.glob(os.path.join(raiz, "card[0-9]*")):
+        nome = _ler(os.path.join(pasta, "id"))
+        usbid = _ler(os.path.join(pasta, "usbid"))
+        placas.append(f"{nome}={usbid}" if usbid else nome)
+    return ",".join(sorted(p for p in placas if p))
+
+
+def _taxas_suportadas(pa, indice, entrada, taxa_padrao, taxas):
+    import pyaudio
+    suportadas = []
+    for taxa in [taxa_padrao, *taxas]:
+        if not taxa or taxa in suportadas:
+            continue
+        try:
+            if entrada:
+                pa.is_format_supported(taxa, input_device=indice, input_channels=1,
+                                       input_format=pyaudio.paInt16)
+            else:
+                pa.is_format_supported(taxa, output_device=indice, output_channels=1,
+                                       output_format=pyaudio.paInt16)
+            suportadas.append(taxa)
+        except ValueError:
+            continue
+    return suportadas
+
+
+def sondar(pa, nome_dispositivo="M1A", taxas=TAXAS_SONDADAS):
+    """Varre o PyAudio: dispositivo de entrada e de saída (o que tiver
+    `nome_dispositivo` no nome; senão o primeiro), taxas e canais.
+    A taxa nativa (defaultSampleRate) vem primeiro em `taxas`."""
+    escolhidos = {"entrada": None, "saida": None}
+    for i in range(pa.get_device_count()):
+        info = pa.get_device_info_by_index(i)
+        nome = info.get("name", "")
+        casa = bool(nome_dispositivo) and nome_dispositivo.lower() in nome.lower()
+        for lado, campo in (("entrada", "maxInputChannels"), ("saida", "maxOutputChannels")):
+            canais = int(info.get(campo, 0))
+            if canais <= 0:
+                continue
+            atual = escolhidos[lado]
+            if atual is None or (casa and not atual[1]):
+                escolhidos[lado] = ({"indice": i, "nome": nome, "canais": canais,
+                                     "taxa_padrao": int(info.get("defaultSampleRate") or 0)}, casa)
+    perfil = {"sondado_em": time.strftime("%Y-%m-%d %H:%M:%S")}
+    for lado, escolhido in escolhidos.items():
+        if escolhido is None:
+            perfil[lado] = None
+            continue
+        disp = escolhido[0]
+        disp["taxas"] = _taxas_suportadas(pa, disp["indice"], lado == "entrada",
+                                          disp["taxa_padrao"], taxas)
+        perfil[lado] = disp
+    return perfil
+
+
+class PerfilAudio:
+    """Perfis salvos em `caminho`, um por conjunto de placas."""
+
+    def __init__(self, caminho, nome_dispositivo="M1A", taxas=TAXAS_SONDADAS, raiz=RAIZ_ASOUND):
+        self.caminho = caminho
+        self.nome_dispositivo = nome_dispositivo
+        self.taxas = taxas
+        self.raiz = raiz
+
+    def _carregar(self):
+        try:
+            with open(self.caminho, encoding="utf-8") as f:
+                perfis = json.load(f)
+            return perfis if isinstance(perfis, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar(self, perfis):
+        pasta = os.path.dirname(self.caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+        temp = self.caminho + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(perfis, f, indent=2, ensure_ascii=False)
+        os.replace(temp, self.caminho)
+
+    def obter(self, pa=None, forcar=False):
+        """Perfil do conjunto de placas atual; sonda (com `pa`) só se não houver
+        perfil salvo para ele ou se `forcar`."""
+        chave = conjunto_placas(self.raiz)
+        perfis = self._carregar()
+        if not forcar and chave in perfis:
+            return perfis[chave]
+        if pa is None:
+            import pyaudio
+            pa_local = pa = pyaudio.PyAudio()
+        else:
+            pa_local = None
+        try:
+            perfil = sondar(pa, self.nome_dispositivo, self.taxas)
+        finally:
+            if pa_local is not None:
+                pa_local.terminate()
+        perfis[chave] = perfil
+        try:
+            self._salvar(perfis)
+        except OSError as e:
+            print(f"Audio: Não foi possível salvar o perfil de hardware: {e}")
+        entrada = perfil.get("entrada") or {}
+        print(f"Audio: Perfil de hardware sondado [{chave or 'sem placas'}] "
+              f"(entrada idx={entrada.get('indice')}, taxas={entrada.get('taxas')}).")
+        return perfil
+
+
+if __name__ == "__main__":
+    import sys
+    caminho = os.path.expanduser("~/projeto_robo/robo_tirilo/perfil_audio.json")
+    perfil = PerfilAudio(caminho).obter(forcar="--sondar" in sys.argv)
+    print(json.dumps(perfil, indent=2, ensure_ascii=False))
@@ -0,0 +1,130 @@
+"""
+Pipeline de fala: sintetiza as próximas frases enquanto a atual toca.
+
+Antes, cada frase da resposta da IA ia para um falar() bloqueante: a frase N+1
+só começava a ser sintetizada depois que a N terminava de tocar, deixando
+buracos de 0.3–1 s entre frases no Pi. Aqui um worker consome as frases em
+ordem e produz os blocos de áudio de cada uma numa fila própria; quem toca lê
+essas filas na mesma ordem. A primeira frase continua em streaming (toca a
+partir do primeiro bloco) e as seguintes já estão prontas quando chega a vez.
+
+- antecipação limitada: no máximo `antecipacao` frases sintetizadas à frente
+  da que está tocando (memória e CPU sob controle);
+- `parar` (barge-in/PARAR) descarta o áudio enfileirado e interrompe a síntese
+  em andamento (o gerador do motor é fechado no próximo bloco).
+"""
+import queue
+import threading
+
+
+class PipelineFala:
+    """`fonte(frase)` → iterável de blocos (amostras, taxa);
+    `tocar(amostras, taxa)` entrega um bloco à saída de áudio;
+    `parar` é um threading.Event de cancelamento."""
+
+    def __init__(self, fonte, tocar, parar, antecipacao=2):
+        self.fonte = fonte
+        self.tocar = tocar
+        self.parar = parar
+        self._frases = queue.Queue()
+        self._prontas = queue.Queue(maxsize=max(1, antecipacao))
+        self._cancelado = threading.Event()
+        self._worker = threading.Thread(target=self._sintetizar, daemon=True)
+        self._worker.start()
+
+    @property
+    def cancelado(self):
+        return self._cancelado.is_set() or self.parar.is_set()
+
+    # --- Entrada ---
+    def adicionar(self, frase):
+        self._frases.put(frase)
+
+    def fechar(self):
+        """Não há mais frases: executar() retorna quando a última tocar."""
+        self._frases.put(None)
+
+    def alimentar(self, frases):
+        """Consome um iterável de frases (ex.: gerador lendo o stream da IA)
+        numa thread própria e fecha a entrada ao final."""
+        def _alimentar():
+            try:
+                for frase in frases:
+                    if self.cancelado:
+                        break
+                    self.adicionar(frase)
+            except Exception as e:
+                print(f"[VOZ] Erro lendo as frases: {e}")
+            finally:
+                self.fechar()
+        threading.Thread(target=_alimentar, daemon=True).start()
+
+    # --- Worker (síntese) ---
+    def _colocar(self, fila, item):
+        while not self.cancelado:
+            try:
+                fila.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _sintetizar(self):
+        while True:
+            frase = self._frases.get()
+            if frase is None or self.cancelado:
+                self._colocar(self._prontas, None)
+                return
+            blocos = queue.Queue()
+            # Bloqueia aqui quando já há `antecipacao` frases à frente da que toca
+            if not self._colocar(self._prontas, blocos):
+                return
+            gerador = iter(self.fonte(frase))
+            try:
+                for bloco in gerador:
+                    if self.cancelado:
+                        break
+                    blocos.put(bloco)
+            except Exception as e:
+                print(f"[VOZ] Erro sintetizando '{frase[:30]}': {e}")
+            finally:
+                if hasattr(gerador, "close"):
+                    gerador.close()   # interrompe o motor (ex.: callback do Sherpa)
+                blocos.put(None)
+
+    # --- Consumidor (reprodução) ---
+    def _obter(self, fila):
+        while not self.cancelado:
+            try:
+                return fila.get(timeout=0.05)
+            except queue.Empty:
+                continue
+        return None
+
+    def executar(self):
+        """Toca as frases em ordem na thread de quem chama. Retorna True se
+        tudo foi entregue à saída, False se `parar` interrompeu."""
+        while True:
+            blocos = self._obter(self._prontas)
+            if blocos is None:
+                break
+            while True:
+                bloco = self._obter(blocos)
+                if bloco is None:
+                    break
+                self.tocar(*bloco)
+            if self.cancelado:
+                break
+        if self.cancelado:
+            self.cancelar()
+            return False
+        return True
+
+    def cancelar(self):
+        self._cancelado.set()
+        self._frases.put(None)
+        try:
+            while True:
+                self._prontas.get_nowait()
+        except queue.Empty:
+            pass
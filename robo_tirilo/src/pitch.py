@@ -0,0 +1,90 @@
+"""
+Deslocamento de pitch em memória (NumPy), no lugar do `sox ... pitch`.
+
+Mesmo princípio do efeito `pitch` do SoX: o trecho é esticado no tempo por
+WSOLA (Waveform Similarity Overlap-Add, janelas de Hann com 50% de sobreposição
+e busca do melhor encaixe por correlação cruzada) pelo fator r = 2^(cents/1200)
+e depois reamostrado por 1/r com o Reamostrador polifásico: a duração volta à
+original e o pitch sobe (ou desce) r vezes. Sem processo externo, sem WAV
+intermediário; cada bloco (uma sentença do Sherpa/Piper) é tratado sozinho.
+
+Como no SoX, os formantes acompanham o pitch (voz mais "infantil" para cents > 0).
+O fator é aproximado por uma fração pequena (ex.: 150 cents → 12/11, erro < 1 cent)
+para o filtro polifásico ficar curto.
+"""
+import subprocess
+from fractions import Fraction
+
+import numpy as np
+
+from src.reamostragem import reamostrar
+
+
+def fator_pitch(cents, max_denominador=64):
+    """r = 2^(cents/1200) como fração (numerador, denominador)."""
+    f = Fraction(2 ** (cents / 1200.0)).limit_denominator(max_denominador)
+    return f.numerator, f.denominator
+
+
+def esticar_wsola(x, fator, taxa, janela_ms=30, busca_ms=10):
+    """Estica (fator > 1) ou comprime (fator < 1) o tempo sem mudar o pitch.
+    Retorna float32 com ~len(x) * fator amostras."""
+    x = np.asarray(x, dtype=np.float32)
+    n = max(2, int(taxa * janela_ms / 1000) & ~1)     # janela (par)
+    hs = n // 2                                       # passo de síntese (50%)
+    ha = hs / fator                                   # passo de análise
+    delta = max(1, int(taxa * busca_ms / 1000))       # tolerância da busca
+    total = int(round(len(x) * fator))
+    if total == 0:
+        return np.zeros(0, dtype=np.float32)
+
+    # Zeros no início cobrem o fade-in da primeira janela; no fim, a última busca
+    xp = np.concatenate((np.zeros(hs + delta, dtype=np.float32), x,
+                         np.zeros(n + 2 * delta + hs, dtype=np.float32)))
+    janela = (0.5 - 0.5 * np.cos(2 * np.pi * np.arange(n) / n)).astype(np.float32)
+    quadros = -(-(total + hs) // hs) + 1
+    y = np.zeros(quadros * hs + n, dtype=np.float32)
+    limite = len(xp) - n - delta
+
+    anterior = delta
+    for k in range(quadros):
+        nominal = min(int(round(k * ha)) + delta, limite)
+        if k == 0:
+            pos = nominal
+        else:
+            # Segmento que continuaria naturalmente o quadro anterior
+            alvo = xp[anterior + hs:anterior + hs + n]
+            regiao = xp[nominal - delta:nominal + delta + n]
+            pos = nominal - delta + int(np.argmax(np.correlate(regiao, alvo, "valid")))
+        y[k * hs:k * hs + n] += xp[pos:pos + n] * janela
+        anterior = pos
+    return y[hs:hs + total]
+
+
+def deslocar_pitch(amostras, taxa, cents):
+    """Bloco PCM mono (int16, ou float em [-1, 1]) → int16 com o pitch deslocado
+    de `cents` e a mesma duração."""
+    x = np.asarray(amostras)
+    if x.dtype.kind == "f":
+        x = x * 32767.0
+    x = x.astype(np.float32)
+    if cents == 0 or len(x) == 0:
+        return np.clip(np.rint(x), -32768, 32767).astype(np.int16)
+    num, den = fator_pitch(cents)
+    esticado = esticar_wsola(x, num / den, taxa)
+    # Reamostrar por den/num devolve a duração original (num "amostras" viram den)
+    return reamostrar(esticado, num, den)
+
+
+def deslocar_pitch_sox(amostras, taxa, cents):
+    """Caminho antigo (SoX por pipe), mantido como referência do benchmark."""
+    x = np.asarray(amostras)
+    if x.dtype.kind == "f":
+        x = x * 32767.0
+    pcm = np.clip(x, -32768, 32767).astype(np.int16)
+    fmt = ["-t", "raw", "-r", str(taxa), "-e", "signed", "-b", "16", "-c", "1"]
+    res = subprocess.run(["sox", *fmt, "-", *fmt, "-", "pitch", str(cents)],
+                         input=pcm.tobytes(), capture_output=True)
+    if res.returncode != 0:
+        raise RuntimeError(res.stderr.decode(errors="ignore").strip())
+    return np.frombuffer(res.stdout, dtype=np.int16)
@@ -0,0 +1,139 @@
+"""
+Pré-aquecimento dos jogos: o processo sobe enquanto o robô ainda fala.
+
+Antes o jogo escolhido pela IA ([JOGO:codigo]) só era lançado depois da resposta
+inteira ser falada, e o `python3 jogo.py` frio ainda tinha de importar o pygame
+e carregar as imagens. Agora o tirilo.py abre o processo assim que a tag é
+lida; o jogo importa e carrega o que pode sem a tela e para em
+`aguardar_vez()`. Quando a fala termina (e o display e o áudio são liberados)
+o tirilo dá a vez e o jogo segue de onde parou. Barge-in, PARAR ou um jogo que
+não chega a ser lançado fecham a barreira e o jogo sai sem abrir a tela.
+
+Protocolo, por dois pipes herdados (fds em TIRILO_BARREIRA="leitura,escrita"):
+jogo → tirilo b"P" (pronto); tirilo → jogo b"G" (vai); EOF = cancelado.
+Um jogo lançado sem barreira (ou rodando sozinho) passa direto por
+`aguardar_vez()`; o tirilo só pré-aquece scripts que a chamam.
+"""
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+ENV_BARREIRA = "TIRILO_BARREIRA"
+_suporte = {}   # caminho → (mtime, chama aguardar_vez)
+
+
+# --- Lado do jogo ---
+def aguardar_vez():
+    """Chamar depois de importar/carregar os assets e antes de abrir tela, áudio
+    e servos. Sem barreira retorna na hora; cancelado, encerra o processo."""
+    valor = os.environ.pop(ENV_BARREIRA, None)
+    if not valor:
+        return
+    leitura, escrita = (int(fd) for fd in valor.split(","))
+    sinal = b""
+    try:
+        os.write(escrita, b"P")
+        os.close(escrita)
+        sinal = os.read(leitura, 1)
+    except OSError:
+        pass
+    finally:
+        try: os.close(leitura)
+        except OSError: pass
+    if sinal != b"G":
+        sys.exit(0)
+
+
+# --- Lado do tirilo ---
+def suporta_preaquecimento(script):
+    """O script chama aguardar_vez()? (lido uma vez por versão do arquivo)."""
+    try:
+        mtime = os.path.getmtime(script)
+    except OSError:
+        return False
+    cache = _suporte.get(script)
+    if cache is None or cache[0] != mtime:
+        try:
+            with open(script, encoding="utf-8", errors="ignore") as f:
+                cache = (mtime, "aguardar_vez(" in f.read())
+        except OSError:
+            cache = (mtime, False)
+        _suporte[script] = cache
+    return cache[1]
+
+
+class JogoPreaquecido:
+    """Processo do jogo parado na barreira. `liberar()` devolve o Popen já
+    seguindo; `cancelar()` fecha a barreira e encerra o grupo do processo."""
+
+    def __init__(self, codigo, cmd, env):
+        self.codigo = codigo
+        self.t0 = time.monotonic()
+        self.pronto_s = None
+        self._pronto = threading.Event()
+        leitura_jogo, self._vai = os.pipe()
+        self._aviso, escrita_jogo = os.pipe()
+        env = dict(env)
+        env[ENV_BARREIRA] = f"{leitura_jogo},{escrita_jogo}"
+        try:
+            self.proc = subprocess.Popen(cmd, env=env, pass_fds=(leitura_jogo, escrita_jogo),
+                                         start_new_session=True)
+        except Exception:
+            os.close(self._vai)
+            os.close(self._aviso)
+            raise
+        finally:
+            os.close(leitura_jogo)
+            os.close(escrita_jogo)
+        threading.Thread(target=self._esperar_pronto, daemon=True).start()
+
+    def _esperar_pronto(self):
+        try:
+            sinal = os.read(self._aviso, 1)
+        except OSError:
+            sinal = b""
+        finally:
+            os.close(self._aviso)
+        if sinal == b"P":
+            self.pronto_s = time.monotonic() - self.t0
+            print(f"[JOGO] {self.codigo} pré-aquecido em {self.pronto_s:.2f}s.")
+        self._pronto.set()
+
+    @property
+    def pronto(self):
+        return self.pronto_s is not None
+
+    @property
+    def vivo(self):
+        return self.proc.poll() is None
+
+    def liberar(self, timeout=10.0):
+        """Dá a vez ao jogo (espera ficar pronto até `timeout`). None se o
+        processo morreu antes — quem chama lança do jeito frio."""
+        self._pronto.wait(timeout)   # ainda carregando: o "G" fica no pipe até ele chegar lá
+        vai, self._vai = self._vai, None
+        try:
+            if vai is None or not self.vivo:
+                return None
+            os.write(vai, b"G")
+            return self.proc
+        except OSError:
+            return None
+        finally:
+            if vai is not None:
+                os.close(vai)
+
+    def cancelar(self, timeout=1.0):
+        if self._vai is not None:
+            try: os.close(self._vai)   # EOF: o jogo sai sozinho de aguardar_vez()
+            except OSError: pass
+            self._vai = None
+        try:
+            self.proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try: os.killpg(self.proc.pid, signal.SIGKILL)
+            except OSError: pass
+            self.proc.wait(timeout=timeout)
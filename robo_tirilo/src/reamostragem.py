@@ -0,0 +1,79 @@
+"""
+Reamostragem polifásica racional (ex.: 48 kHz → 16 kHz) em streaming.
+
+O filtro passa-baixas (sinc janelado com Kaiser) é decomposto em L fases; cada
+amostra de saída usa só os K coeficientes da sua fase, calculados de uma vez
+para o bloco inteiro com NumPy. O estado (histórico de entrada e fase) é
+mantido entre blocos, então a saída é contínua quadro a quadro.
+"""
+from math import gcd
+
+import numpy as np
+
+
+class Reamostrador:
+    """Converte blocos de `taxa_entrada` para `taxa_saida` mantendo o estado."""
+
+    def __init__(self, taxa_entrada, taxa_saida, taps_por_fase=24, beta=8.0, corte=0.92):
+        g = gcd(int(taxa_entrada), int(taxa_saida))
+        self.taxa_entrada = int(taxa_entrada)
+        self.taxa_saida = int(taxa_saida)
+        self.L = self.taxa_saida // g    # fator de interpolação
+        self.M = self.taxa_entrada // g  # fator de decimação
+        self.K = taps_por_fase
+
+        n = self.L * self.K
+        fc = corte * 0.5 / max(self.L, self.M)   # ciclos/amostra na taxa interpolada
+        t = np.arange(n) - (n - 1) / 2.0
+        h = 2 * fc * np.sinc(2 * fc * t) * np.kaiser(n, beta)
+        h *= self.L / h.sum()
+        # fases[p, k] = h[p + k*L]
+        self._fases = h.reshape(self.K, self.L).T.astype(np.float32).copy()
+        self._k = np.arange(self.K)
+        self.reiniciar()
+
+    def reiniciar(self):
+        self._hist = np.zeros(self.K - 1, dtype=np.float32)
+        self._t = 0   # instante (na taxa interpolada) da próxima saída, relativo ao bloco atual
+
+    @property
+    def identidade(self):
+        return self.L == self.M
+
+    def processar(self, bloco):
+        """Reamostra um bloco (int16 ou float) e devolve int16."""
+        if self.identidade:
+            return np.asarray(bloco, dtype=np.int16)
+        x = np.asarray(bloco, dtype=np.float32)
+        n = len(x)
+        ext = np.concatenate((self._hist, x))
+        limite = n * self.L
+        if self._t >= limite:
+            qtd = 0
+        else:
+            qtd = -(-(limite - self._t) // self.M)   # ceil
+        if qtd > 0:
+            t = self._t + self.M * np.arange(qtd)
+            idx = t // self.L + (self.K - 1)
+            fase = t % self.L
+            janelas = ext[idx[:, None] - self._k[None, :]]
+            y = np.einsum("ij,ij->i", janelas, self._fases[fase])
+        else:
+            y = np.zeros(0, dtype=np.float32)
+        self._t += self.M * qtd - limite
+        self._hist = ext[len(ext) - (self.K - 1):] if self.K > 1 else self._hist
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+
+
+def reamostrar(amostras, taxa_entrada, taxa_saida):
+    """Reamostragem de um trecho inteiro (sem estado)."""
+    if int(taxa_entrada) == int(taxa_saida):
+        return np.asarray(amostras, dtype=np.int16)
+    r = Reamostrador(taxa_entrada, taxa_saida)
+    # Completa com zeros para compensar o atraso do filtro e não perder o final
+    atraso = (r.K // 2)
+    saida = r.processar(np.concatenate((np.asarray(amostras, dtype=np.float32),
+                                        np.zeros(atraso, dtype=np.float32))))
+    corte = int(round(atraso * taxa_saida / taxa_entrada))
+    esperado = int(len(amostras) * taxa_saida / taxa_entrada)
+    return saida[corte:corte + esperado]
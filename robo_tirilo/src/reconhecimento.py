@@ -0,0 +1,150 @@
+"""
+Reconhecimento de fala (STT) plugável.
+
+Todo motor expõe `reconhecer(enunciado)` (src/captura.py) e devolve o texto em
+minúsculas ("" quando nada foi entendido). Motores com `streaming = True`
+também criam fluxos (`novo_fluxo()`) que recebem quadros ainda durante a fala
+e devolvem hipóteses parciais, para o loop agir antes do fim do enunciado.
+
+- ReconhecedorSherpa: sherpa-onnx OnlineRecognizer (zipformer/paraformer
+  streaming), roda no próprio Pi e não depende do Wi-Fi da clínica.
+- ReconhecedorGoogle: speech_recognition + Google (nuvem), opcional.
+"""
+import glob
+import os
+
+import numpy as np
+
+
+class Reconhecedor:
+    nome = "?"
+    streaming = False
+
+    def novo_fluxo(self):
+        raise NotImplementedError(f"{self.nome} não reconhece em streaming")
+
+    def reconhecer(self, enunciado):
+        raise NotImplementedError
+
+
+class FluxoSherpa:
+    """Um enunciado sendo decodificado quadro a quadro."""
+
+    def __init__(self, motor, taxa):
+        self._motor = motor
+        self._stream = motor.create_stream()
+        self.taxa = taxa
+        self.parcial = ""
+
+    def _resultado(self):
+        res = self._motor.get_result(self._stream)
+        texto = res if isinstance(res, str) else getattr(res, "text", "")
+        return texto.strip().lower()
+
+    def aceitar(self, amostras):
+        """Alimenta amostras int16; devolve a nova parcial se ela mudou, senão None."""
+        self._stream.accept_waveform(self.taxa, np.asarray(amostras, dtype=np.float32) / 32768.0)
+        while self._motor.is_ready(self._stream):
+            self._motor.decode_stream(self._stream)
+        texto = self._resultado()
+        if texto and texto != self.parcial:
+            self.parcial = texto
+            return texto
+        return None
+
+    def finalizar(self):
+        """Fecha o fluxo (com um pouco de silêncio para esvaziar o modelo) e devolve o texto final."""
+        self._stream.accept_waveform(self.taxa, np.zeros(int(0.3 * self.taxa), dtype=np.float32))
+        self._stream.input_finished()
+        while self._motor.is_ready(self._stream):
+            self._motor.decode_stream(self._stream)
+        self.parcial = self._resultado()
+        return self.parcial
+
+
+class ReconhecedorSherpa(Reconhecedor):
+    """STT local em streaming com sherpa-onnx.
+
+    `pasta` deve conter tokens.txt e encoder/decoder(/joiner) .onnx (versões
+    int8 têm preferência). Com joiner o modelo é tratado como transducer
+    (zipformer); sem joiner, como paraformer.
+    """
+    nome = "SHERPA"
+    streaming = True
+
+    def __init__(self, pasta, taxa=16000, num_threads=2, sherpa=None):
+        if sherpa is None:
+            import sherpa_onnx as sherpa
+        arquivos = _arquivos_modelo(pasta)
+        if arquivos is None:
+            raise FileNotFoundError(f"Nenhum modelo STT streaming em {pasta}")
+        self.taxa = taxa
+        comum = dict(tokens=arquivos["tokens"], encoder=arquivos["encoder"],
+                     decoder=arquivos["decoder"], num_threads=num_threads,
+                     sample_rate=taxa, feature_dim=80, decoding_method="greedy_search")
+        if arquivos.get("joiner"):
+            self._motor = sherpa.OnlineRecognizer.from_transducer(joiner=arquivos["joiner"], **comum)
+            tipo = "transducer"
+        else:
+            self._motor = sherpa.OnlineRecognizer.from_paraformer(**comum)
+            tipo = "paraformer"
+        print(f"STT: Sherpa {tipo} carregado ({os.path.basename(arquivos['encoder'])}).")
+
+    def novo_fluxo(self):
+        return FluxoSherpa(self._motor, self.taxa)
+
+    def reconhecer(self, enunciado):
+        fluxo = self.novo_fluxo()
+        fluxo.aceitar(enunciado.amostras)
+        return fluxo.finalizar()
+
+
+class ReconhecedorGoogle(Reconhecedor):
+    """Google via speech_recognition. Propaga sr.RequestError (sem internet)."""
+    nome = "GOOGLE"
+
+    def __init__(self, idioma="pt-BR", recognizer=None):
+        import speech_recognition as sr
+        self._sr = sr
+        self.idioma = idioma
+        self._r = recognizer or sr.Recognizer()
+
+    def reconhecer(self, enunciado):
+        audio = self._sr.AudioData(enunciado.pcm(), enunciado.taxa, 2)
+        try:
+            return self._r.recognize_google(audio, language=self.idioma).lower()
+        except self._sr.UnknownValueError:
+            return ""
+
+
+def escolher_arquivo_modelo(arquivos, chave):
+    """O .onnx de `chave` (encoder/decoder/joiner) entre `arquivos`, preferindo
+    o int8; None se não houver. Usado também pelo KWS (src/palavras_chave.py)."""
+    candidatos = [a for a in arquivos if chave in os.path.basename(a)]
+    if not candidatos:
+        return None
+    int8 = [a for a in candidatos if "int8" in os.path.basename(a)]
+    return sorted(int8 or candidatos)[0]
+
+
+def _arquivos_modelo(pasta):
+    if not pasta or not os.path.isdir(pasta):
+        return None
+    for tokens in sorted(glob.glob(os.path.join(pasta, "**", "tokens.txt"), recursive=True)):
+        onnx = glob.glob(os.path.join(os.path.dirname(tokens), "*.onnx"))
+        encoder = escolher_arquivo_modelo(onnx, "encoder")
+        decoder = escolher_arquivo_modelo(onnx, "decoder")
+        if encoder and decoder:
+            return {"tokens": tokens, "encoder": encoder, "decoder": decoder,
+                    "joiner": escolher_arquivo_modelo(onnx, "joiner")}
+    return None
+
+
+def criar_reconhecedor(motor="SHERPA", pasta_modelo=None, taxa=16000, idioma="pt-BR", recognizer=None):
+    """Cria o motor pedido; cai para Google se o Sherpa não puder ser carregado."""
+    if motor.upper() == "SHERPA":
+        try:
+            return ReconhecedorSherpa(pasta_modelo, taxa=taxa)
+        except Exception as e:
+            print(f"STT: Sherpa indisponível ({e}), usando Google.")
+    return ReconhecedorGoogle(idioma=idioma, recognizer=recognizer)
@@ -0,0 +1,332 @@
+"""
+Saída de áudio persistente (alto-falante do EMEET M1A).
+
+A SaidaAudio mantém UM stream de saída do PyAudio aberto pelo processo e
+recebe blocos PCM (int16 ou float em [-1, 1]) de qualquer motor de voz, na
+taxa do motor: cada bloco é reamostrado (Reamostrador em streaming) para a
+taxa do dispositivo e entra numa fila tocada por uma thread própria. A
+reprodução começa assim que o primeiro bloco chega — sem arquivo temporário,
+sem aplay por frase e sem abrir/fechar o ALSA a cada fala.
+
+Cada bloco é entregue à ReferenciaEco (AEC) no instante em que é escrito no
+dispositivo, então a referência é exatamente o que sai no alto-falante. O
+`relogio` (segundos de áudio já audíveis) e a posição devolvida por `tocar()`
+estão na mesma escala: é por eles que a boca acompanha a fala.
+
+Sem PyAudio (ou se o stream não abrir), a mesma fila alimenta um `aplay -t raw`
+por fala, pelo stdin. O mesmo vale enquanto a saída está pausada (jogo com o
+dispositivo): o stream persistente fica fechado, mas as falas pedidas pelo jogo
+via UDP continuam tocando, cada uma no seu aplay.
+"""
+import collections
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+from src.reamostragem import Reamostrador
+
+LATENCIA_APLAY = 0.1   # estimativa do buffer do aplay (o pipe não informa)
+
+
+class SaidaAudio:
+    """Fila de PCM tocada num stream de saída de vida longa.
+
+    `tocar(amostras, taxa)` enfileira e retorna na hora; `aguardar()` bloqueia
+    até a fila esvaziar; `interromper()` descarta o que falta (barge-in/PARAR);
+    `pausar()`/`retomar()` liberam o handle persistente para jogos e ferramentas.
+    """
+
+    def __init__(self, taxa=48000, perfil=None, nome_dispositivo="M1A",
+                 dispositivo_alsa="default", referencia_eco=None, bloco_ms=20):
+        self.taxa = taxa                    # taxa do dispositivo (o perfil pode trocar)
+        self.perfil = perfil
+        self.nome_dispositivo = nome_dispositivo
+        self.dispositivo_alsa = dispositivo_alsa
+        self.referencia_eco = referencia_eco
+        self.bloco_ms = bloco_ms
+        self._fila = collections.deque()
+        self._pendentes = 0                 # amostras na fila (ainda não escritas)
+        self._cond = threading.Condition()
+        self._tocando = False               # há áudio escrito ainda não drenado
+        self._pausado = False
+        self._fechado = threading.Event()
+        self._reamostradores = {}
+        self._pa = None
+        self._stream = None
+        self._canais = 1
+        self._aplay = None
+        self._sem_stream = False            # stream não abriu: aplay até o próximo retomar()
+        self._cortar = False                # interromper(): não espera o resto do buffer tocar
+        self._seg_fila = 0.0                # fim do áudio enfileirado (s, na linha do tempo da saída)
+        self._seg_escritos = 0.0            # áudio já entregue ao dispositivo (s)
+        self._latencia = 0.0                # buffer do dispositivo: escrito → audível
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    @property
+    def ocupada(self):
+        return bool(self._fila) or self._tocando
+
+    @property
+    def relogio(self):
+        """Segundos de áudio que já saíram no alto-falante (mesma escala de tocar())."""
+        return max(0.0, self._seg_escritos - self._latencia)
+
+    @property
+    def segundos_pendentes(self):
+        """Áudio enfileirado e ainda não escrito no dispositivo."""
+        return self._pendentes / self.taxa
+
+    # --- API dos motores de voz ---
+    def tocar(self, amostras, taxa):
+        """Enfileira um bloco PCM mono (int16, ou float em [-1, 1]) na taxa `taxa`.
+        Retorna o instante (escala do `relogio`) em que o bloco vai começar a tocar."""
+        x = np.asarray(amostras)
+        if x.dtype.kind == "f":
+            x = x * 32767.0
+        with self._cond:
+            if not self.ocupada:
+                self._reamostradores.clear()   # fala nova: sem histórico da anterior
+                self._seg_fila = self._seg_escritos
+            inicio = self._seg_fila
+            if len(x) == 0:
+                return inicio
+            if taxa != self.taxa:
+                r = self._reamostradores.get(taxa)
+                if r is None:
+                    r = self._reamostradores[taxa] = Reamostrador(taxa, self.taxa)
+                x = r.processar(x)
+            else:
+                x = np.clip(np.rint(x), -32768, 32767).astype(np.int16)
+            passo = max(1, int(self.taxa * self.bloco_ms / 1000))
+            for i in range(0, len(x), passo):
+                self._fila.append(x[i:i + passo])
+            self._pendentes += len(x)
+            self._seg_fila += len(x) / self.taxa
+            self._cond.notify_all()
+        return inicio
+
+    def aguardar(self, parar=None, timeout=None):
+        """Espera a fila tocar até o fim. False se `parar` (Event) interrompeu."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.ocupada:
+                if parar is not None and parar.is_set():
+                    return False
+                espera = 0.05 if limite is None else min(0.05, limite - time.monotonic())
+                if espera <= 0:
+                    return False
+                self._cond.wait(espera)
+        return True
+
+    def interromper(self):
+        """Descarta o áudio pendente (o bloco em escrita termina em ~bloco_ms)."""
+        with self._cond:
+            self._fila.clear()
+            self._pendentes = 0
+            self._seg_fila = self._seg_escritos
+            self._cortar = self._tocando
+            self._cond.notify_all()
+        if self.referencia_eco is not None:
+            self.referencia_eco.limpar()
+
+    def pausar(self, timeout=1.0):
+        """Fecha o stream persistente (jogo externo vai usar o dispositivo) e corta a
+        fala em curso; até retomar(), cada fala usa um aplay próprio."""
+        with self._cond:
+            if self._pausado:
+                return
+            self._pausado = True
+            self._fila.clear()
+            self._pendentes = 0
+            self._fechado.clear()
+            self._cond.notify_all()
+        self.interromper()
+        self._fechado.wait(timeout)
+
+    def retomar(self):
+        with self._cond:
+            self._pausado = False
+            self._sem_stream = False
+
+    # --- Dispositivo (só a thread de escrita mexe no stream) ---
+    def _abrir(self):
+        try:
+            import pyaudio
+        except ImportError:
+            return False
+        saida = None
+        if self.perfil is not None:
+            try:
+                saida = self.perfil.obter().get("saida")
+            except Exception as e:
+                print(f"Audio: Perfil de saída indisponível ({e}).")
+        indice = saida["indice"] if saida else None
+        taxas = list(saida.get("taxas") or []) if saida else []
+        canais = [1] + ([saida["canais"]] if saida and saida.get("canais", 1) > 1 else [2])
+        self._pa = pyaudio.PyAudio()
+        # A taxa atual primeiro: blocos já enfileirados foram reamostrados para ela
+        taxas = [self.taxa] + [t for t in taxas if t != self.taxa]
+        for taxa in taxas:
+            for n in canais:
+                try:
+                    self._stream = self._pa.open(format=pyaudio.paInt16, channels=n, rate=taxa,
+                                                 output=True, output_device_index=indice,
+                                                 frames_per_buffer=int(taxa * self.bloco_ms / 1000),
+                                                 start=False)
+                except Exception:
+                    continue
+                if taxa != self.taxa:
+                    with self._cond:
+                        self.taxa = taxa
+                        self._reamostradores.clear()
+                self._canais = n
+                try: self._latencia = self._stream.get_output_latency()
+                except Exception: self._latencia = 0.0
+                print(f"Audio: Saída persistente aberta (idx={indice}, {taxa} Hz, {n} canal(is)).")
+                return True
+        self._pa.terminate()
+        self._pa = None
+        print("Audio: Saída persistente indisponível; usando aplay por fala.")
+        return False
+
+    def _fechar(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception: pass
+            self._stream = None
+        if self._pa is not None:
+            try: self._pa.terminate()
+            except Exception: pass
+            self._pa = None
+        self._encerrar_aplay()
+
+    def _encerrar_aplay(self, esperar=False):
+        if self._aplay is None:
+            return
+        try:
+            self._aplay.stdin.close()
+            if esperar:
+                self._aplay.wait(timeout=5)
+            else:
+                self._aplay.terminate()
+        except Exception: pass
+        self._aplay = None
+
+    def _escrever(self, bloco):
+        if self.referencia_eco is not None:
+            self.referencia_eco.tocar(bloco, self.taxa)
+        if self._stream is None and self._aplay is None:
+            if self._pausado or self._sem_stream or not self._abrir():
+                self._sem_stream = True
+                self._aplay = subprocess.Popen(
+                    ["aplay", "-q", "-t", "raw", "-f", "S16_LE", "-r", str(self.taxa), "-c", "1",
+                     "-D", self.dispositivo_alsa],
+                    stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._latencia = LATENCIA_APLAY
+        if self._stream is not None:
+            if self._stream.is_stopped():
+                self._stream.start_stream()
+            dados = np.repeat(bloco, self._canais) if self._canais > 1 else bloco
+            self._stream.write(dados.tobytes(), exception_on_underflow=False)
+        elif self._aplay is not None:
+            self._aplay.stdin.write(bloco.tobytes())
+
+    def _drenar(self, cortar):
+        """Fila vazia: espera o que já foi escrito sair do alto-falante."""
+        if self._stream is not None:
+            try: self._stream.stop_stream()
+            except Exception: pass
+        else:
+            # Uma fala = um aplay: fecha o stdin e espera ele terminar (ou encerra, se cortada)
+            self._encerrar_aplay(esperar=not cortar)
+
+    def _loop(self):
+        while True:
+            with self._cond:
+                while not self._fila:
+                    if self._pausado and (self._stream is not None or self._pa is not None):
+                        break
+                    if self._tocando:
+                        break
+                    if self._pausado:
+                        self._fechado.set()
+                    self._cond.wait()
+                bloco = self._fila.popleft() if self._fila else None
+                if bloco is not None:
+                    self._pendentes -= len(bloco)
+                pausado = self._pausado
+                cortar, self._cortar = self._cortar, False
+                if bloco is not None:
+                    self._tocando = True
+            try:
+                if bloco is not None:
+                    self._escrever(bloco)
+                    with self._cond:
+                        self._seg_escritos += len(bloco) / self.taxa
+                    continue
+                if pausado and (self._stream is not None or self._pa is not None):
+                    self._fechar()
+                else:
+                    self._drenar(cortar)
+            except Exception as e:
+                print(f"Audio: Erro na saída persistente: {e}")
+                self._fechar()
+            with self._cond:
+                self._tocando = False
+                if pausado:
+                    self._fechado.set()
+                self._cond.notify_all()
+
+
+class SaidaNula:
+    """Mesma interface da SaidaAudio, sem dispositivo: o áudio "toca" na hora e
+    cada bloco é registrado (instante, amostras, taxa). Usada pelos benchmarks
+    para medir a síntese pelo caminho real do falar()."""
+
+    def __init__(self, gravar=False):
+        self.gravar = gravar                # guarda o PCM (para salvar WAV)
+        self.blocos = []                    # (perf_counter, nº de amostras, taxa)
+        self.audio = []                     # (amostras, taxa), se gravar
+        self._seg = 0.0
+        self._lock = threading.Lock()
+
+    ocupada = False
+    segundos_pendentes = 0.0
+
+    @property
+    def relogio(self):
+        return self._seg
+
+    def tocar(self, amostras, taxa):
+        x = np.asarray(amostras)
+        with self._lock:
+            inicio = self._seg
+            self._seg += len(x) / taxa
+            self.blocos.append((time.perf_counter(), len(x), taxa))
+            if self.gravar:
+                self.audio.append((x.copy(), taxa))
+        return inicio
+
+    def aguardar(self, parar=None, timeout=None):
+        return True
+
+    def interromper(self):
+        pass
+
+    def pausar(self, timeout=1.0):
+        pass
+
+    def retomar(self):
+        pass
+
+    def limpar(self):
+        """Devolve (blocos, audio) registrados até aqui e recomeça."""
+        with self._lock:
+            registro = (self.blocos, self.audio)
+            self.blocos, self.audio = [], []
+        return registro
@@ -0,0 +1,125 @@
+"""
+Sincronia labial a partir do PCM que está sendo tocado.
+
+Antes a boca abria com `random.choice([0, 50, 80, 50, 100])` a cada 150–250 ms,
+sem relação com o som, e cada sorteio virava uma escrita I2C no servo. Aqui cada
+bloco de fala entregue à SaidaAudio passa por um envelope vetorizado (RMS e
+cruzamentos por zero em quadros de 20 ms); o envelope vira uma trajetória de
+aberturas com instante marcado no relógio da saída de áudio, e uma thread
+aplica cada ponto quando o áudio correspondente chega ao alto-falante.
+
+- posições iguais consecutivas são colapsadas (só mudanças viram `mover_boca`),
+  assim como variações pequenas com a boca já aberta;
+- uma mudança só é aceita depois de `permanencia_ms` na posição anterior (o servo
+  não acompanha mais rápido que isso e a boca não treme), e a abertura escolhida é
+  o pico dos quadros dessa janela: a boca vai direto ao pico da sílaba;
+- fricativas (muitos cruzamentos por zero: s, f, x) limitam a abertura à média.
+"""
+import collections
+import threading
+
+import numpy as np
+
+NIVEIS = (0, 50, 80, 100)        # aberturas (%) que o servo e os sprites usam
+LIMIARES = (0.15, 0.40, 0.70)    # fração do pico de RMS da fala para cada nível
+LIMIAR_FRICATIVA = 0.30          # cruzamentos por zero por amostra
+DIFERENCA_MINIMA = 40            # entre duas aberturas não nulas (pontos percentuais)
+
+
+def envelope(amostras, taxa, quadro_ms=20):
+    """(RMS por quadro, cruzamentos por zero por amostra, duração do quadro em s)."""
+    x = np.asarray(amostras)
+    x = x * 32767.0 if x.dtype.kind == "f" else x.astype(np.float32)
+    n = max(1, int(taxa * quadro_ms / 1000))
+    qtd = -(-len(x) // n)
+    if qtd == 0:
+        return np.zeros(0), np.zeros(0), n / taxa
+    quadros = np.pad(x.astype(np.float32), (0, qtd * n - len(x))).reshape(qtd, n)
+    rms = np.sqrt(np.mean(quadros * quadros, axis=1))
+    cruzamentos = np.mean(np.signbit(quadros[:, 1:]) != np.signbit(quadros[:, :-1]), axis=1)
+    return rms, cruzamentos, n / taxa
+
+
+class SincroniaLabial:
+    """`relogio()` → segundos de áudio já audíveis (SaidaAudio.relogio);
+    `mover(abertura)` move o servo/sprite. `adicionar(inicio_s, amostras, taxa)`
+    recebe cada bloco com o instante em que ele começa no mesmo relógio."""
+
+    def __init__(self, relogio, mover, quadro_ms=20, permanencia_ms=150, piso=1500.0):
+        self.relogio = relogio
+        self.mover = mover
+        self.quadro_ms = quadro_ms
+        self.permanencia = permanencia_ms / 1000.0
+        self._pico = float(piso)              # RMS de referência (adapta ao volume da voz)
+        self._pontos = collections.deque()    # (instante, abertura), em ordem
+        self._lock = threading.Lock()
+        self._ultimo = 0                      # última abertura da trajetória
+        self._t_mudanca = float("-inf")
+        self._fim = 0.0                       # fim do áudio já recebido
+        self._atual = 0                       # abertura aplicada no servo
+        self._parar = threading.Event()
+        self._thread = None
+        self.movimentos = 0
+
+    @property
+    def ativa(self):
+        return self._thread is not None
+
+    def adicionar(self, inicio_s, amostras, taxa):
+        rms, cruzamentos, dt = envelope(amostras, taxa, self.quadro_ms)
+        if len(rms) == 0:
+            return
+        with self._lock:
+            self._pico = max(self._pico, float(rms.max()))
+            aberturas = np.asarray(NIVEIS)[np.digitize(rms / self._pico, LIMIARES)]
+            aberturas = np.where((cruzamentos > LIMIAR_FRICATIVA) & (aberturas > NIVEIS[1]),
+                                 NIVEIS[1], aberturas)
+            # Máximo dos próximos quadros da permanência: a boca já abre até o pico
+            # da sílaba (sem parar em 50/80) e só fecha quando o silêncio se mantém
+            k = max(1, int(round(self.permanencia / dt)))
+            estendidas = np.concatenate((aberturas, np.full(k - 1, aberturas[-1])))
+            aberturas = np.lib.stride_tricks.sliding_window_view(estendidas, k).max(axis=1)
+            tempos = inicio_s + np.arange(len(aberturas)) * dt
+            for t, abertura in zip(tempos, aberturas.tolist()):
+                # Colapsa posições iguais; mudança cedo demais espera os quadros seguintes
+                if abertura == self._ultimo or t - self._t_mudanca < self.permanencia:
+                    continue
+                if abertura and self._ultimo and abs(abertura - self._ultimo) < DIFERENCA_MINIMA:
+                    continue   # boca já aberta: variação pequena não vale um movimento
+                self._pontos.append((float(t), abertura))
+                self._ultimo = abertura
+                self._t_mudanca = t
+            self._fim = max(self._fim, inicio_s + len(amostras) / taxa)
+
+    # --- Thread do servo ---
+    def iniciar(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._executar, daemon=True)
+            self._thread.start()
+
+    def parar(self):
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._atual != 0:
+            self._aplicar(0)
+
+    def _aplicar(self, abertura):
+        self._atual = abertura
+        self.movimentos += 1
+        try:
+            self.mover(abertura)
+        except Exception as e:
+            print(f"[VOZ] Erro movendo a boca: {e}")
+
+    def _executar(self):
+        while not self._parar.wait(0.01):
+            agora = self.relogio()
+            alvo = None
+            with self._lock:
+                while self._pontos and self._pontos[0][0] <= agora:
+                    alvo = self._pontos.popleft()[1]
+                if alvo is None and not self._pontos and agora >= self._fim:
+                    alvo = self._ultimo = 0   # áudio acabou (pausa entre frases): fecha a boca
+            if alvo is not None and alvo != self._atual:
+                self._aplicar(alvo)
@@ -0,0 +1,182 @@
+"""
+Detecção de atividade de voz (VAD) em streaming.
+
+Os detectores são plugáveis: todos expõem `e_fala(quadro)` (quadro int16) e
+`reiniciar()`. O SegmentadorFala usa qualquer um deles para decidir início e
+fim do enunciado, com hangover configurável, e mede a latência de fim de fala
+(tempo entre o último quadro com voz e a decisão de encerrar).
+"""
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+
+def rms_int16(quadro):
+    """RMS de um quadro int16 (vetorizado)."""
+    if len(quadro) == 0:
+        return 0.0
+    x = quadro.astype(np.float32)
+    return float(np.sqrt(np.dot(x, x) / len(x)))
+
+
+class VadEnergia:
+    """VAD por energia com piso de ruído adaptativo (estatística de mínimos).
+
+    O piso acompanha o menor RMS visto na janela recente, então sobe sozinho
+    quando o ar-condicionado liga e desce quando a sala fica quieta. Um quadro
+    é voz quando o RMS passa de `fator` vezes o piso (e nunca abaixo de
+    `limiar_min`).
+    """
+
+    def __init__(self, taxa=16000, quadro=512, fator=3.0, limiar_min=200.0,
+                 janela_piso_s=2.0, piso_inicial=100.0, suavizacao=0.1):
+        self.fator = fator
+        self.limiar_min = limiar_min
+        self.suavizacao = suavizacao
+        self.piso_inicial = piso_inicial
+        self._janela = deque(maxlen=max(1, int(janela_piso_s * taxa / quadro)))
+        self.piso = piso_inicial
+        self.ultimo_rms = 0.0
+
+    @property
+    def limiar(self):
+        return max(self.limiar_min, self.piso * self.fator)
+
+    def reiniciar(self):
+        # O piso é mantido entre enunciados: o ruído da sala não muda a cada turno.
+        self._janela.clear()
+
+    def e_fala(self, quadro):
+        rms = rms_int16(quadro)
+        self.ultimo_rms = rms
+        self._janela.append(rms)
+        minimo = min(self._janela)
+        self.piso += self.suavizacao * (minimo - self.piso)
+        return rms > self.limiar
+
+
+class VadSilero:
+    """Silero VAD (rede neural) via sherpa_onnx. Exige áudio a 16 kHz."""
+
+    def __init__(self, modelo, taxa=16000, limiar=0.5, sherpa=None):
+        if sherpa is None:
+            import sherpa_onnx as sherpa
+        config = sherpa.VadModelConfig()
+        config.silero_vad.model = modelo
+        config.silero_vad.threshold = limiar
+        # Hangover é decidido pelo SegmentadorFala; aqui só o mínimo do modelo
+        config.silero_vad.min_silence_duration = 0.1
+        config.silero_vad.min_speech_duration = 0.1
+        config.sample_rate = taxa
+        self._config = config
+        self._sherpa = sherpa
+        self._vad = sherpa.VoiceActivityDetector(config, buffer_size_in_seconds=30)
+        self.piso = 0.0
+        self.ultimo_rms = 0.0
+
+    def reiniciar(self):
+        self._vad.reset()
+
+    def e_fala(self, quadro):
+        self.ultimo_rms = rms_int16(quadro)
+        self._vad.accept_waveform(quadro.astype(np.float32) / 32768.0)
+        # Descarta segmentos prontos: quem guarda o áudio é o buffer circular
+        while not self._vad.empty():
+            self._vad.pop()
+        return self._vad.is_speech_detected()
+
+
+def criar_vad(motor="SILERO", taxa=16000, quadro=512, modelo_silero=None, **kwargs_energia):
+    """Cria o VAD pedido; cai para VadEnergia se Silero não estiver disponível."""
+    if motor.upper() == "SILERO":
+        if taxa != 16000:
+            print(f"VAD: Silero exige 16 kHz (captura em {taxa} Hz), usando energia.")
+        elif not modelo_silero or not os.path.exists(modelo_silero):
+            print(f"VAD: Modelo Silero não encontrado ({modelo_silero}), usando energia.")
+        else:
+            try:
+                vad = VadSilero(modelo_silero, taxa=taxa)
+                print(f"VAD: Silero carregado ({modelo_silero}).")
+                return vad
+            except Exception as e:
+                print(f"VAD: Falha ao carregar Silero ({e}), usando energia.")
+    return VadEnergia(taxa=taxa, quadro=quadro, **kwargs_energia)
+
+
+class SegmentadorFala:
+    """Decide início/fim de um enunciado a partir de um VAD quadro a quadro.
+
+    `processar()` devolve "inicio" no primeiro quadro com voz confirmada,
+    "fim" quando o silêncio passa do hangover (ou do limite absoluto, mesmo
+    sem voz — confira `falando`) e None nos demais quadros. Depois do "fim",
+    `latencia_fim_ms` traz o tempo entre o último quadro com voz e a decisão.
+    """
+
+    def __init__(self, vad, taxa=16000, quadro=512, hangover_ms=700,
+                 min_fala_ms=100, max_segundos=24):
+        self.vad = vad
+        self.taxa = taxa
+        self.quadro = quadro
+        self.quadros_hangover = max(1, int(hangover_ms * taxa / 1000 / quadro))
+        self.quadros_min_fala = max(1, int(min_fala_ms * taxa / 1000 / quadro))
+        self.max_quadros = int(max_segundos * taxa / quadro)
+        self.inicio = None          # posição (amostra) do primeiro quadro com voz
+        self.fim = None             # posição (amostra) onde o enunciado termina
+        self.latencia_fim_ms = None
+        self.segmentos = []         # [(inicio, fim)] dos trechos com voz (posições absolutas)
+        self._seguidos = 0
+        self._silencio = 0
+        self._n = 0
+        self._t_ultima_voz = None
+        self._pos_ultima_voz = None
+        vad.reiniciar()
+
+    @property
+    def falando(self):
+        return self.inicio is not None
+
+    def processar(self, pos, quadro):
+        self._n += 1
+        voz = self.vad.e_fala(quadro)
+        agora = time.monotonic()
+        if self._n >= self.max_quadros:
+            self.fim = pos + len(quadro)
+            self._registrar_latencia(agora)
+            return "fim"
+        if voz:
+            self._silencio = 0
+            self._t_ultima_voz = agora
+            self._pos_ultima_voz = pos + len(quadro)
+            if self.segmentos and self.segmentos[-1][1] == pos:
+                self.segmentos[-1] = (self.segmentos[-1][0], pos + len(quadro))
+            else:
+                self.segmentos.append((pos, pos + len(quadro)))
+            if not self.falando:
+                self._seguidos += 1
+                if self._seguidos >= self.quadros_min_fala:
+                    self.inicio = pos - (self._seguidos - 1) * self.quadro
+                    return "inicio"
+            return None
+        self._seguidos = 0
+        if not self.falando:
+            self.segmentos.clear()   # ruído isolado antes da fala não conta
+        else:
+            self._silencio += 1
+            if self._silencio >= self.quadros_hangover:
+                self.fim = pos + len(quadro)
+                self._registrar_latencia(agora)
+                return "fim"
+        return None
+
+    def _registrar_latencia(self, agora):
+        if self._t_ultima_voz is not None:
+            self.latencia_fim_ms = (agora - self._t_ultima_voz) * 1000.0
+
+    def resumo(self):
+        """Linha de log com as métricas do enunciado."""
+        dur = ((self._pos_ultima_voz or 0) - (self.inicio or 0)) / self.taxa
+        lat = f"{self.latencia_fim_ms:.0f} ms" if self.latencia_fim_ms is not None else "-"
+        return (f"[VAD] Fim de fala: latência {lat} | fala {dur:.2f}s | "
+                f"piso {self.vad.piso:.0f} | {type(self.vad).__name__}")
@@ -0,0 +1,156 @@
+"""
+Voz NATURAL (Microsoft Edge TTS) em streaming, num event loop persistente.
+
+Antes, cada frase fazia `asyncio.run(gerar_audio_edge(...))`: um event loop
+novo, uma conexão nova, o MP3 inteiro baixado e só então decodificado. A
+VozEdge mantém UMA thread com um loop asyncio de vida longa e um conector
+aiohttp compartilhado (cache de DNS e pool reaproveitados entre frases). Os
+pedaços de MP3 vão para um `mpg123` por pipe assim que chegam do websocket, e o
+PCM decodificado sai em blocos para a saída de áudio — a fala começa no primeiro
+pedaço, não depois do download da frase inteira.
+"""
+import asyncio
+import subprocess
+import threading
+
+import numpy as np
+
+try:
+    import aiohttp
+    import edge_tts
+except ImportError:
+    aiohttp = None
+    edge_tts = None
+
+
+if aiohttp is not None:
+    class _ConectorCompartilhado(aiohttp.TCPConnector):
+        """O edge-tts abre (e fecha) uma ClientSession por frase, e a sessão fecha o
+        conector que recebe. Este ignora o close() da sessão; só fecha em encerrar()."""
+
+        def close(self, *args, **kwargs):
+            return asyncio.sleep(0)
+
+        def encerrar(self):
+            return super().close()
+
+
+class SinteseIncompleta(Exception):
+    """O stream caiu depois de já ter entregue áudio: a frase tocou cortada.
+    Quem chamou não troca de voz no meio (já ouviram parte), mas não deve
+    guardar esse áudio como a frase inteira."""
+
+
+def _escrever(destino, dados):
+    destino.write(dados)
+    destino.flush()
+
+
+class VozEdge:
+    """`blocos(texto)` → gerador de (amostras int16, taxa) enquanto o MP3 chega."""
+
+    def __init__(self, voz, taxa=24000, bloco_ms=100):
+        self.voz = voz
+        self.taxa = taxa
+        self.bloco_ms = bloco_ms
+        self._conector = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+        self._thread.start()
+
+    def _rodar(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def _comunicador(self, texto):
+        if self._conector is None or self._conector.closed:
+            self._conector = _ConectorCompartilhado(ttl_dns_cache=300)
+        try:
+            return edge_tts.Communicate(texto, self.voz, connector=self._conector)
+        except TypeError:
+            return edge_tts.Communicate(texto, self.voz)   # edge-tts antigo, sem `connector`
+
+    async def _baixar(self, texto, destino):
+        """Escreve os pedaços de MP3 no stdin do decodificador conforme chegam."""
+        recebidos = 0
+        try:
+            async for bloco in self._comunicador(texto).stream():
+                if bloco["type"] != "audio":
+                    continue
+                recebidos += len(bloco["data"])
+                # Escrita no pipe fora do loop: se a saída estiver cheia, só esta frase espera
+                await self._loop.run_in_executor(None, _escrever, destino, bloco["data"])
+        except (BrokenPipeError, ValueError):
+            pass   # decodificador encerrado (fala interrompida)
+        finally:
+            try: destino.close()
+            except OSError: pass
+        return recebidos
+
+    def blocos(self, texto, registrar=None):
+        """`registrar(proc, ativo)` recebe o mpg123 da frase (para o barge-in poder
+        encerrá-lo) e é chamado de novo com ativo=False no fim."""
+        if edge_tts is None:
+            raise RuntimeError("edge-tts não instalado")
+        decodificador = subprocess.Popen(
+            ["mpg123", "-q", "-s", "-m", "-r", str(self.taxa), "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            start_new_session=True)
+        if registrar:
+            registrar(decodificador, True)
+        futuro = asyncio.run_coroutine_threadsafe(self._baixar(texto, decodificador.stdin), self._loop)
+        tamanho = self.taxa * self.bloco_ms // 1000 * 2
+        sobra = b""
+        entregues = 0
+        try:
+            while True:
+                dados = decodificador.stdout.read1(tamanho)
+                if not dados:
+                    break
+                dados = sobra + dados
+                util = len(dados) - len(dados) % 2
+                sobra = dados[util:]
+                if util:
+                    entregues += util
+                    yield np.frombuffer(dados[:util], dtype=np.int16), self.taxa
+            # Erro de rede/serviço: sem áudio nenhum, quem chamou cai para outra voz;
+            # com parte já entregue, avisa que a frase ficou incompleta
+            try:
+                futuro.result(timeout=5)
+            except Exception as e:
+                if not entregues:
+                    raise
+                raise SinteseIncompleta(f"Edge cortou após {entregues // 2} amostras: {e}") from e
+        finally:
+            futuro.cancel()
+            decodificador.stdout.close()
+            if decodificador.poll() is None:
+                decodificador.terminate()
+            decodificador.wait()
+            if registrar:
+                registrar(decodificador, False)
+
+    def encerrar(self):
+        async def _fechar():
+            if self._conector is not None:
+                await self._conector.encerrar()
+        asyncio.run_coroutine_threadsafe(_fechar(), self._loop).result(timeout=2)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+    texto = " ".join(sys.argv[1:]) or "Olá! Eu sou o Tirilo. Vamos brincar juntos?"
+    edge = VozEdge("pt-BR-AntonioNeural")
+    for _ in range(2):   # a 2ª frase já usa o loop e o conector aquecidos
+        t0 = time.perf_counter()
+        primeiro = None
+        amostras = 0
+        for bloco, taxa in edge.blocos(texto):
+            if primeiro is None:
+                primeiro = time.perf_counter() - t0
+            amostras += len(bloco)
+        print(f"Edge: 1º bloco em {(primeiro or 0) * 1000:.0f} ms, total "
+              f"{time.perf_counter() - t0:.2f} s para {amostras / edge.taxa:.2f} s de áudio.")
+    edge.encerrar()
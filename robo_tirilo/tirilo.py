@@ -3,10 +3,131 @@
 =============================================================================
 PROJETO: ROBÔ TIRILO
 ARQUIVO: tirilo.py
-VERSÃO:  4.18 (Executor Unificado via saas_jogos + Fix PARAR subprocess)
-DATA:    05/04/2026
+VERSÃO:  4.19 (Pipeline de Áudio Persistente)
+DATA:    18/10/2026
 AUTOR:   Ricardo Alonso Boreto
 
+MUDANÇAS v4.19:
+- Microfone persistente (src/captura.py): ServicoCaptura abre o EMEET M1A uma única vez
+  no boot e alimenta um buffer circular com pre-roll (PRE_ROLL_MS = 300). capturar_voz,
+  barge-in e biometria leem do buffer — sem reabrir o PyAudio a cada turno e sem
+  cortar a primeira sílaba. Removidos _testar_vad() e o sleep de 0.2s.
+- VAD plugável (src/vad.py): Silero (sherpa_onnx) ou energia com piso de ruído
+  adaptativo, hangover configurável (VAD_HANGOVER_MS) e log da latência de fim de fala.
+  SILENCE_THRESH/THRESH fixos substituídos (captura e barge-in).
+- Enunciado em memória: capturar_voz, reconhecimento e biometria compartilham o mesmo
+  objeto Enunciado (int16 + taxa + trechos de voz). /tmp/voz_usuario.wav só é gravado
+  com TIRILO_SALVAR_AUDIO=1 (debug) ou no fallback arecord.
+- Captura na taxa nativa (src/reamostragem.py): o microfone abre em 48 kHz e um
+  decimador polifásico em streaming entrega quadros a 16 kHz (TAXA_VOZ) ao buffer.
+  VAD, STT, barge-in e biometria recebem sempre 16 kHz com a taxa correta no Enunciado;
+  o fallback arecord também é reamostrado (antes o WAV saía rotulado com a taxa errada).
+- STT plugável (src/reconhecimento.py): Sherpa-ONNX streaming local (STT_MOTOR = "SHERPA",
+  modelos em /modelos_stt) com hipóteses parciais durante a fala; Google vira backend
+  opcional e reserva. loop_logica mostra as parciais e encerra o enunciado assim que
+  aparece uma frase de controle (FRASES_ENCERRAR, FRASES_MODO_TERAPEUTA).
+- Palavras-chave no áudio (src/palavras_chave.py): KeywordSpotter do sherpa-onnx roda no
+  microfone persistente com a tabela gerada de FRASES_* e COMANDOS_MOVIMENTO (modelos em
+  /modelos_kws). "parar" chama finalizar_modo_geral() na hora; as demais frases viram
+  comando sem passar pelo STT. executar_movimento_voz() agora é uma tabela
+  (COMANDOS_MOVIMENTO) casada por uma única regex, no lugar das cadeias de any().
+- Barge-in para todos os motores (NATURAL, SHERPA, PIPER, espeak): o monitor consome o
+  stream do microfone persistente (energia NumPy, sem arecord) enquanto _robo_falando
+  está setado; os 0.5s iniciais servem de referência do nível de eco. Os processos de
+  áudio da fala são registrados (_executar_fala) e encerrados por grupo, inclusive
+  pipelines sox | aplay. PARAR também corta a fala em curso.
+- Cancelamento de eco (src/aec.py): filtro adaptativo NLMS particionado no domínio da
+  frequência (PBFDAF) usa o PCM enviado ao alto-falante como referência e remove o eco
+  do microfone antes de VAD, KWS e barge-in (AEC_ATIVO). Com AEC o limiar mínimo do
+  barge-in cai de 1500 para 500 (criança falando baixo consegue interromper).
+  Benchmark offline: ferramentas/benchmark_aec.py (ERLE e CPU por segundo de áudio).
+- Broker do dispositivo de áudio (src/broker_audio.py, Unix socket /tmp/tirilo_audio.sock):
+  concessões com prioridade e preempção confirmada substituem pkill -9 arecord/aplay/mpg123
+  e os sleeps de 0.15s/0.3s em _executar_jogo(). Jogos rodam em sessão própria e PARAR
+  encerra o grupo de processos do jogo (inclusive mpg123/aplay dele), sem matar áudio alheio.
+- Saída de áudio persistente (src/saida_audio.py): um stream PyAudio aberto pelo processo
+  recebe PCM em blocos de todos os motores (Sherpa por sentença via callback, Piper por
+  trecho, espeak lido do stdout, Edge decodificado em memória). Sem tempfile/WAV, sem
+  aplay/sox | aplay por frase; o pitch usa SoX por pipe. O bloco vira referência do AEC no
+  instante em que é escrito. Cede o dispositivo ao broker junto com a captura.
+- Cache de fala sintetizada (src/cache_voz.py): PCM final (com pitch) em LRU na RAM com
+  limite em bytes + WAVs endereçados por sha1 em cache_voz/, chave (motor, modelo, velocidade,
+  pitch, texto normalizado). Sons de pensar, "Parei tudo.", falas do parear_cores etc. são
+  aquecidos no boot e de novo quando RELOAD_CONFIG muda a voz. Motores viraram geradores de
+  blocos (_sintetizar) usados por falar() e pelo aquecimento.
+- Voz NATURAL em streaming (src/voz_edge.py): event loop asyncio persistente numa thread e
+  conector aiohttp compartilhado, no lugar de asyncio.run() por frase. Os pedaços de MP3 vão
+  para o mpg123 conforme chegam e o PCM toca a partir do primeiro pedaço (antes: download
+  da frase inteira). O mpg123 da frase entra em _processos_fala (barge-in/PARAR).
+- Pitch em NumPy (src/pitch.py): WSOLA + reamostragem polifásica no PCM em memória substitui
+  o subprocesso `sox pitch` de Sherpa/Piper (PITCH_MOTOR = "SOX" mantém o caminho antigo).
+  O método entra na chave do cache de voz. Comparação de CPU/qualidade:
+  ferramentas/benchmark_pitch.py.
+- Sincronia labial (src/sincronia_labial.py): a boca segue o envelope (RMS e cruzamentos por
+  zero em quadros de 20 ms) do PCM entregue à saída, com cada abertura marcada no relógio da
+  SaidaAudio, no lugar do random.choice a cada 150–250 ms. Posições iguais consecutivas são
+  colapsadas e há permanência mínima de 150 ms: ~3 escritas I2C/s em mover_boca (antes ~5/s).
+  animar_fala() fica só para a música (mpg123), também sem repetir posição.
+- Gerenciador dos motores de voz (src/motores_voz.py): Sherpa e Piper carregam numa thread de
+  fundo (boot e RELOAD_CONFIG), com tempo de carga e RSS de cada motor no log. Enquanto o
+  motor novo carrega, continua falando o anterior — a troca de voz no SaaS não trava o loop
+  principal. Motor não selecionado e sem uso há MOTORES_VOZ_OCIOSO_MIN minutos sai da RAM.
+  O aquecimento do cache de voz virou uma thread que atende pedidos (_pedido_aquecimento).
+- Pipeline de fala (src/pipeline_fala.py): perguntar_gemini() entrega as frases do stream a
+  falar_frases(); um worker sintetiza até FALA_ANTECIPACAO frases à frente enquanto a atual
+  toca, sem buracos entre frases. Barge-in/PARAR descarta o áudio enfileirado e fecha a
+  síntese em andamento. Boca e barge-in cobrem a resposta inteira.
+- Perfil de hardware de áudio (src/perfil_audio.py → perfil_audio.json): índice do microfone,
+  taxas suportadas e canais sondados uma vez por conjunto de placas (/proc/asound usbid);
+  boot e retomada após jogos abrem o dispositivo direto, sem varrer o PyAudio.
+- Construção dos motores de voz por CONFIG_TTS (threads do onnxruntime, sentenças por
+  chamada, provider) para Sherpa e Piper; BIOMETRIA_THREADS para o extrator. Modo
+  `python3 tirilo.py --bench-tts` varre threads × tamanho de texto e mostra RTF e tempo até a
+  primeira amostra de cada configuração, para escolher o ajuste de cada robô.
+- Benchmark de latência de voz (ferramentas/benchmark_tts.py): roda o falar() de verdade com
+  a saída trocada por SaidaNula (src/saida_audio.py, registra os blocos sem tocar) sobre um
+  corpus pt-BR de frases curtas/médias/longas, um processo por motor. Tabela e JSON (logs/)
+  com tempo até o primeiro áudio, síntese total, RTF, CPU e pico de RSS; --comparar mostra a
+  variação em relação a uma versão anterior.
+- Agenda de falas (src/agenda_fala.py): o servidor UDP 5050 e falar_prioridade() não abrem
+  mais uma thread de falar() por pedido. Uma thread fala um pedido por vez com prioridade
+  (sistema > jogo > conversa; a maior corta a fala menor em curso), agrupa frases repetidas
+  e cancela a fila no PARAR. Pedidos JSON com "id" recebem "aceito" e o estado final
+  (fim/interrompido/cancelado); o parearcor.py usa isso no lugar da sonda ICMP e espera a
+  frase terminar em vez de pygame.time.wait(). falar_frases() retorna se falou até o fim.
+- Conversa com memória (src/conversa.py): perguntar_gemini() manda o histórico da sessão
+  (turnos com a thought_signature da resposta, no lugar de ULTIMO_THOUGHT_SIGNATURE) limitado
+  a CONVERSA_ORCAMENTO_TOKENS; os turnos antigos viram um resumo feito em segundo plano. A
+  instrução de sistema (_instrucao_sistema) só é remontada quando perfil/modo/jogos mudam e
+  vai por cache de contexto do Gemini quando disponível (CONVERSA_CACHE_CONTEXTO). Troca de
+  modo/perfil ou CONVERSA_EXPIRA_MIN sem conversa recomeçam o histórico. Log de tokens por turno.
+- Parser incremental da resposta (src/parser_resposta.py): uma passada por caractere no lugar
+  do re.search de frase + re.search/re.sub da tag. Frases pt-BR não quebram mais em "Dr.",
+  "5.5" ou "Hmm..."; frase longa sem ponto é cortada numa vírgula; a tag [JOGO:x] vira evento
+  no instante do "]" (gancho _ao_evento_resposta), sem esperar a frase terminar.
+  TIRILO_GRAVAR_STREAM=1 grava os pedaços de cada resposta em ARQUIVO_STREAMS_IA para o
+  ferramentas/benchmark_parser.py.
+- Pré-aquecimento do jogo (src/preaquecimento_jogo.py): a tag [JOGO:x] já abre o processo do
+  jogo (_preaquecer_jogo) enquanto o resto da resposta é falado; o jogo importa o pygame e
+  decodifica as imagens e para em aguardar_vez(). Terminada a fala, _executar_jogo só dá a vez
+  (log "Vez dada ... em N ms"); barge-in, PARAR, erro da IA ou JOGO_PREAQUECIDO_VALIDADE_S sem
+  lançamento fecham a barreira e o jogo sai sem abrir a tela. Jogos sem aguardar_vez() e
+  JOGO_PREAQUECER=False seguem o lançamento frio de antes.
+- Roteador local de intenções (src/intencoes.py): parar, modos, saída, movimento, música
+  (FRASES_MUSICA → tocar_musica) e jogos de _jogos_disponiveis numa tabela só
+  (_roteador_intencoes, recompilada quando a lista de jogos muda), lida numa passada sobre o
+  texto sem acentos e por palavra inteira ("eco" não casa mais em "boneco", "sair do modo" não
+  encerra o robô). Movimento/música/jogo com confiança < INTENCAO_CONFIANCA_MIN vão para a
+  IA quando ela está ativa. _detectar_jogo_por_voz() saiu; ferramentas/benchmark_intencoes.py.
+- Cache de respostas da IA (src/cache_respostas.py): pergunta repetida do mesmo perfil/modo
+  (exata ou vizinha acima de CACHE_RESPOSTAS_LIMIAR) é falada na hora, sem som de pensar e
+  sem rede — também offline/sem chave. Só entram respostas inteiras, ouvidas até o fim e sem
+  [JOGO]; com histórico na sessão, só perguntas autônomas (não "e o que ele come"). Vizinha
+  com outra negação ("não gosta" × "gosta") não vale. Vencem em CACHE_RESPOSTAS_TTL_H e saem
+  quando o prompt do perfil muda. RELOAD_CONFIG descarta as da clínica, MUDAR_PERFIL as do
+  perfil feitas com outro prompt. As respostas mais usadas entram no aquecimento do cache de
+  voz; ferramentas/teste_cache_respostas.py.
+
 MUDANÇAS v4.18:
 - Integração do motor Sherpa-ONNX (Voz Neural de Alta Performance):
   Sintetiza frases em menos de 1 segundo (quase 5x mais rápido que o Piper original).
@@ -90,18 +211,18 @@ MUDANÇAS v4.3 (histórico):
 import os
 import sys
 import math
-import re
 import threading
 import time
 import subprocess
+import signal
 import random
 import pygame
 import queue
+import functools
+import json
 import speech_recognition as sr
 import socket
 from dotenv import load_dotenv
-import asyncio
-import edge_tts
 from google import genai
 from google.genai import types
 import cv2
@@ -119,10 +240,31 @@ except ImportError:
     _SHERPA_DISPONIVEL = False
 from olhos_tirilo import ControladorOlhos
 from src.cloud import CloudManager
+from src.captura import ServicoCaptura, Enunciado
+from src.vad import VadEnergia, SegmentadorFala, criar_vad
+from src.reconhecimento import criar_reconhecedor
+from src.palavras_chave import TabelaPalavrasChave, EscutaPalavrasChave
+from src.intencoes import RoteadorIntencoes, Entrada
+from src.cache_respostas import CacheRespostas, assinatura, autonoma
+from src.aec import CanceladorEco, ReferenciaEco
+from src.perfil_audio import PerfilAudio
+from src.saida_audio import SaidaAudio
+from src.cache_voz import CacheVoz, normalizar_texto
+from src.pipeline_fala import PipelineFala
+from src.voz_edge import VozEdge, SinteseIncompleta
+from src.pitch import deslocar_pitch, deslocar_pitch_sox
+from src.sincronia_labial import SincroniaLabial
+from src.motores_voz import GerenciadorMotores
+from src.agenda_fala import AgendaFala, ler_mensagem, mensagem_estado
+from src.conversa import SessaoConversa
+from src.parser_resposta import ParserResposta, Frase, Tag
+from src.preaquecimento_jogo import JogoPreaquecido, suporta_preaquecimento
+from src.broker_audio import (BrokerAudio, ClienteAudio, ENV_CONCEDIDO,
+                              PRIORIDADE_ROBO, PRIORIDADE_JOGO)
 
 # --- 1. CONFIGURAÇÕES GLOBAIS ---
 NOME_ROBO = "Tirilo"
-VERSAO_ATUAL = "4.18"
+VERSAO_ATUAL = "4.19"
 AUTOR = "Ricardo Alonso Boreto"
 
 # Configurações de Jogo
@@ -135,12 +277,97 @@ QTD_CHARADAS = 5
 # Se o nome não funcionar, substitua por "plughw:1,0" com o card correto.
 DISPOSITIVO_AUDIO = "plughw:CARD=M1A,DEV=0"
 TAXA_CAPTURA      = 48000   # EMEET M1A opera nativamente em 48 kHz
+TAXA_VOZ          = 16000   # Taxa entregue a VAD, STT, barge-in e biometria (reamostrada)
+PRE_ROLL_MS       = 300     # Áudio mantido antes do disparo do VAD (não corta a 1ª sílaba)
+# Índices/taxas do dispositivo sondados uma vez e salvos por conjunto de placas USB;
+# nova sondagem só quando o hardware muda (python3 src/perfil_audio.py --sondar força).
+CAMINHO_PERFIL_AUDIO = os.path.expanduser("~/projeto_robo/robo_tirilo/perfil_audio.json")
+
+# Cancelamento de eco: a fala do robô (PCM enviado ao alto-falante) é a referência
+# subtraída do microfone antes de VAD, KWS e barge-in.
+AEC_ATIVO         = True
+AEC_ATRASO_MS     = 40      # Latência da saída persistente/ALSA até o alto-falante
+AEC_TAPS          = 2048    # Cobertura do filtro (128 ms a 16 kHz): atraso residual + reverberação
+_referencia_eco = ReferenciaEco(TAXA_VOZ, atraso_ms=AEC_ATRASO_MS) if AEC_ATIVO else None
+
+_perfil_audio = PerfilAudio(CAMINHO_PERFIL_AUDIO, nome_dispositivo="M1A")
+
+# Microfone persistente: aberto uma vez no boot (loop_logica) e compartilhado por
+# capturar_voz, barge-in e biometria através do buffer circular.
+_servico_captura = ServicoCaptura(
+    taxa=TAXA_VOZ, taxa_alternativa=TAXA_CAPTURA, pre_roll_ms=PRE_ROLL_MS,
+    cancelador_eco=CanceladorEco(taps=AEC_TAPS) if AEC_ATIVO else None,
+    referencia_eco=_referencia_eco,
+    perfil=_perfil_audio
+)
+# Alto-falante: um stream de saída para toda a vida do processo; todos os motores de
+# voz entregam PCM em blocos (sem WAV temporário, sem aplay por frase).
+_saida_audio = SaidaAudio(
+    taxa=TAXA_CAPTURA, perfil=_perfil_audio, nome_dispositivo="M1A",
+    dispositivo_alsa=DISPOSITIVO_AUDIO, referencia_eco=_referencia_eco
+)
+_ULTIMO_ENUNCIADO = None  # Enunciado (em memória) da última fala capturada
+
+# --- VAD (detecção de voz) ---
+VAD_MOTOR         = "SILERO"  # "SILERO" (sherpa_onnx) ou "ENERGIA"; Silero cai para energia se faltar o modelo
+MODELO_VAD_SILERO = os.path.expanduser("~/projeto_robo/robo_tirilo/modelos_vad/silero_vad.onnx")
+VAD_HANGOVER_MS   = 700       # Silêncio após a fala para encerrar o enunciado
+VAD_MAX_SEGUNDOS  = 24        # Limite absoluto de um enunciado (segurança)
+VAD_FATOR_RUIDO   = 3.0       # Voz = RMS acima de N x piso de ruído adaptativo
+VAD_LIMIAR_MIN    = 200       # RMS mínimo absoluto para voz (sala silenciosa)
+BARGE_IN_ATIVO    = True      # Interromper a fala do robô (qualquer motor) quando a pessoa fala
+BARGE_IN_FATOR    = 4.0       # Barge-in: piso inclui o eco do próprio robô
+BARGE_IN_LIMIAR_MIN = 1500 if not AEC_ATIVO else 500   # Com AEC o eco sai antes: voz baixa já interrompe
+_vad_captura = None   # Criado após abrir o microfone
+
+# --- Reconhecimento de fala (STT) ---
+STT_MOTOR         = "SHERPA"  # "SHERPA" (local, streaming) ou "GOOGLE" (nuvem); Sherpa cai para Google se faltar o modelo
+PASTA_MODELO_STT  = os.path.expanduser("~/projeto_robo/robo_tirilo/modelos_stt")
+_reconhecedor = None  # Criado no boot (loop_logica)
+
+# Frases de controle (também checadas nas parciais do STT para encerrar o enunciado cedo)
+FRASES_MODO_TERAPEUTA = ("doutor tirilo", "doutortor turilo", "doutor turilo",
+                         "doutoto turilo", "dr torino", "dr tirilo")
+FRASES_ENCERRAR = ("tchau", "sair")
+FRASES_PARAR = ("parar", "pare tudo", "para tudo")
+# Demais intenções locais (roteador em src/intencoes.py; comparadas sem acentos e por palavra inteira)
+FRASES_VOLTAR = ("voltar", "sair do modo")
+FRASES_LISTAR_ARQUIVOS = ("listar arquivos", "logs")
+FRASES_MODO_IA = ("gemini",)
+FRASES_MODO_ECO = ("desativar", "eco")
+FRASES_MUSICA = ("cante uma música", "canta uma música", "cantar uma música", "toque uma música",
+                 "toca uma música", "canta pra mim", "cante pra mim")
+INTENCAO_CONFIANCA_MIN = 0.35   # Movimento/música/jogo abaixo disso vão para a IA (se ativa)
+
+# --- Palavras-chave no áudio (sherpa-onnx KeywordSpotter) ---
+# Sem modelo, as mesmas frases são checadas nas parciais do STT streaming.
+PASTA_MODELO_KWS  = os.path.expanduser("~/projeto_robo/robo_tirilo/modelos_kws")
+KWS_VALIDADE_S    = 2.0   # Detecção mais velha que isso é descartada (não vira comando atrasado)
+_escuta_kws = None
+
+# --- Broker do dispositivo de áudio (src/broker_audio.py) ---
+_broker_audio = None
+_cliente_audio_robo = None   # Concessão do próprio robô (prioridade mais baixa)
+_fila_kws = queue.Queue()            # (instante, rótulo) detectados pelo KWS
+_kws_disparou = threading.Event()    # Interrompe a captura atual: o comando já foi reconhecido
+_ultimo_parar_kws = 0.0
+
+# --- Construção dos motores de voz neurais (onnxruntime) ---
+# No Pi 5 (4 núcleos) o melhor ajuste depende do modelo de voz e do que mais está
+# rodando (STT, KWS, biometria). Meça no robô com: python3 tirilo.py --bench-tts
+#   num_threads:       threads do onnxruntime (Piper: 0 = padrão do onnxruntime)
+#   max_num_sentences: sentenças sintetizadas por chamada (cada uma sai no callback)
+#   provider:          "cpu" (ou "cuda", onde houver)
+CONFIG_TTS = {
+    "SHERPA": {"num_threads": 2, "max_num_sentences": 1, "provider": "cpu"},
+    "PIPER":  {"num_threads": 0, "provider": "cpu"},
+}
 
 # --- Configuração Piper (Voz Neural Local) ---
-_PIPER_INSTANCIA = None
 PASTA_VOZES_PIPER = os.path.expanduser("~/projeto_robo/robo_tirilo/vozes_piper")
 PIPER_VELOCIDADE = 1.4 # > 1.0 é mais devagar (ideal para crianças)
 PIPER_PITCH = 150      # 0 = normal, > 0 mais agudo (amigável), < 0 mais grave
+PITCH_MOTOR = "WSOLA"  # "WSOLA" (NumPy, no processo) ou "SOX" (subprocesso; comparar com ferramentas/benchmark_pitch.py)
 
 def _buscar_modelo_piper():
     """Busca o primeiro arquivo .onnx na pasta de vozes."""
@@ -156,7 +383,7 @@ def _buscar_modelo_piper():
 CAMINHO_MODELO_PIPER = _buscar_modelo_piper()
 
 # --- Configuração Sherpa-ONNX (Voz Neural de Alta Performance) ---
-_SHERPA_INSTANCIA = None
+_MODELO_SHERPA = None   # Modelo carregado (faz parte da chave do cache de voz)
 PASTA_VOZES_SHERPA = os.path.expanduser("~/projeto_robo/robo_tirilo/vozes_sherpa")
 
 def _buscar_modelo_sherpa():
@@ -173,88 +400,102 @@ def _buscar_modelo_sherpa():
                 return {"pasta": path_d, "modelo": os.path.join(path_d, onnx[0])}
     return None
 
-def _inicializar_sherpa():
-    """Carrega o motor Sherpa-ONNX na RAM."""
-    global _SHERPA_INSTANCIA
+def _criar_sherpa(info, num_threads, max_num_sentences, provider):
+    """Monta um OfflineTts para o modelo `info` (usado pelo boot e pelo --bench-tts)."""
+    tokens_path = os.path.join(info['pasta'], "tokens.txt")
+    data_dir = os.path.join(info['pasta'], "espeak-ng-data")
+    if not os.path.exists(data_dir):
+        data_dir = "/usr/lib/arm-linux-gnueabihf/espeak-ng-data"
+
+    vits_config = _sherpa_onnx.OfflineTtsVitsModelConfig(
+        model=info['modelo'],
+        lexicon="",
+        tokens=tokens_path,
+        data_dir=data_dir,
+        noise_scale=0.667,
+        noise_scale_w=0.8,
+        length_scale=PIPER_VELOCIDADE 
+    )
+    config = _sherpa_onnx.OfflineTtsConfig(
+        model=_sherpa_onnx.OfflineTtsModelConfig(vits=vits_config, num_threads=num_threads,
+                                                 provider=provider),
+        max_num_sentences=max_num_sentences,
+    )
+    return _sherpa_onnx.OfflineTts(config)
+
+def _criar_piper(caminho, num_threads, provider):
+    """Carrega um PiperVoice. O piper-tts não expõe as threads do onnxruntime: com
+    num_threads > 0 a sessão é recriada com SessionOptions próprias."""
+    voz = PiperVoice.load(caminho, config_path=caminho + ".json", use_cuda=(provider == "cuda"))
+    if num_threads > 0:
+        try:
+            import onnxruntime
+            opcoes = onnxruntime.SessionOptions()
+            opcoes.intra_op_num_threads = num_threads
+            opcoes.inter_op_num_threads = 1
+            provedores = (["CUDAExecutionProvider"] if provider == "cuda" else []) + ["CPUExecutionProvider"]
+            voz.session = onnxruntime.InferenceSession(caminho, sess_options=opcoes, providers=provedores)
+        except Exception as e:
+            print(f"Piper: Não foi possível fixar {num_threads} thread(s) ({e}); usando o padrão do onnxruntime.")
+    # Aplica a velocidade globalmente na instância
+    voz.config.length_scale = PIPER_VELOCIDADE
+    return voz
+
+def _carregar_sherpa():
+    """Constrói o motor Sherpa-ONNX (chamado pelo _motores_voz, fora do loop principal)."""
+    global _MODELO_SHERPA
     if not _SHERPA_DISPONIVEL:
         print("Sherpa: Biblioteca sherpa-onnx não instalada.")
-        return
+        return None
     
     info = _buscar_modelo_sherpa()
-    if info:
-        try:
-            print(f"Sherpa: Carregando modelo {info['modelo']} na RAM...")
-            tokens_path = os.path.join(info['pasta'], "tokens.txt")
-            data_dir = os.path.join(info['pasta'], "espeak-ng-data")
-            if not os.path.exists(data_dir):
-                data_dir = "/usr/lib/arm-linux-gnueabihf/espeak-ng-data"
-
-            vits_config = _sherpa_onnx.OfflineTtsVitsModelConfig(
-                model=info['modelo'],
-                lexicon="",
-                tokens=tokens_path,
-                data_dir=data_dir,
-                noise_scale=0.667,
-                noise_scale_w=0.8,
-                length_scale=PIPER_VELOCIDADE 
-            )
-            config = _sherpa_onnx.OfflineTtsConfig(
-                model=_sherpa_onnx.OfflineTtsModelConfig(vits=vits_config, num_threads=2),
-                max_num_sentences=1,
-            )
-            _SHERPA_INSTANCIA = _sherpa_onnx.OfflineTts(config)
-            print(f"Sherpa: Motor carregado com sucesso.")
-        except Exception as e:
-            print(f"Sherpa: Erro ao carregar motor: {e}")
-    else:
+    if not info:
         print(f"Sherpa: Nenhum modelo compatível em {PASTA_VOZES_SHERPA}")
-
-# Testa suporte a PyAudio/VAD uma única vez no startup
-def _testar_vad():
-    try:
-        import pyaudio
-        pa = pyaudio.PyAudio()
-        mic_idx = next((i for i in range(pa.get_device_count())
-                        if pa.get_device_info_by_index(i).get("maxInputChannels", 0) > 0), None)
-        s = pa.open(format=pyaudio.paInt16, channels=1, rate=16000,
-                    input=True, input_device_index=mic_idx, frames_per_buffer=1024)
-        s.close(); pa.terminate()
-        return True
-    except Exception:
-        return False
-
-def _inicializar_piper():
-    """Carrega o modelo do Piper na RAM se os arquivos existirem."""
-    global _PIPER_INSTANCIA, CAMINHO_MODELO_PIPER
+        return None
+    cfg = CONFIG_TTS["SHERPA"]
+    print(f"Sherpa: Carregando modelo {info['modelo']} na RAM "
+          f"({cfg['num_threads']} thread(s), {cfg['max_num_sentences']} sentença(s)/chamada, {cfg['provider']})...")
+    instancia = _criar_sherpa(info, **cfg)
+    _MODELO_SHERPA = info['modelo']
+    return instancia
+
+def _carregar_piper():
+    """Constrói o PiperVoice se os arquivos existirem (chamado pelo _motores_voz)."""
+    global CAMINHO_MODELO_PIPER
     if not PiperVoice:
         print("Piper: Biblioteca piper-tts não instalada.")
-        return
+        return None
     
     # Tenta descobrir o modelo dinamicamente se ainda não tiver um caminho fixo
     if not CAMINHO_MODELO_PIPER:
         CAMINHO_MODELO_PIPER = _buscar_modelo_piper()
     
-    if CAMINHO_MODELO_PIPER and os.path.exists(CAMINHO_MODELO_PIPER):
-        try:
-            print(f"Piper: Carregando modelo {CAMINHO_MODELO_PIPER} na RAM...")
-            start = time.time()
-            _PIPER_INSTANCIA = PiperVoice.load(
-                CAMINHO_MODELO_PIPER, 
-                config_path=CAMINHO_MODELO_PIPER + ".json", 
-                use_cuda=False
-            )
-            # Aplica a velocidade globalmente na instância
-            _PIPER_INSTANCIA.config.length_scale = PIPER_VELOCIDADE
-            print(f"Piper: Modelo carregado e velocidade ajustada para {PIPER_VELOCIDADE}")
-        except Exception as e:
-            print(f"Piper: Erro ao carregar modelo: {e}")
-    else:
+    if not (CAMINHO_MODELO_PIPER and os.path.exists(CAMINHO_MODELO_PIPER)):
         print(f"Piper: Nenhum modelo encontrado em {PASTA_VOZES_PIPER}")
-
-_VAD_DISPONIVEL = _testar_vad()
-if not _VAD_DISPONIVEL:
-    print("Audio: PyAudio/VAD indisponivel neste hardware, usando arecord.")
-ARQUIVO_REC = "/tmp/voz_usuario.wav"
+        return None
+    print(f"Piper: Carregando modelo {CAMINHO_MODELO_PIPER} na RAM (velocidade {PIPER_VELOCIDADE})...")
+    return _criar_piper(CAMINHO_MODELO_PIPER, **CONFIG_TTS["PIPER"])
+
+# Motores neurais carregados em segundo plano e descarregados quando ociosos
+# (o selecionado no SaaS nunca é descarregado). Ver src/motores_voz.py.
+MOTORES_VOZ_OCIOSO_MIN   = 10   # Minutos sem falar até um motor não selecionado sair da RAM
+MOTORES_VOZ_ESPERA_BOOT_S = 8.0 # Quanto o boot espera o motor selecionado antes da saudação
+
+def _ao_motor_pronto(nome):
+    if nome == _MOTOR_VOZ_GLOBAL:
+        _pedido_aquecimento.set()   # a voz mudou de fato: frases frequentes com a voz nova
+
+_motores_voz = GerenciadorMotores(ocioso_min=MOTORES_VOZ_OCIOSO_MIN,
+                                  protegido=lambda nome: nome == _MOTOR_VOZ_GLOBAL,
+                                  ao_pronto=_ao_motor_pronto)
+_motores_voz.registrar("SHERPA", _carregar_sherpa)
+_motores_voz.registrar("PIPER", _carregar_piper)
+_motor_em_uso = "ROBOTICO"   # Último motor que falou (segue falando enquanto o novo carrega)
+
+ARQUIVO_REC = "/tmp/voz_usuario.wav"  # Só usado pelo fallback arecord e pelo dump de debug
+SALVAR_AUDIO_DEBUG = os.getenv("TIRILO_SALVAR_AUDIO", "0") == "1"  # Grava cada enunciado em ARQUIVO_REC
+ARQUIVO_STREAMS_IA = "/tmp/tirilo_streams_ia.jsonl"  # Pedaços de cada resposta (ferramentas/benchmark_parser.py)
+GRAVAR_STREAM_IA = os.getenv("TIRILO_GRAVAR_STREAM", "0") == "1"
 ARQUIVO_TTS = "/tmp/resposta_robo.wav" # Alterado para WAV
 DIR_BASE_SCRIPT = os.path.dirname(os.path.abspath(__file__))
 # Mantém DIR_BASE para retrocompatibilidade em outros lugares
@@ -277,6 +518,48 @@ FRAME_CAMERA = None # Armazena o último frame para o Pygame
 ESPEAK_VOZ = "pt-br"
 ESPEAK_VELOCIDADE = "140" # Ajuste conforme necessário (padrão ~160 é rápido)
 ESPEAK_PITCH = "50"       # Tom da voz (50 é padrão)
+VOZ_EDGE = "pt-BR-AntonioNeural"
+_voz_edge = VozEdge(VOZ_EDGE)   # Loop asyncio persistente + conector reaproveitado entre frases
+
+# Cache de fala sintetizada (src/cache_voz.py): frases repetidas tocam direto da RAM/disco.
+# A chave é (motor, modelo, velocidade, pitch, texto): mudar a voz invalida sozinho.
+PASTA_CACHE_VOZ    = os.path.expanduser("~/projeto_robo/robo_tirilo/cache_voz")
+CACHE_VOZ_RAM_MB   = 24
+CACHE_VOZ_DISCO_MB = 200
+_cache_voz = CacheVoz(PASTA_CACHE_VOZ, limite_ram_mb=CACHE_VOZ_RAM_MB, limite_disco_mb=CACHE_VOZ_DISCO_MB)
+
+# Cache de respostas da IA (src/cache_respostas.py): pergunta repetida (mesmo perfil e modo)
+# é respondida na hora, sem rede e sem som de pensar
+CACHE_RESPOSTAS_ATIVO  = True
+ARQUIVO_CACHE_RESPOSTAS = os.path.expanduser("~/projeto_robo/robo_tirilo/cache_respostas.json")
+CACHE_RESPOSTAS_TTL_H  = 168   # Uma semana: as sessões costumam ser semanais
+CACHE_RESPOSTAS_LIMIAR = 0.9   # Similaridade mínima para o vizinho mais próximo valer
+_cache_respostas = CacheRespostas(ARQUIVO_CACHE_RESPOSTAS, ttl_h=CACHE_RESPOSTAS_TTL_H,
+                                  limiar=CACHE_RESPOSTAS_LIMIAR)
+
+FALA_ANTECIPACAO = 2   # Frases da resposta da IA sintetizadas à frente da que está tocando
+FALA_FOLGA_S     = 1.0 # Áudio máximo enfileirado na saída (o resto espera no pipeline)
+
+SONS_PENSAR = (
+    "Ummm, deixa eu ver...",
+    "Ummm, deixa eu pensar...",
+    "Só um momento...",
+    "Ummm, boa pergunta...",
+)
+# Sintetizadas no boot (e após RELOAD_CONFIG mudar a voz) para tocarem sem latência
+FRASES_AQUECIMENTO = SONS_PENSAR + (
+    "Parei tudo.",
+    "Isso mesmo!",
+    "Configurações atualizadas.",
+    # jogos/parear_cores (via servidor UDP 5050)
+    "Olá amiguinho! Arraste os círculos para os quadrados da mesma cor. Vamos lá!",
+    "Boa! Continue arrastando os outros.",
+    "Quase! Arraste para o quadrado da mesma cor.",
+    "Parabéns! Você acertou tudo!",
+    "Incrível! Arrasou demais!",
+    "Muito bem! Que inteligente!",
+    "Fantástico! Continue assim!",
+)
 
 # Cores
 PRETO = (0, 0, 0); BRANCO = (255, 255, 255); AZUL = (0, 120, 255)
@@ -290,7 +573,12 @@ HISTORICO_ANIMAIS = []
 
 # IA
 MODELO_IA = "gemini-3.1-flash-lite-preview"
-ULTIMO_THOUGHT_SIGNATURE = None
+CONVERSA_ORCAMENTO_TOKENS = 3000  # Histórico enviado a cada turno; o que passar é resumido
+CONVERSA_EXPIRA_MIN = 10          # Sem conversa por N minutos: o histórico recomeça
+CONVERSA_CACHE_CONTEXTO = True    # Instrução de sistema em cache de contexto do Gemini
+_sessao_conversa = SessaoConversa(orcamento_tokens=CONVERSA_ORCAMENTO_TOKENS,
+                                  expira_min=CONVERSA_EXPIRA_MIN,
+                                  usar_cache=CONVERSA_CACHE_CONTEXTO, nome_robo=NOME_ROBO)
 cloud_mgr = None
 
 _jogos_disponiveis: list = []  # Carregado do Supabase: [{nome, codigo, descricao}]
@@ -301,6 +589,7 @@ _MOTOR_VOZ_GLOBAL = "ROBOTICO" # Pode ser "ROBOTICO" ou "NATURAL"
 PASTA_BIOMETRIA = os.path.expanduser("~/projeto_robo/robo_tirilo/biometria")
 MODELO_BIOMETRIA = os.path.join(PASTA_BIOMETRIA, "wespeaker_en_voxceleb_resnet34.onnx")
 LIMIAR_BIOMETRIA = 0.40  # Similaridade mínima para aceitar identidade
+BIOMETRIA_THREADS = 2    # Threads do onnxruntime do extrator (divide os núcleos com CONFIG_TTS)
 _extractor_biometria = None
 
 
@@ -334,9 +623,18 @@ _ev_camera_livre = threading.Event() # Sinaliza que a câmera foi liberada
 _pausar_piscar = False  # Pausa piscada espontânea durante animações complexas/programas externos
 _pausar_loop_voz = False  # Pausa captura de voz enquanto script externo usa o dispositivo de áudio
 _parar_captura_vad = threading.Event()  # Interrompe VAD/PyAudio quando script externo precisa do dispositivo
-_parar_fala = threading.Event()  # Barge-in: interrompe fala ao detectar voz (modo Terapeuta)
+_parar_fala = threading.Event()  # Barge-in/PARAR: interrompe a fala e as próximas frases da IA
 _barge_in_ativo = False          # Garante que só um thread de barge-in roda por vez
+_robo_falando = threading.Event()  # Setado enquanto falar() toca áudio (KWS ignora o próprio robô)
+_processos_fala = set()            # Processos de áudio da fala em curso (barge-in/PARAR os encerram)
+_lock_fala = threading.Lock()
+_fala_cortada = threading.Event()  # Interrompe só a fala em curso (o próximo falar() toca normalmente)
+_lock_falar = threading.Lock()     # Uma fala por vez na saída persistente (blocos não se misturam)
 _processo_externo = None  # Processo filho atual (jogo/programa externo) para poder encerrar via PARAR
+JOGO_PREAQUECER = True            # Abre o jogo da tag [JOGO:x] parado na barreira enquanto o robô fala
+JOGO_PREAQUECIDO_VALIDADE_S = 60  # Pré-aquecido que não recebe a vez nesse tempo é encerrado
+_jogo_preaquecido = None          # JogoPreaquecido à espera da vez
+_lock_preaquecimento = threading.Lock()
 HAAR_PATH = os.path.join(DIR_BASE, "robo_tirilo", "haarcascades", "haarcascade_frontalface_default.xml")
 
 try:
@@ -976,7 +1274,7 @@ class RoboInterface:
             })
         self.parear_dados = {'quadrados': quadrados, 'circulos': circulos, 'arrastando': None, 'acertos': 0}
         # Fala as instruções ao iniciar
-        threading.Thread(target=falar, args=("Vamos parear as cores! Arraste a bolinha colorida até o quadrado da mesma cor!",)).start()
+        falar_prioridade("Vamos parear as cores! Arraste a bolinha colorida até o quadrado da mesma cor!", prioridade="jogo")
 
     def processar_toque_parear(self, x, y, up=False):
         if not hasattr(self, 'parear_dados'): return
@@ -1000,7 +1298,7 @@ class RoboInterface:
                             self.parar_jogo()
                         threading.Thread(target=_finalizar).start()
                     else:
-                        falar_prioridade("Isso mesmo!")
+                        falar_prioridade("Isso mesmo!", prioridade="jogo")
                 else:
                     # Errou - volta
                     c['x'], c['y'] = c['orig_x'], c['orig_y']
@@ -1020,20 +1318,30 @@ class RoboInterface:
 gui = None
 
 # --- 5. LÓGICA ---
+def _mover_boca_fala(abertura):
+    """Aplica uma abertura (%) no servo da boca e no sprite da tela."""
+    if gui and gui.modo_jogo and gui.tipo_jogo == "emocoes":
+        return   # o jogo das emoções controla a boca
+    if olhos:
+        olhos.mover_boca(abertura)
+    if gui:
+        if abertura == 0: gui.set_boca('fechada')
+        elif abertura <= 50: gui.set_boca('media')
+        else: gui.set_boca('aberta')
+
 def animar_fala(evento_parada):
+    """Boca aleatória para áudio sem PCM no processo (música via mpg123).
+    A fala usa a SincroniaLabial, guiada pelo envelope do áudio."""
+    anterior = None
     while not evento_parada.is_set():
         if gui and gui.modo_jogo and gui.tipo_jogo == "emocoes": 
             time.sleep(0.1)
             continue
             
-        if olhos:
-            # Sincronia de boca (Lip Sync simplificado)
-            abertura = random.choice([0, 50, 80, 50, 100])
-            olhos.mover_boca(abertura)
-            if gui:
-                if abertura == 0: gui.set_boca('fechada')
-                elif abertura <= 50: gui.set_boca('media')
-                else: gui.set_boca('aberta')
+        abertura = random.choice([0, 50, 80, 50, 100])
+        if abertura != anterior:   # mesma posição: sem escrita I2C
+            _mover_boca_fala(abertura)
+            anterior = abertura
         
         time.sleep(random.uniform(0.15, 0.25))
     
@@ -1041,114 +1349,87 @@ def animar_fala(evento_parada):
         olhos.mover_boca(0)
     if gui: gui.set_boca('fechada')
 
-def _capturar_com_vad(arquivo_saida):
-    """Grava voz com VAD por energia: para automaticamente ao detectar silêncio.
-    Requer: pyaudio, audioop (stdlib), wave (stdlib).
-    Levanta RuntimeError se nenhuma voz for detectada."""
-    import pyaudio
-    import audioop
-    import wave
-
-    CHUNK          = 1024
-    RATE           = 16000
-    SILENCE_THRESH = 400   # RMS mínimo para considerar voz ativa
-    SILENCE_CHUNKS = 20    # ~1.3s de silêncio após a fala para encerrar
-    MAX_CHUNKS     = 375   # ~24s absoluto (segurança)
-
-    pa = pyaudio.PyAudio()
-
-    # Encontra o primeiro dispositivo de entrada disponível
-    mic_idx = None
-    for i in range(pa.get_device_count()):
-        info = pa.get_device_info_by_index(i)
-        if info.get("maxInputChannels", 0) > 0:
-            mic_idx = i
-            break
-
-    # Tenta 16000 Hz; se falhar, usa TAXA_CAPTURA do dispositivo (EMEET: 48000 Hz)
-    taxa_real = RATE
-    try:
-        stream = pa.open(format=pyaudio.paInt16, channels=1, rate=RATE,
-                         input=True, input_device_index=mic_idx,
-                         frames_per_buffer=CHUNK)
-    except Exception:
-        taxa_real = TAXA_CAPTURA
-        stream = pa.open(format=pyaudio.paInt16, channels=1, rate=taxa_real,
-                         input=True, input_device_index=mic_idx,
-                         frames_per_buffer=CHUNK)
-    frames = []
-    silent_count = 0
-    speaking = False
-
-    try:
-        for _ in range(MAX_CHUNKS):
-            if _parar_captura_vad.is_set():
-                break
-            data = stream.read(CHUNK, exception_on_overflow=False)
-            frames.append(data)
-            rms = audioop.rms(data, 2)
-            if rms > SILENCE_THRESH:
-                speaking = True
-                silent_count = 0
-            elif speaking:
-                silent_count += 1
-                if silent_count >= SILENCE_CHUNKS:
-                    break
-    finally:
-        stream.stop_stream()
-        stream.close()
-        pa.terminate()
-
-    if not speaking:
-        raise RuntimeError("Nenhuma voz detectada")
+def _capturar_arecord():
+    """Fallback sem microfone persistente: grava 4s fixos via arecord (taxa nativa → 16 kHz)."""
+    subprocess.run(
+        ["arecord", "-D", DISPOSITIVO_AUDIO, "-d", "4",
+         "-f", "S16_LE", "-r", str(TAXA_CAPTURA), "-c", "1", "-q", ARQUIVO_REC],
+        check=True
+    )
+    return Enunciado.de_wav(ARQUIVO_REC).reamostrado(TAXA_VOZ)
 
-    with wave.open(arquivo_saida, "wb") as wf:
-        wf.setnchannels(1)
-        wf.setsampwidth(2)      # paInt16 = 2 bytes
-        wf.setframerate(RATE)
-        wf.writeframes(b"".join(frames))
 
+def capturar_voz(ao_parcial=None):
+    """Captura um enunciado e devolve o texto reconhecido (ou None).
 
-def capturar_voz():
+    Com motor STT em streaming, `ao_parcial(texto)` é chamado a cada nova
+    hipótese parcial enquanto a criança ainda fala; se retornar True, o
+    enunciado é encerrado na hora e a parcial vira o resultado final.
+    """
+    global _ULTIMO_ENUNCIADO, _reconhecedor
+    if _reconhecedor is None:
+        _reconhecedor = criar_reconhecedor(STT_MOTOR, PASTA_MODELO_STT, taxa=TAXA_VOZ, recognizer=r)
+    # Palavra-chave detectada pelo KWS (antes ou durante a captura) dispensa o STT
+    frase = _comando_kws_pendente()
+    if frase:
+        return frase
     try:
         if gui: gui.set_status("Ouvindo...", VERDE)
-        # Pequeno delay para garantir que o hardware de áudio (aplay) foi liberado
-        time.sleep(0.2)
 
-        # Tenta VAD via pyaudio; fallback para arecord 4s fixo se não disponível
-        if _VAD_DISPONIVEL:
+        fluxo = _reconhecedor.novo_fluxo() if _reconhecedor.streaming else None
+        antecipado = []
+
+        def _ouvir(amostras):
+            parcial = fluxo.aceitar(amostras)
+            if parcial:
+                print(f"[STT] Parcial: {parcial}")
+                if ao_parcial and ao_parcial(parcial):
+                    antecipado.append(parcial)
+                    return True
+            return False
+
+        # Lê o enunciado do microfone persistente (com pre-roll); fallback arecord 4s
+        if _servico_captura.ativo and _vad_captura is not None:
+            segmentador = SegmentadorFala(
+                _vad_captura, taxa=_servico_captura.taxa, quadro=_servico_captura.quadro,
+                hangover_ms=VAD_HANGOVER_MS, max_segundos=VAD_MAX_SEGUNDOS
+            )
             try:
-                _capturar_com_vad(ARQUIVO_REC)
+                enunciado = _servico_captura.capturar_enunciado(
+                    segmentador, cancelar=(_parar_captura_vad, _kws_disparou),
+                    ouvinte=_ouvir if fluxo else None
+                )
             except RuntimeError:
                 if gui: gui.set_status("Pronto!", CINZA)
-                return None
-            except Exception as e_vad:
-                print(f"VAD falhou ({e_vad}), usando arecord 4s...")
-                subprocess.run(
-                    ["arecord", "-D", DISPOSITIVO_AUDIO, "-d", "4",
-                     "-f", "S16_LE", "-r", str(TAXA_CAPTURA), "-c", "1", "-q", ARQUIVO_REC],
-                    check=True
-                )
+                return _comando_kws_pendente()
+            frase = _comando_kws_pendente()
+            if frase:
+                return frase
+            print(segmentador.resumo())
         else:
-            subprocess.run(
-                ["arecord", "-D", DISPOSITIVO_AUDIO, "-d", "4",
-                 "-f", "S16_LE", "-r", str(TAXA_CAPTURA), "-c", "1", "-q", ARQUIVO_REC],
-                check=True
-            )
+            enunciado = _capturar_arecord()
+            if fluxo:
+                fluxo.aceitar(enunciado.amostras)
 
-        if not os.path.exists(ARQUIVO_REC):
-            return None
+        # Mantido em memória para biometria; disco só se o debug estiver ligado
+        _ULTIMO_ENUNCIADO = enunciado
+        if SALVAR_AUDIO_DEBUG:
+            enunciado.salvar_wav(ARQUIVO_REC)
+
+        if antecipado:
+            print(f"[STT] Finalizado pela parcial: {antecipado[0]}")
+            return antecipado[0]
 
         if gui: gui.set_status("Processando...", AZUL)
-        with sr.AudioFile(ARQUIVO_REC) as source:
-            audio = r.record(source)
-        texto = r.recognize_google(audio, language="pt-BR").lower()
+        t0 = time.time()
+        texto = fluxo.finalizar() if fluxo else _reconhecedor.reconhecer(enunciado)
+        print(f"[STT] {_reconhecedor.nome}: '{texto}' ({(time.time() - t0) * 1000:.0f} ms)")
+        if not texto:
+            # Nada entendido (silêncio ou ruído) — comportamento normal
+            if gui: gui.set_status("Pronto!", CINZA)
+            return None
         return texto
 
-    except sr.UnknownValueError:
-        # Google não entendeu o áudio (silêncio ou ruído) — comportamento normal
-        if gui: gui.set_status("Pronto!", CINZA)
-        return None
     except sr.RequestError as e:
         print(f"Erro de rede no reconhecimento de voz: {e}")
         if gui: gui.set_status("Sem internet", VERMELHO)
@@ -1158,55 +1439,238 @@ def capturar_voz():
         if gui: gui.set_status("Erro Voz", VERMELHO)
         return None
 
-def falar_prioridade(texto, local_fast=False): 
-    threading.Thread(target=falar, args=(texto, local_fast)).start()
-
-async def gerar_audio_edge(texto, arquivo):
-    """Gera áudio usando Microsoft Edge TTS."""
-    voz = "pt-BR-AntonioNeural"
-    comunicador = edge_tts.Communicate(texto, voz)
-    await comunicador.save(arquivo)
-
-def _monitorar_barge_in(processo_audio):
-    """Escuta o microfone via arecord enquanto o robô fala (modo Terapeuta).
-    Se detectar voz contínua, termina o processo de áudio imediatamente."""
-    import struct
-    import math
+def falar_prioridade(texto, local_fast=False, prioridade="sistema"):
+    """Fala sem bloquear quem chama (toques, feedback de jogo), pela agenda de
+    falas: uma por vez, por prioridade. Retorna o Pedido (`.terminou` é um Event)."""
+    return _agenda_fala.pedir(texto, prioridade)
+
+def _interromper_fala():
+    """Encerra imediatamente todo áudio de fala em curso (qualquer motor)."""
+    _fala_cortada.set()
+    _saida_audio.interromper()   # também limpa a referência do AEC
+    with _lock_fala:
+        processos = list(_processos_fala)
+    for proc in processos:
+        try: os.killpg(proc.pid, signal.SIGTERM)
+        except Exception: pass
 
-    CHUNK_BYTES = 1024   # 512 amostras S16_LE
-    THRESH      = 4500   # RMS mínimo para voz — elevado para ignorar feedback do EMEET M1A
-    CONFIRMA    = 3      # chunks consecutivos ~= 100ms de voz para confirmar
-    DELAY_INICIO = 0.5   # segundos antes de começar a monitorar (mpg123 estabilizar)
+def _ceder_audio():
+    """Broker pediu o dispositivo (jogo/ferramenta): para captura e fala do robô."""
+    _parar_captura_vad.set()
+    _interromper_fala()
+    _servico_captura.pausar()
+    _saida_audio.pausar()
+
+def _retomar_audio():
+    """Dispositivo devolvido ao robô."""
+    _saida_audio.retomar()
+    _servico_captura.retomar()
+    _parar_captura_vad.clear()
+
+def _aplicar_pitch(amostras, taxa):
+    """PIPER_PITCH (cents) em memória: WSOLA + reamostragem (src/pitch.py)."""
+    if PITCH_MOTOR == "SOX":
+        try:
+            return deslocar_pitch_sox(amostras, taxa, PIPER_PITCH)
+        except (OSError, RuntimeError) as e:
+            print(f"Audio: Erro no SoX ({e}). Usando o pitch em NumPy...")
+    return deslocar_pitch(amostras, taxa, PIPER_PITCH)
+
+def _pcm_int16(amostras):
+    x = np.asarray(amostras)
+    if x.dtype.kind == "f":
+        x = np.clip(x * 32767.0, -32768, 32767)
+    return x.astype(np.int16)
+
+def _tocar_fala(amostras, taxa, boca):
+    """Entrega um bloco de fala à saída persistente e a trajetória da boca (envelope
+    do mesmo bloco) à SincroniaLabial, no relógio da saída."""
+    # Contrapressão: a saída guarda só FALA_FOLGA_S de áudio; assim a antecipação do
+    # pipeline é medida em frases e o barge-in não tem muito áudio para descartar.
+    while _saida_audio.segundos_pendentes > FALA_FOLGA_S and not _fala_cortada.is_set():
+        time.sleep(0.02)
+    if _fala_cortada.is_set():
+        return
+    boca.iniciar()
+    boca.adicionar(_saida_audio.tocar(amostras, taxa), amostras, taxa)
+
+def _registrar_processo_fala(proc, ativo):
+    with _lock_fala:
+        if ativo: _processos_fala.add(proc)
+        else: _processos_fala.discard(proc)
+
+def _blocos_edge(txt):
+    """Edge em streaming: o MP3 é decodificado e tocado conforme chega."""
+    yield from _voz_edge.blocos(txt, registrar=_registrar_processo_fala)
+
+def _blocos_sherpa(txt, motor):
+    """Cada sentença do Sherpa (callback do generate) sai assim que fica pronta."""
+    fila = queue.Queue()
+    cancelar = threading.Event()
+    taxa = motor.sample_rate
+    def _ao_bloco(samples, progresso):
+        fila.put(np.array(samples, dtype=np.float32))
+        return 0 if cancelar.is_set() else 1
+    def _gerar():
+        try:
+            try:
+                motor.generate(txt, speed=PIPER_VELOCIDADE, callback=_ao_bloco)
+            except TypeError:
+                # sherpa-onnx antigo (sem callback): o áudio inteiro de uma vez
+                audio = motor.generate(txt, speed=PIPER_VELOCIDADE)
+                fila.put(np.array(audio.samples, dtype=np.float32))
+        except Exception as e:
+            fila.put(e)
+        finally:
+            fila.put(None)
+    threading.Thread(target=_gerar, daemon=True).start()
+    try:
+        while True:
+            item = fila.get()
+            if item is None: break
+            if isinstance(item, Exception): raise item
+            yield item, taxa
+    finally:
+        cancelar.set()
+
+def _blocos_piper(txt, voz):
+    # A velocidade já está configurada globalmente na instância
+    taxa = voz.config.sample_rate
+    for chunk in voz.synthesize(txt):
+        yield np.frombuffer(chunk.audio_int16_bytes, dtype=np.int16), taxa
+
+def _blocos_espeak(txt):
+    """espeak-ng --stdout lido em blocos de 100 ms (sem arquivo em disco)."""
+    cmd_espeak = ["espeak-ng", "-v", ESPEAK_VOZ, "-s", ESPEAK_VELOCIDADE,
+                  "-p", ESPEAK_PITCH, "--stdout", txt]
+    p_espeak = subprocess.Popen(cmd_espeak, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                start_new_session=True)
+    with _lock_fala:
+        _processos_fala.add(p_espeak)
+    try:
+        with wave.open(p_espeak.stdout, "rb") as wf:
+            taxa = wf.getframerate()
+            while True:
+                pcm = wf.readframes(taxa // 10)
+                if not pcm: break
+                yield np.frombuffer(pcm, dtype=np.int16), taxa
+    finally:
+        p_espeak.stdout.close()
+        if p_espeak.poll() is None:
+            p_espeak.terminate()   # fala interrompida (barge-in): não deixa o espeak pendurado
+        p_espeak.wait()
+        with _lock_fala:
+            _processos_fala.discard(p_espeak)
+
+def _motor_efetivo():
+    """Motor selecionado; se ele ainda está carregando, o que já vinha falando
+    (a troca de voz pelo SaaS não trava a conversa nem cai para o espeak)."""
+    global _motor_em_uso
+    motor = _MOTOR_VOZ_GLOBAL
+    if motor in _motores_voz and not _motores_voz.pronto(motor):
+        _motores_voz.aquecer(motor)
+        anterior = _motor_em_uso
+        if anterior != motor and (anterior not in _motores_voz or _motores_voz.pronto(anterior)):
+            return anterior
+        return "ROBOTICO"
+    _motor_em_uso = motor
+    return motor
+
+def _voz_atual():
+    """Identidade da voz que _sintetizar() vai usar: (motor, modelo, velocidade, pitch[, método do pitch])."""
+    motor = _motor_efetivo()
+    if motor == "NATURAL":
+        return ("NATURAL", VOZ_EDGE, 0, 0)
+    if motor == "SHERPA":
+        return ("SHERPA", _MODELO_SHERPA, PIPER_VELOCIDADE, PIPER_PITCH, PITCH_MOTOR)
+    if motor == "PIPER":
+        return ("PIPER", CAMINHO_MODELO_PIPER, PIPER_VELOCIDADE, PIPER_PITCH, PITCH_MOTOR)
+    return ("ROBOTICO", ESPEAK_VOZ, ESPEAK_VELOCIDADE, ESPEAK_PITCH)
+
+def _sintetizar(txt, voz):
+    """Fala da voz `voz` (de _voz_atual()) em blocos (amostras, taxa), já com o
+    pitch aplicado. Se o motor saiu da RAM nesse meio tempo, levanta erro: quem
+    chama cai para o espeak sem guardá-lo com a chave do motor neural."""
+    motor = voz[0]
+    if motor == "NATURAL":
+        yield from _blocos_edge(txt)
+        return
+    if motor not in _motores_voz:   # ROBOTICO: o espeak é a própria voz (pode ir para o cache)
+        yield from _blocos_espeak(txt)
+        return
+    instancia = _motores_voz.obter(motor)
+    if instancia is None:
+        raise RuntimeError(f"{motor} selecionado mas o motor não está carregado")
+    blocos = _blocos_sherpa(txt, instancia) if motor == "SHERPA" else _blocos_piper(txt, instancia)
+    try:
+        for amostras, taxa in blocos:
+            yield (_aplicar_pitch(amostras, taxa) if PIPER_PITCH != 0 else amostras), taxa
+    finally:
+        blocos.close()
+
+def _juntar_blocos(blocos):
+    return np.concatenate([_pcm_int16(a) for a, _ in blocos]), blocos[0][1]
+
+_pedido_aquecimento = threading.Event()   # Pede (de novo) o aquecimento do cache de voz
+
+def _aquecer_cache_voz_continuo():
+    """Uma thread atende os pedidos; pedido durante um aquecimento gera outra rodada."""
+    while True:
+        _pedido_aquecimento.wait()
+        _pedido_aquecimento.clear()
+        _aquecer_cache_voz()
+
+def _aquecer_cache_voz():
+    """Sintetiza (sem tocar) as frases frequentes que ainda não estão no cache."""
+    t0 = time.time()
+    novas = 0
+    frases = list(FRASES_AQUECIMENTO)
+    for resposta in _cache_respostas.frases_frequentes():   # respostas guardadas também tocam na hora
+        frases += _frases_do_texto(resposta)
+    for frase in frases:
+        with _lock_falar:   # não disputa o motor com uma fala real
+            voz = _voz_atual()
+            if _cache_voz.obter(voz, frase) is not None:   # do disco para a RAM
+                continue
+            try:
+                blocos = list(_sintetizar(frase, voz))
+            except Exception as e:
+                print(f"[VOZ] Cache: aquecimento interrompido ({e}).")
+                return
+            if blocos:
+                _cache_voz.guardar(voz, frase, *_juntar_blocos(blocos))
+                novas += 1
+    print(f"[VOZ] Cache aquecido ({voz[0]}): {novas} nova(s) de {len(frases)} frases "
+          f"em {time.time() - t0:.1f}s.")
+
+def _monitorar_barge_in():
+    """Escuta o microfone persistente enquanto o robô fala (qualquer motor de voz).
+    Se detectar voz contínua acima do eco, interrompe a fala imediatamente."""
+    CONFIRMA    = 3      # quadros consecutivos (~100ms) de voz para confirmar
+    AQUECIMENTO = 0.5    # segundos iniciais só para o piso aprender o nível do eco
 
     global _barge_in_ativo
-    _barge_in_ativo = True
-    proc_rec = None
     try:
-        proc_rec = subprocess.Popen(
-            ["arecord", "-D", DISPOSITIVO_AUDIO, "-f", "S16_LE",
-             "-r", "16000", "-c", "1", "-q"],
-            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
-        )
+        # Piso adaptativo próprio: o início da fala serve de referência do eco do robô
+        vad = VadEnergia(taxa=_servico_captura.taxa, quadro=_servico_captura.quadro,
+                         fator=BARGE_IN_FATOR, limiar_min=BARGE_IN_LIMIAR_MIN,
+                         piso_inicial=BARGE_IN_LIMIAR_MIN / BARGE_IN_FATOR)
         count = 0
+        inicio = _servico_captura.posicao
+        fim_aquecimento = inicio + int(AQUECIMENTO * _servico_captura.taxa)
         print("Barge-in: monitorando mic...")
-        # Descarta os primeiros chunks para o mpg123 estabilizar o volume
-        chunks_descartar = int(DELAY_INICIO * 16000 * 2 / CHUNK_BYTES)
-        for _ in range(chunks_descartar):
-            if proc_rec.stdout.read(CHUNK_BYTES) == b'':
+        for pos, quadro in _servico_captura.quadros(inicio=inicio):
+            if not _robo_falando.is_set():
                 break
-        while processo_audio.poll() is None and not _parar_fala.is_set():
-            data = proc_rec.stdout.read(CHUNK_BYTES)
-            if len(data) < CHUNK_BYTES:
-                break
-            samples = struct.unpack(f"<{len(data)//2}h", data)
-            rms = math.sqrt(sum(s * s for s in samples) / len(samples))
-            if rms > THRESH:
+            voz = vad.e_fala(quadro)
+            if pos < fim_aquecimento:
+                continue
+            if voz:
                 count += 1
                 if count >= CONFIRMA:
-                    print(f"Barge-in detectado! RMS={rms:.0f} — interrompendo fala.")
+                    print(f"Barge-in detectado! RMS={vad.ultimo_rms:.0f} (limiar {vad.limiar:.0f}) — interrompendo fala.")
                     _parar_fala.set()
-                    try: processo_audio.terminate()
-                    except: pass
+                    _interromper_fala()
                     break
             else:
                 count = max(0, count - 1)
@@ -1214,15 +1678,44 @@ def _monitorar_barge_in(processo_audio):
         print(f"Barge-in monitor erro: {e}")
     finally:
         _barge_in_ativo = False
-        if proc_rec and proc_rec.poll() is None:
-            try: proc_rec.terminate()
-            except: pass
 
 
+def _fonte_fala(txt):
+    """Blocos de uma frase: do cache de voz ou do motor atual (guardando no
+    cache quando a síntese termina). Se o motor falhar, usa o espeak."""
+    txt = normalizar_texto(txt)
+    voz = _voz_atual()
+    print(f"DEBUG: falar() - Texto: '{txt[:30]}...' | Motor: {voz[0]}")
+    em_cache = _cache_voz.obter(voz, txt)
+    if em_cache is not None:
+        print(f"[VOZ] Cache: '{txt[:30]}'")
+        yield em_cache
+        return
+    blocos = []
+    try:
+        for bloco in _sintetizar(txt, voz):
+            blocos.append(bloco)
+            yield bloco
+    except SinteseIncompleta as e:
+        print(f"Voz: {e} — frase não vai para o cache.")
+        return
+    except Exception as e:
+        print(f"Voz: Erro na síntese {voz[0]} ({e}), usando espeak...")
+        yield from _blocos_espeak(txt)   # não guarda o espeak com a chave do motor neural
+        return
+    # Só sínteses completas entram no cache (o gerador fechado no meio não chega aqui)
+    if blocos:
+        _cache_voz.guardar(voz, txt, *_juntar_blocos(blocos))
+
 def falar(texto, local_fast=False):
     if not texto: return
-    print(f"DEBUG: falar() - Texto: '{texto[:30]}...' | Motor: {_MOTOR_VOZ_GLOBAL}")
+    return falar_frases((texto,))
 
+def falar_frases(frases):
+    """Fala uma sequência de frases como uma só fala: boca, barge-in e a saída
+    ficam com este falar do início ao fim, e a frase seguinte é sintetizada
+    enquanto a atual toca (PipelineFala). `frases` pode ser um gerador.
+    Retorna True se falou até o fim (False se barge-in/PARAR cortou)."""
     # Define cor do status com base no modo
     if MODO_ROBO_ATUAL == "TERAPEUTA":
         cor_fala = AZUL_ESPECIAL
@@ -1234,155 +1727,119 @@ def falar(texto, local_fast=False):
     # DEBUG DE VOZ (Ajuda a validar se o Dash enviou os dados certos)
     print(f"🎤 VOZ: {_MOTOR_VOZ_GLOBAL} | PITCH: {PIPER_PITCH} | SPEED: {PIPER_VELOCIDADE}")
 
-    evt = threading.Event()
-    t_anim = threading.Thread(target=animar_fala, args=(evt,))
+    _lock_falar.acquire()
+    _fala_cortada.clear()
+    boca = SincroniaLabial(lambda: _saida_audio.relogio, _mover_boca_fala)
+    _robo_falando.set()
 
-    try:
-        txt = str(texto).replace('*', '').replace('#', '')
+    # Barge-in para qualquer motor: consome o mesmo stream do microfone persistente
+    global _barge_in_ativo
+    if BARGE_IN_ATIVO and _servico_captura.ativo and not _barge_in_ativo:
+        _barge_in_ativo = True
+        threading.Thread(target=_monitorar_barge_in, daemon=True).start()
 
-        if _MOTOR_VOZ_GLOBAL == "NATURAL":
-            # --- Edge-TTS (voz neural Antonio) + barge-in ---
-            import tempfile
-            arq_mp3 = tempfile.mktemp(suffix=".mp3")
-            try:
-                asyncio.run(gerar_audio_edge(txt, arq_mp3))
-                t_anim.start()
-                proc_audio = subprocess.Popen(
-                    ["mpg123", "-o", "alsa", "-a", "default", "-q", arq_mp3],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-                global _barge_in_ativo
-                if not _barge_in_ativo:
-                    _barge_in_ativo = True
-                    threading.Thread(target=_monitorar_barge_in, args=(proc_audio,), daemon=True).start()
-                proc_audio.wait()
-            except Exception as e:
-                print(f"IA: Falha Edge-TTS ({e}), usando espeak...")
-                _falar_espeak(txt, t_anim)
-            finally:
-                if os.path.exists(arq_mp3):
-                    try: os.remove(arq_mp3)
-                    except: pass
-        elif _MOTOR_VOZ_GLOBAL == "SHERPA":
-            # --- Sherpa-ONNX (Voz Neural de Alta Performance) ---
-            if _SHERPA_INSTANCIA:
-                import tempfile
-                arq_wav = tempfile.mktemp(suffix=".wav")
-                try:
-                    # Síntese ultra-rápida paralela
-                    if not t_anim.is_alive(): t_anim.start()
-                    
-                    audio = _SHERPA_INSTANCIA.generate(txt, speed=PIPER_VELOCIDADE)
-                    
-                    # Salva WAV (manual para garantir compatibilidade com sox/aplay)
-                    samples = np.array(audio.samples)
-                    samples_int16 = (samples * 32767).astype(np.int16)
-                    with wave.open(arq_wav, "wb") as wf:
-                        wf.setnchannels(1)
-                        wf.setsampwidth(2)
-                        wf.setframerate(audio.sample_rate)
-                        wf.writeframes(samples_int16.tobytes())
-
-                    if PIPER_PITCH != 0:
-                        comando = f"sox {arq_wav} -t wav - pitch {PIPER_PITCH} | aplay -q -D {DISPOSITIVO_AUDIO}"
-                        subprocess.run(comando, shell=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    else:
-                        subprocess.run(
-                            ["aplay", "-q", "-D", DISPOSITIVO_AUDIO, arq_wav],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                        )
-                except Exception as e:
-                    print(f"Sherpa: Erro na síntese ({e}), usando espeak...")
-                    _falar_espeak(txt, t_anim)
-                finally:
-                    if os.path.exists(arq_wav):
-                        try: os.remove(arq_wav)
-                        except: pass
-            else:
-                print(f"DEBUG: Sherpa selecionado mas _SHERPA_INSTANCIA é None")
-                _falar_espeak(txt, t_anim)
-        elif _MOTOR_VOZ_GLOBAL == "PIPER":
-            # --- Piper-TTS (Voz Neural Local) ---
-            if _PIPER_INSTANCIA:
-                import tempfile
-                arq_wav = tempfile.mktemp(suffix=".wav")
-                try:
-                    with wave.open(arq_wav, "wb") as wav_file:
-                        wav_file.setnchannels(1)
-                        wav_file.setsampwidth(2)
-                        wav_file.setframerate(_PIPER_INSTANCIA.config.sample_rate)
-                        # A velocidade já está configurada globalmente na instância
-                        for chunk in _PIPER_INSTANCIA.synthesize(txt):
-                            wav_file.writeframes(chunk.audio_int16_bytes)
-                    
-                    if PIPER_PITCH != 0:
-                        # Usa SoX para ajustar a tonalidade (Pitch) em tempo real
-                        # Se falhar, tenta tocar o original (fallback silencioso no shell)
-                        comando = f"sox {arq_wav} -t wav - pitch {PIPER_PITCH} | aplay -q -D {DISPOSITIVO_AUDIO}"
-                        try:
-                            # Inicia animação agora que o áudio está pronto e sintetizado
-                            if not t_anim.is_alive(): t_anim.start()
-                            res = subprocess.run(comando, shell=True, capture_output=True, text=True)
-                            if res.returncode != 0:
-                                print(f"Audio: Erro no SoX ({res.stderr.strip()}). Tentando aplay direto...")
-                                subprocess.run(["aplay", "-q", "-D", DISPOSITIVO_AUDIO, arq_wav])
-                        except Exception as e:
-                            print(f"Audio: Erro subprocess ({e}). Tentando aplay direto...")
-                            if not t_anim.is_alive(): t_anim.start()
-                            subprocess.run(["aplay", "-q", "-D", DISPOSITIVO_AUDIO, arq_wav])
-                    else:
-                        # Inicia animação para o áudio direto
-                        if not t_anim.is_alive(): t_anim.start()
-                        subprocess.run(
-                            ["aplay", "-q", "-D", DISPOSITIVO_AUDIO, arq_wav],
-                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                        )
-                except Exception as e:
-                    print(f"Piper: Erro na síntese ({e}), usando espeak...")
-                    _falar_espeak(txt, t_anim)
-                finally:
-                    if os.path.exists(arq_wav):
-                        try: os.remove(arq_wav)
-                        except: pass
-            else:
-                print(f"DEBUG: Piper selecionado mas _PIPER_INSTANCIA é None em {CAMINHO_MODELO_PIPER}")
-                _falar_espeak(txt, t_anim)
-        else:
-            # --- espeak-ng pipeline (voz robótica) ---
-            _falar_espeak(txt, t_anim)
+    completa = False
+    try:
+        pipeline = PipelineFala(_fonte_fala, lambda amostras, taxa: _tocar_fala(amostras, taxa, boca),
+                                _fala_cortada, antecipacao=FALA_ANTECIPACAO)
+        pipeline.alimentar(frases)
+        completa = pipeline.executar()
+        if completa:
+            _saida_audio.aguardar(parar=_fala_cortada)
 
     except Exception as e:
         print(f"Erro TTS: {e}")
         if gui: gui.set_status("Erro Voz", VERMELHO)
     finally:
-        evt.set()
-        if t_anim.is_alive(): t_anim.join()
+        _robo_falando.clear()
+        _lock_falar.release()
+        boca.parar()   # fecha a boca se ainda estiver aberta
         if gui: gui.set_status("Pronto!", CINZA)
-        if olhos: olhos.mover_boca(0)
+    return completa and not _fala_cortada.is_set()
+
+# Falas de fora do loop principal (UDP 5050, toques): uma thread, por prioridade
+_agenda_fala = AgendaFala(falar_frases, _interromper_fala)
+
+
+@functools.lru_cache(maxsize=8)
+def _instrucao_sistema(modo, prompt_perfil, jogos):
+    """Instrução de sistema do Gemini: prompt do perfil + regras de jogos (modo
+    CRIANCA). `jogos` = ((codigo, nome), ...); em cache por combinação."""
+    instrucao = prompt_perfil
+    # Garante instruções de jogo mesmo se a diretriz vier do Supabase sem elas
+    if modo == "CRIANCA":
+        # Usa jogos carregados do Supabase; fallback para lista padrão
+        if jogos:
+            lista_jogos = "\n".join(f"- {codigo:<14} → {nome}" for codigo, nome in jogos)
+            exemplo_codigo = jogos[0][0]
+        else:
+            lista_jogos = "(nenhum jogo disponível no momento)"
+            exemplo_codigo = "jogo"
+        instrucao += f"""
 
+REGRA OBRIGATÓRIA DE JOGOS:
+Quando a criança mencionar jogar, brincar ou qualquer jogo, você DEVE escolher um jogo e incluir a tag no final da resposta.
+NÃO faça perguntas. Escolha diretamente e inclua a tag.
+NÃO diga a tag em voz alto — ela é invisível para a criança.
 
-def _falar_espeak(txt, t_anim):
-    """Pipeline espeak-ng --stdout | aplay sem arquivo em disco."""
-    try:
-        p_espeak = subprocess.Popen(
-            ["espeak-ng", "-v", ESPEAK_VOZ, "-s", ESPEAK_VELOCIDADE,
-             "-p", ESPEAK_PITCH, "--stdout", txt],
-            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
-        )
-        if not t_anim.is_alive():
-            t_anim.start()
-        subprocess.run(
-            ["aplay", "-D", DISPOSITIVO_AUDIO, "-q"],
-            stdin=p_espeak.stdout,
-            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-        )
-        p_espeak.stdout.close()
-        p_espeak.wait()
-    except Exception as e:
-        print(f"IA: Falha no Espeak: {e}")
+Jogos disponíveis (use o código exato da coluna esquerda):
+{lista_jogos}
+
+FORMATO OBRIGATÓRIO quando a criança quer jogar:
+Frase animada curta! [JOGO:codigo]
+
+EXEMPLOS:
+Criança: "quero jogar" → "Vamos brincar! [JOGO:{exemplo_codigo}]"
+Criança: "brincar" → "Que divertido! Vamos jogar! [JOGO:{exemplo_codigo}]"
+"""
+    return instrucao
+
+def _frases_do_texto(texto):
+    """Frases de uma resposta já completa, cortadas como no streaming (mesmas chaves da CacheVoz)."""
+    parser = ParserResposta()
+    return [e.texto for e in parser.alimentar(texto) + parser.finalizar() if isinstance(e, Frase)]
+
+def _pede_jogo(texto):
+    """Pedido de brincadeira no modo criança: a IA é obrigada a escolher um jogo."""
+    return MODO_ROBO_ATUAL == "CRIANCA" and any(
+        w in texto.lower() for w in ["jogar", "brincar", "jogo", "brincadeira"])
+
+def _chave_cache_resposta():
+    """(perfil, modo, versão do prompt do perfil) das respostas guardadas."""
+    perfil = _perfil_ativo or {}
+    return perfil.get("id"), MODO_ROBO_ATUAL, assinatura(perfil.get("prompt_instrucao"))
+
+def _responder_do_cache(texto):
+    """Fala a resposta guardada para esta pergunta, sem IA nem som de pensar.
+    Retorna a resposta (ou None se não há uma válida)."""
+    global TEXTO_RESPOSTA_IA
+    if not CACHE_RESPOSTAS_ATIVO or _pede_jogo(texto):
+        return None
+    perfil, modo, versao = _chave_cache_resposta()
+    achado = _cache_respostas.buscar(texto, perfil, modo, versao)
+    if achado is None:
+        return None
+    resposta, similaridade = achado
+    print(f"[IA] Cache de respostas (similaridade {similaridade:.2f}): {resposta[:80]}")
+    _parar_fala.clear()
+    if MODO_ROBO_ATUAL == "TERAPEUTA":
+        log_terapeuta(f"Terapeuta: {texto}")
+    if olhos:
+        olhos.olhar_frente(suave=False)
+    frases = _frases_do_texto(resposta)
+    TEXTO_RESPOSTA_IA = " ".join(frases)
+    falar_frases(frases)
+    _sessao_conversa.registrar(texto, resposta)   # o próximo turno da IA sabe o que foi dito
+    if MODO_ROBO_ATUAL == "TERAPEUTA":
+        log_terapeuta(f"{NOME_ROBO}: {resposta}")
+    return resposta
 
 def perguntar_gemini(texto):
     global TEXTO_RESPOSTA_IA, MODO_VISAO_ATIVO
+    # Pergunta repetida: responde do cache (também sem internet/sem chave)
+    resposta_cache = _responder_do_cache(texto)
+    if resposta_cache is not None:
+        return resposta_cache
     if not CLIENTE_GEMINI:
         TEXTO_RESPOSTA_IA = "Erro: Sem chave de IA."
         return "Sem chave."
@@ -1400,85 +1857,66 @@ def perguntar_gemini(texto):
             log_terapeuta(f"Terapeuta: {texto}")
 
         # --- 2. PREPARA PROMPT E INICIA STREAM EM PARALELO ---
-        instrucao = (_perfil_ativo.get("prompt_instrucao") or "") if _perfil_ativo else ""
-
-        # Garante instruções de jogo mesmo se a diretriz vier do Supabase sem elas
-        if MODO_ROBO_ATUAL == "CRIANCA":
-            # Usa jogos carregados do Supabase; fallback para lista padrão
-            if _jogos_disponiveis:
-                lista_jogos = "\n".join(
-                    f"- {j['codigo']:<14} → {j['nome']}" for j in _jogos_disponiveis
-                )
-                exemplo_codigo = _jogos_disponiveis[0]["codigo"]
-            else:
-                lista_jogos = "(nenhum jogo disponível no momento)"
-                exemplo_codigo = "jogo"
-            instrucao += f"""
-
-REGRA OBRIGATÓRIA DE JOGOS:
-Quando a criança mencionar jogar, brincar ou qualquer jogo, você DEVE escolher um jogo e incluir a tag no final da resposta.
-NÃO faça perguntas. Escolha diretamente e inclua a tag.
-NÃO diga a tag em voz alto — ela é invisível para a criança.
-
-Jogos disponíveis (use o código exato da coluna esquerda):
-{lista_jogos}
-
-FORMATO OBRIGATÓRIO quando a criança quer jogar:
-Frase animada curta! [JOGO:codigo]
-
-EXEMPLOS:
-Criança: "quero jogar" → "Vamos brincar! [JOGO:{exemplo_codigo}]"
-Criança: "brincar" → "Que divertido! Vamos jogar! [JOGO:{exemplo_codigo}]"
-"""
+        # A instrução só é remontada quando perfil, modo ou lista de jogos mudam
+        prompt_perfil = (_perfil_ativo.get("prompt_instrucao") or "") if _perfil_ativo else ""
+        jogos = (tuple((j['codigo'], j['nome']) for j in _jogos_disponiveis)
+                 if MODO_ROBO_ATUAL == "CRIANCA" else ())
+        _sessao_conversa.preparar(CLIENTE_GEMINI, MODELO_IA,
+                                  _instrucao_sistema(MODO_ROBO_ATUAL, prompt_perfil, jogos),
+                                  contexto=(MODO_ROBO_ATUAL, (_perfil_ativo or {}).get("id")))
+        # Com histórico a resposta pode depender do que foi dito antes ("e o que ele come")
+        com_historico = _sessao_conversa.tem_historico()
 
         # Conteúdo enviado ao modelo: dica explícita se for jogar
-        texto_l_hint = texto.lower()
-        if MODO_ROBO_ATUAL == "CRIANCA" and any(w in texto_l_hint for w in ["jogar", "brincar", "jogo", "brincadeira"]):
+        if _pede_jogo(texto):
             contents_msg = f"{texto}\n(OBRIGATÓRIO: termine com [JOGO:codigo])"
         else:
             contents_msg = texto
 
         chunks_fila: queue.Queue = queue.Queue()
+        resposta = {"texto": "", "jogo": None, "assinatura": None, "uso": None, "pedacos": [],
+                    "completa": False}
 
         def _streamer():
-            global ULTIMO_THOUGHT_SIGNATURE
+            # Histórico (resumo + turnos) + mensagem; instrução pelo cache de contexto se pronto
+            mensagens = _sessao_conversa.conteudos(contents_msg)
+            config = _sessao_conversa.config()
             try:
-                # Prepara o conteúdo da mensagem
-                mensagens = [types.Content(role="user", parts=[types.Part(text=contents_msg)])]
-                
-                # Se temos uma assinatura de pensamento anterior, incluimos para manter o contexto
-                if ULTIMO_THOUGHT_SIGNATURE:
-                    mensagens.insert(0, types.Content(role="model", parts=[types.Part(thought_signature=ULTIMO_THOUGHT_SIGNATURE)]))
-
-                for chunk in CLIENTE_GEMINI.models.generate_content_stream(
-                    model=MODELO_IA,
-                    contents=mensagens,
-                    config=types.GenerateContentConfig(system_instruction=instrucao)
-                ):
-                    if chunk.text:
-                        chunks_fila.put(chunk.text)
-                    
-                    # Tenta capturar a assinatura de pensamento da resposta
-                    if chunk.candidates:
-                        for candidate in chunk.candidates:
-                            if candidate.content and candidate.content.parts:
-                                for part in candidate.content.parts:
-                                    if part.thought_signature:
-                                        ULTIMO_THOUGHT_SIGNATURE = part.thought_signature
-            except Exception as e_stream:
-                print(f"ERRO stream IA: {e_stream}")
+                for tentativa in range(2):
+                    recebeu = False
+                    try:
+                        for chunk in CLIENTE_GEMINI.models.generate_content_stream(
+                            model=MODELO_IA, contents=mensagens, config=config
+                        ):
+                            recebeu = True
+                            if chunk.text:
+                                chunks_fila.put(chunk.text)
+                                resposta["pedacos"].append(chunk.text)
+                            if chunk.usage_metadata:
+                                resposta["uso"] = chunk.usage_metadata
+                            # Assinatura de pensamento: volta no histórico junto com a resposta
+                            for candidate in chunk.candidates or ():
+                                if candidate.content and candidate.content.parts:
+                                    for part in candidate.content.parts:
+                                        if part.thought_signature:
+                                            resposta["assinatura"] = part.thought_signature
+                        resposta["completa"] = True
+                        break
+                    except Exception as e_stream:
+                        if tentativa == 0 and not recebeu and config.cached_content:
+                            print(f"[IA] Cache de contexto recusado ({e_stream}); repetindo com a instrução.")
+                            _sessao_conversa.invalidar_cache()
+                            config = _sessao_conversa.config()
+                            continue
+                        print(f"ERRO stream IA: {e_stream}")
+                        break
             finally:
                 chunks_fila.put(None)  # sentinela de fim
 
         threading.Thread(target=_streamer, daemon=True).start()
 
         # --- 3. FALA SOM DE PENSAMENTO ENQUANTO IA PROCESSA ---
-        som_pensar = random.choice([
-            "Ummm, deixa eu ver...",
-            "Ummm, deixa eu pensar...",
-            "Só um momento...",
-            "Ummm, boa pergunta...",
-        ])
+        som_pensar = random.choice(SONS_PENSAR)
         falar(som_pensar)  # Bloqueia ~2s — I2C estabiliza enquanto o stream carrega
 
         # Retoma rastreamento e olha para frente ao responder
@@ -1488,50 +1926,56 @@ Criança: "brincar" → "Que divertido! Vamos jogar! [JOGO:{exemplo_codigo}]"
         MODO_VISAO_ATIVO = antigo_modo_visao
 
         # --- 4. FALA CADA FRASE ASSIM QUE CHEGA NO STREAM ---
-        buffer = ""
-        resposta_completa = ""
-        jogo_detectado = None
+        # As frases vão para um pipeline: a próxima é sintetizada enquanto a atual toca.
 
-        while not _parar_fala.is_set():
-            try:
-                chunk_texto = chunks_fila.get(timeout=15)
-            except Exception:
-                break
-            if chunk_texto is None:
-                break
-            buffer += chunk_texto
-            resposta_completa += chunk_texto
+        t_pergunta = time.time()
 
-            # Fala frases completas (termina em . ! ?)
-            while True:
-                match = re.search(r'[^.!?]*[.!?]', buffer)
-                if match:
-                    sentenca = match.group(0)
-                    buffer = buffer[match.end():]
-                    # Detecta tag [JOGO:xxx] antes de falar
-                    tag = re.search(r'\[JOGO:(\w+)\]', sentenca)
-                    if tag:
-                        jogo_detectado = tag.group(1)
-                    sentenca_limpa = re.sub(r'\[JOGO:\w+\]', '', sentenca).strip()
-                    if sentenca_limpa:
-                        falar(sentenca_limpa)
-                        if _parar_fala.is_set():
-                            break
-                else:
-                    break
-            if _parar_fala.is_set():
-                break
+        def _ao_evento_resposta(evento):
+            # Tags agem no instante em que fecham, antes da frase dela terminar de tocar
+            if isinstance(evento, Tag) and evento.nome == "JOGO":
+                resposta["jogo"] = evento.valor
+                print(f"[IA] Tag de jogo '{evento.valor}' em {time.time() - t_pergunta:.2f}s.")
+                # O jogo sobe (imports, imagens) enquanto o resto da resposta é falado
+                threading.Thread(target=_preaquecer_jogo, args=(evento.valor,), daemon=True).start()
 
-        # Fala o restante sem pontuação (se não foi interrompido)
-        if buffer.strip() and not _parar_fala.is_set():
-            tag = re.search(r'\[JOGO:(\w+)\]', buffer)
-            if tag:
-                jogo_detectado = tag.group(1)
-            resto = re.sub(r'\[JOGO:\w+\]', '', buffer).strip()
-            if resto:
-                falar(resto)
+        parser = ParserResposta(ao_evento=_ao_evento_resposta)
 
-        TEXTO_RESPOSTA_IA = re.sub(r'\[JOGO:\w+\]', '', resposta_completa).strip()
+        def _frases_resposta():
+            while not _parar_fala.is_set():
+                try:
+                    chunk_texto = chunks_fila.get(timeout=15)
+                except Exception:
+                    break
+                if chunk_texto is None:
+                    break
+                resposta["texto"] += chunk_texto
+                for evento in parser.alimentar(chunk_texto):
+                    if isinstance(evento, Frase) and not _parar_fala.is_set():
+                        yield evento.texto
+
+            # Fala o restante sem pontuação (se não foi interrompido)
+            for evento in parser.finalizar():
+                if isinstance(evento, Frase) and not _parar_fala.is_set():
+                    yield evento.texto
+
+        falou_tudo = falar_frases(_frases_resposta())
+        resposta_completa = resposta["texto"]
+        jogo_detectado = resposta["jogo"]
+        # O histórico guarda a pergunta sem a dica de jogo (a dica só vale para este turno)
+        _sessao_conversa.registrar(texto, resposta_completa, resposta["assinatura"])
+        uso = resposta["uso"]
+        if uso:
+            print(f"[IA] Tokens: prompt {uso.prompt_token_count} "
+                  f"(cache {uso.cached_content_token_count or 0}), resposta {uso.candidates_token_count}.")
+
+        TEXTO_RESPOSTA_IA = parser.texto
+        if GRAVAR_STREAM_IA and resposta["pedacos"]:
+            try:
+                with open(ARQUIVO_STREAMS_IA, "a", encoding="utf-8") as f:
+                    f.write(json.dumps({"modelo": MODELO_IA, "pedacos": resposta["pedacos"]},
+                                       ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"[IA] Erro gravando o stream: {e}")
 
         # Diagnóstico: mostra resposta completa e jogo detectado
         print(f"[IA] Resposta: {resposta_completa[:200]}")
@@ -1540,9 +1984,20 @@ Criança: "brincar" → "Que divertido! Vamos jogar! [JOGO:{exemplo_codigo}]"
         else:
             print("[IA] Nenhuma tag [JOGO:xxx] na resposta.")
 
+        # Guarda para a próxima vez: resposta inteira, ouvida até o fim e sem jogo
+        # (pedido de jogo depende da lista de jogos e da dica deste turno); no meio
+        # de uma conversa, só pergunta que se entende sozinha
+        if (CACHE_RESPOSTAS_ATIVO and falou_tudo and resposta["completa"] and not jogo_detectado
+                and contents_msg == texto and (not com_historico or autonoma(texto))):
+            perfil, modo, versao = _chave_cache_resposta()
+            _cache_respostas.guardar(texto, perfil, modo, resposta_completa, versao,
+                                     clinica=getattr(cloud_mgr, "clinica_id", None))
+
         # Lança o jogo escolhido pela IA (após terminar de falar)
         if jogo_detectado and not _parar_fala.is_set():
             _lancar_jogo(jogo_detectado)
+        elif jogo_detectado:
+            _cancelar_preaquecimento()   # barge-in/PARAR durante a resposta
 
         if MODO_ROBO_ATUAL == "TERAPEUTA":
             log_terapeuta(f"{NOME_ROBO}: {resposta_completa}")
@@ -1551,118 +2006,135 @@ Criança: "brincar" → "Que divertido! Vamos jogar! [JOGO:{exemplo_codigo}]"
 
     except Exception as e:
         print(f"ERRO IA: {e}")
+        _cancelar_preaquecimento()
         TEXTO_RESPOSTA_IA = f"Erro IA: {str(e)[:40]}..."
         MODO_VISAO_ATIVO = True  # garante que tracking volta mesmo em erro
         return "Tive um erro."
 
 def _servidor_voz():
-    """Servidor UDP na porta 5050 — recebe pedidos de fala de subprogramas (jogos, ferramentas)."""
+    """Servidor UDP na porta 5050 — recebe pedidos de fala de subprogramas (jogos, ferramentas).
+    Texto puro fala com prioridade de jogo. Pedidos JSON com "id" recebem "aceito" na hora
+    e o estado final ("fim", "interrompido", "cancelado") quando a fala termina."""
     try:
         s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         s.bind(('localhost', 5050))
         print("Voz: Servidor UDP iniciado na porta 5050.")
+
+        def _responder(destino, ident, estado):
+            try: s.sendto(mensagem_estado(ident, estado), destino)
+            except OSError: pass   # cliente já fechou o socket
+
         while True:
-            data, _ = s.recvfrom(2048)
-            texto = data.decode('utf-8')
-            if texto:
-                threading.Thread(target=falar, args=(texto,), daemon=True).start()
+            data, origem = s.recvfrom(2048)
+            msg = ler_mensagem(data)
+            ident = msg.get("id")
+            if msg.get("cancelar"):
+                _agenda_fala.cancelar(origem=None if ident else origem, ident=ident)
+                continue
+            texto = str(msg.get("texto") or "").strip()
+            if not texto:
+                continue
+            aviso = None
+            if ident is not None:
+                _responder(origem, ident, "aceito")   # antes de agendar: chega antes do estado final
+                aviso = lambda estado, destino=origem, ident=ident: _responder(destino, ident, estado)
+            _agenda_fala.pedir(texto, msg.get("prioridade", "jogo"), origem=origem, ident=ident,
+                               ao_terminar=aviso)
     except Exception as e:
         print(f"Voz: Erro no servidor centralizado: {e}")
 
 
-def executar_movimento_voz(texto_l):
-    """Detecta comandos de movimento corporal por voz e executa.
+def _ficar_vesgo(o):
+    o.olhar_vesgo()
+    time.sleep(1.5)
+    o.olhar_neutro(suave=True)
+
+# (frases, resposta falada, ação) — a ordem é a prioridade ("piscar olho direito" antes de "piscar")
+COMANDOS_MOVIMENTO = [
+    (("piscar olho direito", "pisca olho direito", "pisca o direito", "olho direito pisca"),
+     "Piscando o olho direito!", lambda o: o.piscar_aleatorio("olho_direito")),
+    (("piscar olho esquerdo", "pisca olho esquerdo", "pisca o esquerdo", "olho esquerdo pisca"),
+     "Piscando o olho esquerdo!", lambda o: o.piscar_aleatorio("olho_esquerdo")),
+    (("piscar", "pisca os olhos", "pisca olhos"),
+     "Piscando!", lambda o: o.piscar()),
+    (("abra a boca", "abre a boca", "abre boca", "abrir boca"),
+     "Abrindo a boca!", lambda o: o.mover_boca(100)),
+    (("fecha a boca", "fecha boca", "fechar boca", "feche a boca"),
+     "Fechando a boca!", lambda o: o.mover_boca(0)),
+    (("olhe para a direita", "olha para a direita", "olha direita", "olhe direita", "vire para a direita"),
+     "Olhando para a direita!", lambda o: o.mover_suave_ambos(h_alvo=0, v_alvo=50, duracao=0.4)),
+    (("olhe para a esquerda", "olha para a esquerda", "olha esquerda", "olhe esquerda", "vire para a esquerda"),
+     "Olhando para a esquerda!", lambda o: o.mover_suave_ambos(h_alvo=100, v_alvo=50, duracao=0.4)),
+    (("olhe para cima", "olha para cima", "olha cima", "olhe cima"),
+     "Olhando para cima!", lambda o: o.olhar_cima()),
+    (("olhe para baixo", "olha para baixo", "olha baixo", "olhe baixo"),
+     "Olhando para baixo!", lambda o: o.mover_suave_ambos(h_alvo=50, v_alvo=90, duracao=0.4)),
+    (("olhe para mim", "olha para mim", "me olhe", "me olha", "olhe para frente", "olha frente",
+      "posição neutra", "fique normal", "fica normal"),
+     "Olhando para você!", lambda o: o.olhar_neutro()),
+    (("fique vesgo", "fica vesgo", "olhos vesgos", "fique de vesgo"),
+     "Ficando vesgo!", _ficar_vesgo),
+    (("fique triste", "fica triste", "expressão triste", "cara triste"),
+     "Estou triste...", lambda o: o.olhar_triste()),
+    (("fique surpreso", "fica surpreso", "expressão de surpresa", "olhos arregalados"),
+     "Que surpresa!", lambda o: o.surpresa()),
+    (("fique bravo", "fica bravo", "expressão de raiva", "cara de bravo", "franzir sobrancelha"),
+     "Grrr!", lambda o: o.olhar_bravo()),
+    (("fique feliz", "fica feliz", "expressão feliz", "cara feliz"),
+     "Estou feliz!", lambda o: o.olhar_feliz()),
+    (("desconfiado", "fique desconfiado", "cara de dúvida"),
+     "Hmmm...", lambda o: o.desconfiado()),
+    (("levante as sobrancelhas", "sobrancelhas para cima"),
+     "Assim?", lambda o: o.mover_sobrancelhas(100)),
+    (("abaixe as sobrancelhas", "sobrancelhas para baixo", "franza"),
+     "Assim?", lambda o: o.mover_sobrancelhas(0)),
+    (("acorde", "animação acordar", "animacao acordar"),
+     "Acordando!", lambda o: o.animacao_acordar()),
+    (("durma", "animação dormir", "animacao dormir"),
+     "Estou com sono...", lambda o: o.animacao_dormir()),
+    (("galope", "galopa", "galopa os olhos"),
+     "Galopando!", lambda o: o.alternar_piscar(batidas=4, vel=0.15)),
+]
+
+# Tabela de controle compilada uma vez (KWS + parciais do STT)
+TABELA_CONTROLE = TabelaPalavrasChave({
+    "parar": FRASES_PARAR,
+    "modo_terapeuta": FRASES_MODO_TERAPEUTA,
+    "encerrar": FRASES_ENCERRAR,
+    **{f"mov_{i}": c[0] for i, c in enumerate(COMANDOS_MOVIMENTO)},
+})
+
+@functools.lru_cache(maxsize=4)
+def _roteador_intencoes(jogos):
+    """Tabela de intenções locais (ordem = prioridade), compilada de novo só
+    quando a lista de jogos (codigo, nome) muda."""
+    return RoteadorIntencoes([
+        Entrada("parar", "controle", FRASES_PARAR),
+        Entrada("modo_terapeuta", "modo", FRASES_MODO_TERAPEUTA),
+        Entrada("encerrar", "saida", FRASES_ENCERRAR),
+        Entrada("voltar", "modo", FRASES_VOLTAR),
+        Entrada("listar_arquivos", "modo", FRASES_LISTAR_ARQUIVOS),
+        Entrada("modo_ia", "modo", FRASES_MODO_IA),
+        Entrada("modo_eco", "modo", FRASES_MODO_ECO),
+        *(Entrada(f"mov_{i}", "movimento", c[0], i) for i, c in enumerate(COMANDOS_MOVIMENTO)),
+        Entrada("musica", "musica", FRASES_MUSICA),
+        *(Entrada(f"jogo_{codigo}", "jogo", (nome,), codigo, todas=True) for codigo, nome in jogos),
+    ])
+
+def rotear_intencao(texto, ignorar=()):
+    """Intenção local da fala (src/intencoes.py) ou None: uma passada, sem rede."""
+    jogos = tuple((j['codigo'], j['nome']) for j in (_jogos_disponiveis or []))
+    return _roteador_intencoes(jogos).rotear(texto, ignorar)
+
+def executar_movimento_voz(indice):
+    """Executa o comando de movimento COMANDOS_MOVIMENTO[indice].
     Retorna True se um movimento foi executado, False caso contrário."""
     if not olhos:
         return False
-
-    if any(x in texto_l for x in ["piscar olho direito", "pisca olho direito", "pisca o direito", "olho direito pisca"]):
-        falar("Piscando o olho direito!")
-        olhos.piscar_aleatorio("olho_direito"); return True
-
-    if any(x in texto_l for x in ["piscar olho esquerdo", "pisca olho esquerdo", "pisca o esquerdo", "olho esquerdo pisca"]):
-        falar("Piscando o olho esquerdo!")
-        olhos.piscar_aleatorio("olho_esquerdo"); return True
-
-    if any(x in texto_l for x in ["piscar", "pisca os olhos", "pisca olhos"]):
-        falar("Piscando!")
-        olhos.piscar(); return True
-
-    if any(x in texto_l for x in ["abra a boca", "abre a boca", "abre boca", "abrir boca"]):
-        falar("Abrindo a boca!")
-        olhos.mover_boca(100); return True
-
-    if any(x in texto_l for x in ["fecha a boca", "fecha boca", "fechar boca", "feche a boca"]):
-        falar("Fechando a boca!")
-        olhos.mover_boca(0); return True
-
-    if any(x in texto_l for x in ["olhe para a direita", "olha para a direita", "olha direita", "olhe direita", "vire para a direita"]):
-        falar("Olhando para a direita!")
-        olhos.mover_suave_ambos(h_alvo=0, v_alvo=50, duracao=0.4); return True
-
-    if any(x in texto_l for x in ["olhe para a esquerda", "olha para a esquerda", "olha esquerda", "olhe esquerda", "vire para a esquerda"]):
-        falar("Olhando para a esquerda!")
-        olhos.mover_suave_ambos(h_alvo=100, v_alvo=50, duracao=0.4); return True
-
-    if any(x in texto_l for x in ["olhe para cima", "olha para cima", "olha cima", "olhe cima"]):
-        falar("Olhando para cima!")
-        olhos.olhar_cima(); return True
-
-    if any(x in texto_l for x in ["olhe para baixo", "olha para baixo", "olha baixo", "olhe baixo"]):
-        falar("Olhando para baixo!")
-        olhos.mover_suave_ambos(h_alvo=50, v_alvo=90, duracao=0.4); return True
-
-    if any(x in texto_l for x in ["olhe para mim", "olha para mim", "me olhe", "me olha", "olhe para frente", "olha frente", "posição neutra", "fique normal", "fica normal"]):
-        falar("Olhando para você!")
-        olhos.olhar_neutro(); return True
-
-    if any(x in texto_l for x in ["fique vesgo", "fica vesgo", "olhos vesgos", "fique de vesgo"]):
-        falar("Ficando vesgo!")
-        olhos.olhar_vesgo()
-        time.sleep(1.5)
-        olhos.olhar_neutro(suave=True); return True
-
-    if any(x in texto_l for x in ["fique triste", "fica triste", "expressão triste", "cara triste"]):
-        falar("Estou triste...")
-        olhos.olhar_triste(); return True
-
-    if any(x in texto_l for x in ["fique surpreso", "fica surpreso", "expressão de surpresa", "olhos arregalados"]):
-        falar("Que surpresa!")
-        olhos.surpresa(); return True
-
-    if any(x in texto_l for x in ["fique bravo", "fica bravo", "expressão de raiva", "cara de bravo", "franzir sobrancelha"]):
-        falar("Grrr!")
-        olhos.olhar_bravo(); return True
-
-    if any(x in texto_l for x in ["fique feliz", "fica feliz", "expressão feliz", "cara feliz"]):
-        falar("Estou feliz!")
-        olhos.olhar_feliz(); return True
-
-    if any(x in texto_l for x in ["desconfiado", "fique desconfiado", "cara de dúvida"]):
-        falar("Hmmm...")
-        olhos.desconfiado(); return True
-
-    if any(x in texto_l for x in ["levante as sobrancelhas", "sobrancelhas para cima"]):
-        falar("Assim?")
-        olhos.mover_sobrancelhas(100); return True
-
-    if any(x in texto_l for x in ["abaixe as sobrancelhas", "sobrancelhas para baixo", "franza"]):
-        falar("Assim?")
-        olhos.mover_sobrancelhas(0); return True
-
-    if any(x in texto_l for x in ["acorde", "animação acordar", "animacao acordar"]):
-        falar("Acordando!")
-        olhos.animacao_acordar(); return True
-
-    if any(x in texto_l for x in ["durma", "animação dormir", "animacao dormir"]):
-        falar("Estou com sono...")
-        olhos.animacao_dormir(); return True
-
-    if any(x in texto_l for x in ["galope", "galopa", "galopa os olhos"]):
-        falar("Galopando!")
-        olhos.alternar_piscar(batidas=4, vel=0.15); return True
-
-    return False
+    _, resposta, acao = COMANDOS_MOVIMENTO[indice]
+    falar(resposta)
+    acao(olhos)
+    return True
 
 
 def log_terapeuta(conteudo):
@@ -1683,26 +2155,35 @@ def desligar_motores():
     except Exception as e:
         print(f"desligar_motores: erro ao desligar servos: {e}")
 
+def _encerrar_processo_externo(proc, timeout=1.0):
+    """Encerra um jogo/ferramenta e todo o seu grupo de processos.
+    O jogo roda em sessão própria: o SIGTERM chega junto ao mpg123/aplay dos quais
+    coreografias ficam esperando, sem pkill global (que matava áudio alheio)."""
+    if proc.poll() is not None:
+        return
+    try:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)   # SIGKILL: não pode ser ignorado
+            proc.wait(timeout=timeout)
+    except Exception: pass
+
 def finalizar_modo_geral():
     """Para tudo: jogos, música, fala e visão."""
     global MODO_VISAO_ATIVO, TEXTO_RESPOSTA_IA, MODO_VISAO_TELA, _processo_externo
     MODO_VISAO_TELA = False
     if gui: gui.parar_jogo()
     TEXTO_RESPOSTA_IA = ""
-    # Mata áudio PRIMEIRO — coreografias ficam presas esperando mpg123/aplay terminar;
-    # matar o áudio antes desbloqueia o subprocess para aceitar SIGTERM.
-    subprocess.run(["pkill", "-9", "mpg123"], stderr=subprocess.DEVNULL)
-    subprocess.run(["pkill", "-9", "aplay"],  stderr=subprocess.DEVNULL)
+    # Corta a fala em curso (qualquer motor), a sequência de frases da IA e a agenda
+    _parar_fala.set()
+    _agenda_fala.cancelar()
+    _interromper_fala()
+    _cancelar_preaquecimento()
     # Encerra processo externo em execução (jogo, calibrador, rastreador etc.)
-    if _processo_externo and _processo_externo.poll() is None:
-        try:
-            _processo_externo.terminate()
-            try:
-                _processo_externo.wait(timeout=1)
-            except subprocess.TimeoutExpired:
-                _processo_externo.kill()   # SIGKILL: não pode ser ignorado
-                _processo_externo.wait(timeout=1)
-        except Exception: pass
+    if _processo_externo:
+        _encerrar_processo_externo(_processo_externo)
         _processo_externo = None
     if olhos:
         olhos.olhar_frente()
@@ -1754,6 +2235,68 @@ def _buscar_jogo_por_codigo(codigo):
             return j
     return None
 
+def _script_jogo(codigo):
+    return os.path.join(os.path.dirname(__file__), codigo.strip().lstrip('/'))
+
+def _ambiente_jogo():
+    """Ambiente do processo do jogo: sessão gráfica do usuário e áudio cedido pelo robô."""
+    env = os.environ.copy()
+    env['XDG_RUNTIME_DIR'] = f'/run/user/{os.getuid()}'
+    env.pop('SDL_AUDIODRIVER', None)
+    env[ENV_CONCEDIDO] = "1"
+    return env
+
+def _preaquecer_jogo(codigo):
+    """Tag [JOGO:x] lida no meio da resposta: abre o processo do jogo parado na
+    barreira (src/preaquecimento_jogo.py) enquanto o robô termina de falar."""
+    global _jogo_preaquecido
+    jogo_obj = _buscar_jogo_por_codigo(codigo.strip().lower())
+    if not JOGO_PREAQUECER or not jogo_obj:
+        return
+    script = _script_jogo(jogo_obj.get('codigo', ''))
+    if not suporta_preaquecimento(script):
+        return
+    with _lock_preaquecimento:
+        anterior = _jogo_preaquecido
+        if anterior is not None and anterior.codigo == jogo_obj['codigo'] and anterior.vivo:
+            return
+        if _processo_externo:
+            return   # já há um jogo rodando
+        try:
+            _jogo_preaquecido = JogoPreaquecido(jogo_obj['codigo'], ["python3", script], _ambiente_jogo())
+        except Exception as e:
+            print(f"[JOGO] Pré-aquecimento falhou ({e}); lança frio.")
+            _jogo_preaquecido = None
+        pre = _jogo_preaquecido
+    if anterior is not None:
+        anterior.cancelar()
+    if pre is not None:
+        expira = threading.Timer(JOGO_PREAQUECIDO_VALIDADE_S, _cancelar_preaquecimento, args=(pre,))
+        expira.daemon = True
+        expira.start()
+
+def _cancelar_preaquecimento(somente=None):
+    """Fecha a barreira do jogo pré-aquecido (barge-in, PARAR, jogo não lançado):
+    o processo sai sem abrir a tela."""
+    global _jogo_preaquecido
+    with _lock_preaquecimento:
+        pre = _jogo_preaquecido
+        if pre is None or (somente is not None and pre is not somente):
+            return
+        _jogo_preaquecido = None
+    print(f"[JOGO] Pré-aquecimento de {pre.codigo} cancelado.")
+    pre.cancelar()
+
+def _tomar_preaquecido(codigo):
+    """JogoPreaquecido de `codigo` (sai do registro) ou None; outro jogo pré-aquecido é cancelado."""
+    global _jogo_preaquecido
+    with _lock_preaquecimento:
+        pre, _jogo_preaquecido = _jogo_preaquecido, None
+    if pre is not None and pre.codigo != codigo:
+        pre.cancelar()
+        pre = None
+    return pre
+
 def _executar_jogo(jogo_obj):
     """Executor único para qualquer jogo/ferramenta cadastrado no saas_jogos.
     A verificação biométrica é responsabilidade do chamador (já feita antes desta chamada).
@@ -1761,7 +2304,7 @@ def _executar_jogo(jogo_obj):
     codigo = jogo_obj.get('codigo', '').strip()
     desativar_rastr = bool(jogo_obj.get('desativar_rastreamento', False))
 
-    script = os.path.join(os.path.dirname(__file__), codigo.lstrip('/'))
+    script = _script_jogo(codigo)
     if not os.path.exists(script):
         print(f"[JOGO] Script não encontrado: {script}")
         falar("Desculpe, não encontrei esse aplicativo.")
@@ -1770,19 +2313,15 @@ def _executar_jogo(jogo_obj):
     def _run():
         global _processo_externo, _pausar_piscar, _pausar_loop_voz, MODO_VISAO_ATIVO
 
-        uid = os.getuid()
-        env = os.environ.copy()
-        env['XDG_RUNTIME_DIR'] = f'/run/user/{uid}'
-        env.pop('SDL_AUDIODRIVER', None)
-
-        # Interrompe VAD/PyAudio antes de matar aplay
-        _parar_captura_vad.set()
-        time.sleep(0.15)
-        subprocess.run(["pkill", "-9", "arecord"], stderr=subprocess.DEVNULL)
-        subprocess.run(["pkill", "-9", "aplay"],   stderr=subprocess.DEVNULL)
-        subprocess.run(["pkill", "-9", "mpg123"],  stderr=subprocess.DEVNULL)
-        time.sleep(0.3)
-        _parar_captura_vad.clear()
+        # Pede o dispositivo de áudio ao broker em nome do jogo: o robô é preemptado
+        # (captura pausada, fala cortada) e confirma antes da concessão — sem pkill/sleep.
+        t0 = time.time()
+        concessao = ClienteAudio(f"jogo:{codigo}", PRIORIDADE_JOGO)
+        if not (concessao.conectar() and concessao.adquirir(timeout=2.0)):
+            concessao.fechar()
+            concessao = None
+            _ceder_audio()   # Sem broker: o próprio robô libera o dispositivo
+        print(f"[JOGO] Dispositivo de áudio liberado em {(time.time() - t0) * 1000:.0f} ms.")
 
         _pausar_piscar   = True
         _pausar_loop_voz = True
@@ -1801,20 +2340,31 @@ def _executar_jogo(jogo_obj):
             gui._ev_display_livre.clear()
 
         # Encerra processo externo anterior (se ainda rodando)
-        if _processo_externo and _processo_externo.poll() is None:
-            try:
-                _processo_externo.terminate()
-                _processo_externo.wait(timeout=2)
-            except Exception: pass
+        if _processo_externo:
+            _encerrar_processo_externo(_processo_externo, timeout=2.0)
             _processo_externo = None
-            time.sleep(0.3)
 
-        # Executa e aguarda o aplicativo encerrar
-        _processo_externo = subprocess.Popen(["python3", script], env=env)
+        # Executa (em sessão própria, para ser encerrado com seus filhos) e aguarda.
+        # Se a tag da IA já abriu o jogo, ele está na barreira: só recebe a vez.
+        proc = None
+        pre = _tomar_preaquecido(codigo)
+        if pre is not None:
+            t_vez = time.time()
+            proc = pre.liberar()
+            if proc:
+                print(f"[JOGO] Vez dada ao {codigo} pré-aquecido em {(time.time() - t_vez) * 1000:.0f} ms.")
+            else:
+                pre.cancelar()
+        _processo_externo = proc or subprocess.Popen(["python3", script], env=_ambiente_jogo(),
+                                                     start_new_session=True)
         _processo_externo.wait()
         _processo_externo = None
 
-        # Restaura estado
+        # Devolve o dispositivo: o broker concede de volta ao robô (ao_retomar)
+        if concessao:
+            concessao.fechar()
+        else:
+            _retomar_audio()
         _pausar_piscar   = False
         _pausar_loop_voz = False
         if desativar_rastr:
@@ -2035,7 +2585,7 @@ def _inicializar_extractor_biometria():
         return False
     try:
         config = _sherpa_onnx.SpeakerEmbeddingExtractorConfig(
-            model=MODELO_BIOMETRIA, num_threads=2, debug=False
+            model=MODELO_BIOMETRIA, num_threads=BIOMETRIA_THREADS, debug=False
         )
         _extractor_biometria = _sherpa_onnx.SpeakerEmbeddingExtractor(config)
         print("[BIOMETRIA] Extrator carregado com sucesso.")
@@ -2047,13 +2597,13 @@ def _inicializar_extractor_biometria():
 
 def _verificar_biometria_voz(perfil):
     """
-    Usa o áudio já gravado em ARQUIVO_REC (a própria fala que ativou o jogo)
+    Usa o último enunciado do microfone persistente (a própria fala que ativou o jogo)
     para comparar com o perfil salvo ('admin' ou 'terapeuta').
     Não faz nova gravação — reutiliza o que o usuário já disse.
     Retorna True se a identidade for confirmada.
     Fail-open: se o modelo ou perfil não existir, permite o acesso e avisa.
     """
-    print(f"[BIOMETRIA] Verificando perfil '{perfil}' com o áudio já capturado ({ARQUIVO_REC})...")
+    print(f"[BIOMETRIA] Verificando perfil '{perfil}' com o enunciado já capturado em memória...")
 
     if not _inicializar_extractor_biometria():
         print("[BIOMETRIA] Extrator indisponível → acesso permitido (fail-open).")
@@ -2064,17 +2614,16 @@ def _verificar_biometria_voz(perfil):
         print(f"[BIOMETRIA] Perfil '{perfil}' não cadastrado ({arquivo_perfil}) → acesso negado (perfil ausente).")
         return False
 
-    if not os.path.exists(ARQUIVO_REC):
-        print(f"[BIOMETRIA] Áudio de entrada não encontrado ({ARQUIVO_REC}) → acesso permitido (fail-open).")
+    if _ULTIMO_ENUNCIADO is None:
+        print("[BIOMETRIA] Nenhum enunciado em memória → acesso permitido (fail-open).")
         return True
 
     try:
         embedding_perfil = np.fromfile(arquivo_perfil, dtype=np.float32)
         print(f"[BIOMETRIA] Perfil '{perfil}' carregado ({len(embedding_perfil)} dims).")
 
-        with wave.open(ARQUIVO_REC, 'rb') as f:
-            taxa = f.getframerate()
-            samples = np.frombuffer(f.readframes(f.getnframes()), dtype=np.int16).astype(np.float32) / 32768.0
+        taxa = _ULTIMO_ENUNCIADO.taxa
+        samples = _ULTIMO_ENUNCIADO.como_float()
         print(f"[BIOMETRIA] Áudio lido: {len(samples)} amostras @ {taxa}Hz")
 
         stream = _extractor_biometria.create_stream()
@@ -2127,18 +2676,6 @@ def _jogo_requer_verificacao(jogo):
     return None
 
 
-def _detectar_jogo_por_voz(texto_l):
-    """Verifica se o texto contém o nome de algum jogo disponível.
-    Retorna o código do jogo encontrado ou None."""
-    if not _jogos_disponiveis:
-        return None
-    for jogo in _jogos_disponiveis:
-        # Divide o nome em palavras significativas (>= 3 letras) e verifica se estão no texto
-        palavras = [p.lower() for p in jogo['nome'].split() if len(p) >= 3]
-        if palavras and all(p in texto_l for p in palavras):
-            return jogo['codigo']
-    return None
-
 def _lancar_jogo(codigo):
     """Lança um jogo pelo código (comando_entrada) retornado pela IA via tag [JOGO:codigo].
     A única fonte de verdade é _jogos_disponiveis (carregado do saas_jogos)."""
@@ -2151,10 +2688,48 @@ def _lancar_jogo(codigo):
 
 
 # --- LOOP PRINCIPAL ---
+def _parcial_de_controle(parcial):
+    """Mostra a parcial do STT na tela e encerra o enunciado cedo em frases de controle."""
+    global TEXTO_RESPOSTA_IA
+    TEXTO_RESPOSTA_IA = f"Ouvindo: {parcial}"
+    rotulo = TABELA_CONTROLE.casar(parcial, parcial=True)
+    if rotulo == "modo_terapeuta":
+        return MODO_ROBO_ATUAL == "CRIANCA"
+    return rotulo is not None
+
+def _ao_detectar_palavra(rotulo):
+    """Callback da EscutaPalavrasChave (thread de áudio)."""
+    global _ultimo_parar_kws
+    agora = time.time()
+    if rotulo == "parar":
+        # PARAR vale sempre (inclusive durante fala e jogos) e age na hora
+        if agora - _ultimo_parar_kws < 2.0:
+            return
+        _ultimo_parar_kws = agora
+        print("[KWS] PARAR")
+        threading.Thread(target=finalizar_modo_geral, daemon=True).start()
+        return
+    # Demais frases só com o loop de voz ativo e o robô calado (evita o próprio eco)
+    if _robo_falando.is_set() or _pausar_loop_voz or (gui and gui.modo_jogo):
+        return
+    print(f"[KWS] {rotulo}")
+    _fila_kws.put((agora, rotulo))
+    _kws_disparou.set()
+
+def _comando_kws_pendente():
+    """Frase canônica da última palavra-chave válida detectada pelo KWS (ou None)."""
+    frase = None
+    while not _fila_kws.empty():
+        instante, rotulo = _fila_kws.get_nowait()
+        if time.time() - instante <= KWS_VALIDADE_S:
+            frase = TABELA_CONTROLE.frases[rotulo][0]
+    _kws_disparou.clear()
+    return frase
+
 def loop_logica():
     global modo_ia_ativo, MODO_ROBO_ATUAL, TEXTO_RESPOSTA_IA, cloud_mgr 
     global MODELO_IA, _jogos_disponiveis, _perfil_ativo, _MOTOR_VOZ_GLOBAL
-    global _PIPER_INSTANCIA, PIPER_VELOCIDADE, PIPER_PITCH
+    global PIPER_VELOCIDADE, PIPER_PITCH
     
     # 1. Prepara arquivos e conexão Cloud (ESSENCIAL para carregar .env.local)
     configurar_arquivos_terapeuta()
@@ -2243,13 +2818,53 @@ def loop_logica():
         else:
             print("Cloud: Nenhum perfil ativo configurado.")
 
-        # Inicializa o Piper TTS (se necessário)
-        _inicializar_piper()
+    # Carrega o motor de voz configurado em segundo plano enquanto o resto do boot segue
+    _motores_voz.aquecer(_MOTOR_VOZ_GLOBAL)
+    _motores_voz.iniciar()
+    threading.Thread(target=_aquecer_cache_voz_continuo, daemon=True).start()
+
+    # Broker do dispositivo de áudio: o robô é o dono padrão e cede para jogos/ferramentas
+    global _broker_audio, _cliente_audio_robo
+    if not BrokerAudio.ativo():
+        try:
+            _broker_audio = BrokerAudio()
+            _broker_audio.iniciar()
+        except Exception as e:
+            print(f"Audio: Broker indisponível ({e}).")
+    _cliente_audio_robo = ClienteAudio("tirilo", PRIORIDADE_ROBO,
+                                       ao_preemptar=_ceder_audio, ao_retomar=_retomar_audio)
+    if _cliente_audio_robo.conectar():
+        _cliente_audio_robo.adquirir(timeout=2.0)
+
+    # Abre o microfone persistente (uma única vez para toda a vida do processo)
+    global _vad_captura
+    if _servico_captura.iniciar():
+        _vad_captura = criar_vad(
+            VAD_MOTOR, taxa=_servico_captura.taxa, quadro=_servico_captura.quadro,
+            modelo_silero=MODELO_VAD_SILERO, fator=VAD_FATOR_RUIDO, limiar_min=VAD_LIMIAR_MIN
+        )
+    else:
+        print("Audio: Microfone persistente indisponivel neste hardware, usando arecord.")
+
+    # Reconhecimento de fala: Sherpa local (streaming) ou Google
+    global _reconhecedor, _escuta_kws
+    _reconhecedor = criar_reconhecedor(STT_MOTOR, PASTA_MODELO_STT, taxa=TAXA_VOZ, recognizer=r)
+
+    # Palavras-chave de controle direto no áudio (sem STT)
+    if _servico_captura.ativo:
+        try:
+            _escuta_kws = EscutaPalavrasChave(_servico_captura, TABELA_CONTROLE,
+                                              PASTA_MODELO_KWS, _ao_detectar_palavra)
+            _escuta_kws.iniciar()
+        except Exception as e:
+            print(f"KWS: Indisponível ({e}); frases de controle via parciais do STT.")
 
     # Inicia servidor de voz UDP (porta 5050) para jogos e ferramentas externas
     threading.Thread(target=_servidor_voz, daemon=True).start()
 
+    _motores_voz.aguardar(_MOTOR_VOZ_GLOBAL, MOTORES_VOZ_ESPERA_BOOT_S)
     falar(f"Olá! Eu sou o {NOME_ROBO}. Minha inteligência artificial está ligada. Como posso ajudar você hoje?")
+    _pedido_aquecimento.set()
     
     while gui.running:
         try:
@@ -2266,7 +2881,7 @@ def loop_logica():
                 except Exception: pass
                 time.sleep(0.3)
                 continue
-            texto = capturar_voz()
+            texto = capturar_voz(ao_parcial=_parcial_de_controle)
             
             if not texto: 
                 # --- PROCESSA COMANDOS DA NUVEM (Se houver) ---
@@ -2290,22 +2905,26 @@ def loop_logica():
                             if cloud_mgr:
                                 cfg = cloud_mgr.get_config()
                                 print(f"DEBUG: RELOAD_CONFIG - Config recebida: {cfg}")
+                                voz_antes = _voz_atual()
                                 if cfg and cfg.get('motor_voz_preferencial'):
                                     _MOTOR_VOZ_GLOBAL = cfg['motor_voz_preferencial'].upper()
                                     
                                     # Atualiza parâmetros Piper se presentes
                                     if 'piper_speed' in cfg:
                                         PIPER_VELOCIDADE = float(cfg['piper_speed'])
-                                        if _PIPER_INSTANCIA: _PIPER_INSTANCIA.config.length_scale = PIPER_VELOCIDADE
+                                        piper = _motores_voz.instancia("PIPER")
+                                        if piper: piper.config.length_scale = PIPER_VELOCIDADE
                                     if 'piper_pitch' in cfg:
                                         PIPER_PITCH = int(cfg['piper_pitch'])
                                     
-                                    # Se selecionou Piper e ainda não carregou, carrega agora!
-                                    # Inicializa motores se selecionados e não carregados
-                                    if _MOTOR_VOZ_GLOBAL == "PIPER" and _PIPER_INSTANCIA is None:
-                                        _inicializar_piper()
-                                    elif _MOTOR_VOZ_GLOBAL == "SHERPA" and _SHERPA_INSTANCIA is None:
-                                        _inicializar_sherpa()
+                                    # Motor novo carrega em segundo plano; até ficar pronto fala o anterior
+                                    _motores_voz.aquecer(_MOTOR_VOZ_GLOBAL)
+                                # Voz nova: a RAM do cache se renova sozinha; re-sintetiza as frases frequentes
+                                # (se o motor ainda está carregando, _ao_motor_pronto pede quando terminar)
+                                if _voz_atual() != voz_antes:
+                                    _pedido_aquecimento.set()
+                                # Diretrizes da clínica podem ter mudado: respostas guardadas dela saem
+                                _cache_respostas.invalidar(clinica=cloud_mgr.clinica_id)
                             
                             print(f"Config: Recarregado do Supabase (Voz: {_MOTOR_VOZ_GLOBAL} e Diretrizes).")
                             falar("Configurações atualizadas.")
@@ -2315,6 +2934,9 @@ def loop_logica():
                                 novo = cloud_mgr.get_perfil_por_id(perfil_id)
                                 if novo:
                                     _perfil_ativo = novo
+                                    # Respostas do perfil feitas com outro prompt saem (as atuais ficam)
+                                    _cache_respostas.invalidar(perfil=novo.get('id'),
+                                                               exceto_versao=_chave_cache_resposta()[2])
                                     nome_perfil = novo.get('nome', '?')
                                     TEXTO_RESPOSTA_IA = f"Perfil ativo: {nome_perfil}"
                                     if gui: gui.set_status(f"Perfil: {nome_perfil}", AZUL)
@@ -2355,21 +2977,38 @@ def loop_logica():
             # --- DEBUG: Mostra o que ouviu na tela ---
             TEXTO_RESPOSTA_IA = f"Ouvi: {texto}"
             
-            texto_l = texto.lower()
-            
+            # --- INTENÇÕES LOCAIS (uma passada; só o que sobra vai para a IA) ---
+            t_rota = time.perf_counter()
+            if MODO_ROBO_ATUAL == "TERAPEUTA":
+                ignorar = ("modo_terapeuta", "modo_ia", "modo_eco")
+            else:
+                ignorar = ("voltar", "listar_arquivos")
+            intencao = rotear_intencao(texto, ignorar)
+            rotulo = intencao.rotulo if intencao else None
+            if intencao:
+                print(f"[INTENÇÃO] {rotulo} (confiança {intencao.confianca:.2f}, "
+                      f"{(time.perf_counter() - t_rota) * 1e6:.0f} µs)")
+                # Pergunta que só cita a palavra ("como o cavalo galopa?") fica com a IA
+                if (intencao.tipo in ("movimento", "musica", "jogo") and modo_ia_ativo
+                        and intencao.confianca < INTENCAO_CONFIANCA_MIN):
+                    print("[INTENÇÃO] Confiança baixa: vai para a IA.")
+                    intencao, rotulo = None, None
+
             # --- CONTROLE DE MODO ---
             
+            if rotulo == "parar":
+                finalizar_modo_geral()
+                continue
+
             # 1. TROCA PARA MODO TERAPEUTA
-            if ("doutor tirilo" in texto_l or "doutortor turilo" in texto_l or 
-                "doutor turilo" in texto_l or "doutoto turilo" in texto_l or 
-                "dr torino" in texto_l or "dr tirilo" in texto_l) and MODO_ROBO_ATUAL == "CRIANCA":
+            if rotulo == "modo_terapeuta":
                 
                 modo_ia_ativo = True # Ativa a IA
                 iniciar_modo_terapeuta()
                 continue
             
             # 2. ENCERRAMENTO
-            if "tchau" in texto_l or "sair" in texto_l:
+            if rotulo == "encerrar":
                 falar("Tchau! Até logo!")
                 time.sleep(0.5)
                 if olhos:
@@ -2384,57 +3023,37 @@ def loop_logica():
             # --- LÓGICA DO MODO TERAPEUTA ---
             if MODO_ROBO_ATUAL == "TERAPEUTA":
                 # Comando de saída explícita do modo
-                if "voltar" in texto_l or "sair do modo" in texto_l:
+                if rotulo == "voltar":
                     finalizar_modo_terapeuta()
                     continue
                 # Comando para listar arquivos
-                if "listar arquivos" in texto_l or "logs" in texto_l:
+                if rotulo == "listar_arquivos":
                     gui.listar_arquivos()
                     falar("Listando arquivos de logs.")
                     continue
-                
-                # Comandos de movimento corporal por voz
-                if executar_movimento_voz(texto_l):
-                    continue
-                # Detecção de jogo por voz antes de ir para IA
-                jogo_voz = _detectar_jogo_por_voz(texto_l)
-                if jogo_voz:
-                    print(f"[JOGO] Detectado por voz (modo terapeuta): {jogo_voz}")
-                    jogo_obj = next((j for j in _jogos_disponiveis if j['codigo'] == jogo_voz), {})
-                    perfil_req = _jogo_requer_verificacao(jogo_obj)
-                    if perfil_req:
-                        print(f"[JOGO] Jogo '{jogo_voz}' requer verificação: {perfil_req}")
-                        if not _verificar_biometria_voz(perfil_req):
-                            print(f"[JOGO] Verificação biométrica falhou → passando para IA.")
-                            if modo_ia_ativo:
-                                perguntar_gemini(texto)
-                            continue
-                        print(f"[JOGO] Verificação biométrica OK.")
-                    _executar_jogo(jogo_obj)
-                    continue
-                # Conversa normal de IA no modo terapeuta
-                if modo_ia_ativo:
-                    perguntar_gemini(texto)  # já fala internamente via streaming
-                continue # Pula o resto do loop de criança
-
-            # --- LÓGICA DO MODO CRIANÇA ---
-            
-            if "gemini" in texto_l:
-                TEXTO_RESPOSTA_IA = "" # Limpa a tela ao ativar IA
-                modo_ia_ativo = True; falar("Cérebro ativado!"); continue
+            else:
+                # --- LÓGICA DO MODO CRIANÇA ---
+                if rotulo == "modo_ia":
+                    TEXTO_RESPOSTA_IA = "" # Limpa a tela ao ativar IA
+                    modo_ia_ativo = True; falar("Cérebro ativado!"); continue
 
-            if "desativar" in texto_l or "eco" in texto_l:
-                TEXTO_RESPOSTA_IA = "Modo Eco: IA desativada." # Feedback na tela
-                modo_ia_ativo = False; falar("Modo Eco."); continue
+                if rotulo == "modo_eco":
+                    TEXTO_RESPOSTA_IA = "Modo Eco: IA desativada." # Feedback na tela
+                    modo_ia_ativo = False; falar("Modo Eco."); continue
 
             # Comandos de movimento corporal por voz
-            if executar_movimento_voz(texto_l):
+            if intencao and intencao.tipo == "movimento" and executar_movimento_voz(intencao.valor):
+                continue
+
+            if rotulo == "musica":
+                tocar_musica()
                 continue
 
-            # Detecção de jogo por voz antes de ir para IA
-            jogo_voz = _detectar_jogo_por_voz(texto_l)
-            if jogo_voz:
-                print(f"[JOGO] Detectado por voz (modo criança): {jogo_voz}")
+            # Jogo pedido por voz: lança sem passar pela IA
+            if intencao and intencao.tipo == "jogo":
+                jogo_voz = intencao.valor
+                modo_log = "modo terapeuta" if MODO_ROBO_ATUAL == "TERAPEUTA" else "modo criança"
+                print(f"[JOGO] Detectado por voz ({modo_log}): {jogo_voz}")
                 jogo_obj = next((j for j in _jogos_disponiveis if j['codigo'] == jogo_voz), {})
                 perfil_req = _jogo_requer_verificacao(jogo_obj)
                 if perfil_req:
@@ -2448,6 +3067,12 @@ def loop_logica():
                 _executar_jogo(jogo_obj)
                 continue
 
+            if MODO_ROBO_ATUAL == "TERAPEUTA":
+                # Conversa normal de IA no modo terapeuta
+                if modo_ia_ativo:
+                    perguntar_gemini(texto)  # já fala internamente via streaming
+                continue
+
             if modo_ia_ativo:
                 perguntar_gemini(texto)  # já fala internamente via streaming
             else:
@@ -2459,7 +3084,100 @@ def loop_logica():
         olhos.fechar_olhos()
     if gui: gui.running = False
 
+# --- BENCHMARK DOS MOTORES DE VOZ (python3 tirilo.py --bench-tts) ---
+TEXTOS_BENCH_TTS = (
+    ("curta", "Isso mesmo!"),
+    ("media", "Olá amiguinho! Arraste os círculos para os quadrados da mesma cor."),
+    ("longa", "Os golfinhos são mamíferos que vivem no mar. Eles respiram pela parte de cima "
+              "da cabeça e conversam entre si com assobios. Cada golfinho tem um assobio só "
+              "dele, como se fosse o nome dele!"),
+)
+
+def _medir_tts(blocos):
+    """(segundos até o primeiro bloco, segundos totais, segundos de áudio)."""
+    t0 = time.perf_counter()
+    primeiro = None
+    amostras = 0
+    taxa = 1
+    for bloco, taxa in blocos:
+        if primeiro is None:
+            primeiro = time.perf_counter() - t0
+        amostras += len(bloco)
+    return primeiro or 0.0, time.perf_counter() - t0, amostras / taxa
+
+def bench_tts(argv):
+    """Varre threads (e sentenças por chamada no Sherpa) × tamanho do texto e mostra o
+    fator de tempo real (RTF = síntese / áudio) e o tempo até a primeira amostra.
+    Mede só o motor: sem pitch, sem cache e sem tocar nada."""
+    import argparse
+    ap = argparse.ArgumentParser(prog="tirilo.py --bench-tts")
+    ap.add_argument("--bench-tts", action="store_true")
+    ap.add_argument("--motores", default="SHERPA,PIPER")
+    ap.add_argument("--threads", default="1,2,3,4")
+    ap.add_argument("--sentencas", default="1,2", help="max_num_sentences (Sherpa)")
+    ap.add_argument("--repeticoes", type=int, default=3)
+    args = ap.parse_args(argv)
+    lista = lambda v: [int(x) for x in v.split(",") if x.strip()]
+
+    casos = []   # (motor, rótulo da configuração, fábrica, gerador de blocos)
+    motores = args.motores.upper().split(",")
+    if "SHERPA" in motores:
+        info = _buscar_modelo_sherpa() if _SHERPA_DISPONIVEL else None
+        if info is None:
+            print("Bench: Sherpa indisponível (biblioteca ou modelo ausente).")
+        else:
+            print(f"Bench: Sherpa {info['modelo']}")
+            prov = CONFIG_TTS["SHERPA"]["provider"]
+            for n in lista(args.threads):
+                for s in lista(args.sentencas):
+                    casos.append(("SHERPA", f"threads={n} sentencas={s}",
+                                  lambda n=n, s=s: _criar_sherpa(info, n, s, prov), _blocos_sherpa))
+    if "PIPER" in motores:
+        caminho = _buscar_modelo_piper() if PiperVoice else None
+        if caminho is None:
+            print("Bench: Piper indisponível (biblioteca ou modelo ausente).")
+        else:
+            print(f"Bench: Piper {caminho}")
+            prov = CONFIG_TTS["PIPER"]["provider"]
+            for n in lista(args.threads):
+                casos.append(("PIPER", f"threads={n}",
+                              lambda n=n: _criar_piper(caminho, n, prov), _blocos_piper))
+    if not casos:
+        return 1
+
+    print(f"Bench: {os.cpu_count()} núcleo(s), {args.repeticoes} repetição(ões) por texto.\n")
+    print(f"{'motor':<7} {'configuração':<22} {'texto':<6} {'carga s':>7} {'1ª amostra ms':>13} {'RTF':>6} {'áudio s':>7}")
+    melhores = {}
+    for motor, rotulo, fabrica, blocos in casos:
+        t0 = time.perf_counter()
+        try:
+            instancia = fabrica()
+        except Exception as e:
+            print(f"{motor:<7} {rotulo:<22} erro ao carregar: {e}")
+            continue
+        carga = time.perf_counter() - t0
+        _medir_tts(blocos("Aquecendo.", instancia))   # 1ª inferência aloca os buffers do onnxruntime
+        rtfs = []
+        for nome, texto in TEXTOS_BENCH_TTS:
+            medidas = [_medir_tts(blocos(texto, instancia)) for _ in range(max(1, args.repeticoes))]
+            primeiro = sorted(m[0] for m in medidas)[len(medidas) // 2]
+            total = sorted(m[1] for m in medidas)[len(medidas) // 2]
+            audio = medidas[0][2]
+            rtf = total / audio if audio else float("inf")
+            rtfs.append(rtf)
+            print(f"{motor:<7} {rotulo:<22} {nome:<6} {carga:>7.2f} {primeiro * 1000:>13.0f} {rtf:>6.3f} {audio:>7.2f}")
+        del instancia
+        media = sum(rtfs) / len(rtfs)
+        if motor not in melhores or media < melhores[motor][1]:
+            melhores[motor] = (rotulo, media)
+    print()
+    for motor, (rotulo, media) in melhores.items():
+        print(f"Bench: melhor {motor}: {rotulo} (RTF médio {media:.3f}) → ajuste CONFIG_TTS['{motor}']")
+    return 0
+
 if __name__ == "__main__":
+    if "--bench-tts" in sys.argv:
+        sys.exit(bench_tts(sys.argv[1:]))
     try:
         gui = RoboInterface()
         t = threading.Thread(target=loop_logica); t.daemon = True; t.start()